@@ -1,20 +1,18 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 import os
 import sys
 
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from models.models import Agency
+from models.database import get_database
+
 class AgencyManager:
-    def __init__(self):
-        # استفاده از مسیر صحیح دیتابیس
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.dirname(current_dir)
-        db_path = os.path.join(project_root, 'database', 'hotel.db')
-        db_url = f"sqlite:///{db_path}"
-        
-        print(f"🔧 مسیر دیتابیس در AgencyManager: {db_path}")
-        
-        self.engine = create_engine(db_url)
-        self.Session = sessionmaker(bind=self.engine)
+    def __init__(self, db=None):
+        # استفاده از زمینه دیتابیس مشترک برنامه
+        self.db = db or get_database()
+        self.engine = self.db.engine
+        self.Session = self.db.Session
     
     def get_all_agencies(self):
         """دریافت تمام آژانس‌های فعال"""
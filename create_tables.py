@@ -4,23 +4,18 @@ import os
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(project_root)
 
-from models.models import Base, Room, Guest, Reservation, SystemLog, Agency
-from sqlalchemy import create_engine
+from models.models import Room, Guest, Reservation, SystemLog, Agency
+from models.database import get_database
 
 def create_all_tables():
     """ایجاد تمام جداول در دیتابیس"""
     try:
-        db_path = os.path.join(project_root, 'database', 'hotel.db')
-        db_url = f"sqlite:///{db_path}"
-        
-        engine = create_engine(db_url)
-        Base.metadata.create_all(engine)
+        db = get_database()
+        db.create_all()
         print("✅ تمام جداول با موفقیت ایجاد شدند")
         
         # تست اتصال
-        from sqlalchemy.orm import sessionmaker
-        Session = sessionmaker(bind=engine)
-        session = Session()
+        session = db.Session()
         
         # تست شمارش
         room_count = session.query(Room).count()
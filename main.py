@@ -157,20 +157,14 @@ def create_sample_data(engine):
 def test_database_persistence():
     """تست ماندگاری داده‌ها در دیتابیس"""
     try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        db_path = os.path.join(current_dir, 'database', 'hotel.db')
+        from models.database import get_database
+        from models.models import Reservation, Guest, Room
         
-        if os.path.exists(db_path):
+        db = get_database()
+        if db.has_schema():
             print(f"📊 تست ماندگاری دیتابیس...")
             
-            from sqlalchemy import create_engine
-            from sqlalchemy.orm import sessionmaker
-            from models.models import Reservation, Guest, Room
-            
-            db_url = f"sqlite:///{db_path}"
-            engine = create_engine(db_url)
-            Session = sessionmaker(bind=engine)
-            session = Session()
+            session = db.Session()
             
             # شمارش رکوردها
             reservations_count = session.query(Reservation).count()
@@ -184,6 +178,11 @@ def test_database_persistence():
             print(f"   - تعداد مهمانان: {guests_count}") 
             print(f"   - تعداد اتاق‌ها: {rooms_count}")
             
+            # تنظیمات فعال اتصال (پروفایل و PRAGMAهای SQLite)
+            print(f"⚙️ تنظیمات اتصال دیتابیس:")
+            for key, value in db.diagnostics().items():
+                print(f"   - {key}: {value}")
+            
         else:
             print("❌ دیتابیس وجود ندارد")
             
@@ -200,32 +199,22 @@ def init_database():
         sys.path.append(current_dir)
         sys.path.append(os.path.join(current_dir, 'models'))
         
-        from models.models import Base, Room, Guest, Reservation
-        from sqlalchemy import create_engine
-        from sqlalchemy.orm import sessionmaker
-
-        # ایجاد دایرکتوری database اگر وجود ندارد
-        db_dir = os.path.join(current_dir, 'database')
-        os.makedirs(db_dir, exist_ok=True)
-        
-        db_path = os.path.join(db_dir, 'hotel.db')
-        db_url = f"sqlite:///{db_path}"
-        
-        print(f"📁 مسیر پایگاه داده: {db_path}")
-        
-        engine = create_engine(db_url)
+        # engine مشترک برنامه (آدرس از database/database_config.json یا HOTEL_DATABASE_URL)
+        from models.database import get_database
+        db = get_database()
         
         # ✅ فقط اگر دیتابیس وجود ندارد، ایجاد داده‌های نمونه
-        if not os.path.exists(db_path):
+        if not db.has_schema():
             print("🆕 پایگاه داده وجود ندارد، در حال ایجاد...")
-            Base.metadata.create_all(engine)
+            db.create_all()
             
             # ایجاد داده‌های نمونه فقط برای اولین بار
-            create_sample_data(engine)
+            create_sample_data(db.engine)
+            db.rebuild_search_index()
         else:
             print("✅ پایگاه داده موجود است")
             # فقط جداول را ایجاد کن اگر وجود ندارند (بدون پاک کردن داده‌های موجود)
-            Base.metadata.create_all(engine)
+            db.create_all()
         
         return True
         
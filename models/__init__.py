@@ -1,3 +1,3 @@
-from .models import Base, Room, Guest, Reservation, SystemLog
+from .models import Base, Room, Guest, Reservation, SystemLog, ChangeLog
 
-__all__ = ['Base', 'Room', 'Guest', 'Reservation', 'SystemLog']
\ No newline at end of file
+__all__ = ['Base', 'Room', 'Guest', 'Reservation', 'SystemLog', 'ChangeLog']
\ No newline at end of file
@@ -0,0 +1,144 @@
+from datetime import datetime
+import threading
+import queue
+import json
+import logging
+
+from models.models import SystemLog
+
+logger = logging.getLogger(__name__)
+
+# هشدار ردیف‌های دورریخته‌شده برای اولین ردیف و سپس هر این تعداد ردیف
+DROP_WARNING_INTERVAL = 100
+
+
+class AuditLogWriter:
+    """نویسنده پس‌زمینه لاگ سیستم
+
+    ردیف‌های لاگ در یک صف محدود قرار می‌گیرند و یک نخ جداگانه آن‌ها را هر
+    flush_interval_ms میلی‌ثانیه یا با رسیدن به batch_size ردیف، با یک INSERT
+    چندردیفی و یک commit در دیتابیس می‌نویسد. در حالت synchronous (برای تست‌ها)
+    هر ردیف بلافاصله نوشته می‌شود.
+
+    write هرگز منتظر صف یا دیتابیس نمی‌ماند: وقتی صف پر است ردیف دور ریخته و در
+    dropped شمرده می‌شود. اگر نوشتن یک دسته خطا بدهد ردیف‌ها تک‌به‌تک نوشته می‌شوند
+    تا یک ردیف خراب بقیه را از بین نبرد.
+    """
+
+    def __init__(self, engine, batch_size=50, flush_interval_ms=500, max_queue=1000, synchronous=False):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.synchronous = synchronous
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._running = False
+        self.dropped = 0  # ردیف‌هایی که به دلیل پر بودن صف یا خطای دیتابیس نوشته نشدند
+
+        if not synchronous:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="AuditLogWriter", daemon=True)
+            self._thread.start()
+
+    @staticmethod
+    def make_row(action, table_name, record_id, old_data=None, new_data=None, changed_by="سیستم", description=""):
+        """ساخت دیکشنری یک ردیف لاگ؛ زمان همین لحظه ثبت می‌شود نه زمان نوشتن در دیتابیس"""
+        # تبدیل داده‌ها به JSON برای ذخیره در دیتابیس
+        return {
+            'action': action,
+            'table_name': table_name,
+            'record_id': record_id,
+            'old_data': json.dumps(old_data, ensure_ascii=False) if old_data else None,
+            'new_data': json.dumps(new_data, ensure_ascii=False) if new_data else None,
+            'changed_by': changed_by,
+            'changed_at': datetime.now(),
+            'description': description
+        }
+
+    def write(self, row):
+        """افزودن یک ردیف به صف (در حالت همزمان بلافاصله نوشته می‌شود)"""
+        if self.synchronous or not self._running:
+            self._write_batch([row])
+            return
+
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # نخ رابط کاربری منتظر دیتابیس نمی‌ماند؛ ردیف دور ریخته و شمرده می‌شود
+            self._count_dropped(1, "صف لاگ پر است")
+
+    def flush(self):
+        """صبر تا نوشته شدن تمام ردیف‌های داخل صف"""
+        if self._running:
+            self._queue.join()
+
+    def close(self):
+        """نوشتن ردیف‌های باقی‌مانده و توقف نخ نویسنده"""
+        if not self._running:
+            return
+        self.flush()
+        self._running = False
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if first is None:
+                self._queue.task_done()
+                return
+
+            # جمع کردن ردیف‌های بیشتر تا رسیدن به اندازه دسته یا پایان مهلت
+            batch = [first]
+            stop = False
+            deadline = datetime.now().timestamp() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - datetime.now().timestamp()
+                if remaining <= 0:
+                    break
+                try:
+                    row = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+
+            self._write_batch(batch)
+            for _ in range(len(batch) + (1 if stop else 0)):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, rows):
+        with self._write_lock:
+            try:
+                self._insert(rows)
+                return
+            except Exception:
+                logger.exception("خطا در ثبت %d ردیف لاگ", len(rows))
+
+            # یک ردیف خراب نباید بقیه دسته را از بین ببرد؛ هر ردیف یک بار دیگر جداگانه نوشته می‌شود
+            failed = 0
+            for row in rows:
+                try:
+                    self._insert([row])
+                except Exception:
+                    failed += 1
+            if failed:
+                self._count_dropped(failed, "خطای دیتابیس")
+
+    def _insert(self, rows):
+        with self.engine.begin() as connection:
+            connection.execute(SystemLog.__table__.insert().values(rows))
+
+    def _count_dropped(self, count, reason):
+        previous = self.dropped
+        self.dropped += count
+        if previous == 0 or previous // DROP_WARNING_INTERVAL != self.dropped // DROP_WARNING_INTERVAL:
+            logger.warning("%d ردیف لاگ نوشته نشد (%s)؛ مجموع: %d", count, reason, self.dropped)
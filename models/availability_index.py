@@ -0,0 +1,265 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date
+import threading
+
+from models.models import Reservation, Guest
+
+ACTIVE_STATUSES = ('confirmed', 'checked_in')
+
+
+class AvailabilityIndex:
+    """ایندکس بازه‌ای رزروهای فعال هر اتاق در حافظه
+
+    برای هر اتاق رزروها بر اساس تاریخ ورود مرتب نگه داشته می‌شوند و یک آرایه
+    «بیشینه تاریخ خروج تا این نقطه» کنار آن‌ها هست؛ با bisect روی تاریخ ورود و
+    حرکت به عقب تا جایی که بیشینه خروج اجازه می‌دهد، پرس‌وجوهای تداخل، Back-to-Back
+    و نقطه‌ای در O(log n + k) و بدون مراجعه به دیتابیس پاسخ داده می‌شوند.
+    """
+
+    def __init__(self, session_factory):
+        self.Session = session_factory
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._rooms = {}          # room_id -> {'keys': [...], 'entries': [...], 'max_end': [...]}
+        self._room_of = {}        # reservation_id -> room_id
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """ثبت تابعی که پس از هر تغییر ایندکس با لیست اتاق‌های تغییرکرده (یا None برای همه) صدا زده می‌شود"""
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """حذف تابع ثبت‌شده با add_listener"""
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def ensure_loaded(self):
+        """بارگذاری تنبل ایندکس در اولین استفاده"""
+        if not self._loaded:
+            self.reload()
+
+    def reload(self):
+        """بارگذاری کامل ایندکس از دیتابیس با یک کوئری"""
+        session = self.Session()
+        try:
+            rows = session.query(
+                Reservation.id,
+                Reservation.room_id,
+                Reservation.check_in,
+                Reservation.check_out,
+                Reservation.status,
+                Guest.first_name,
+                Guest.last_name
+            ).outerjoin(
+                Guest, Reservation.guest_id == Guest.id
+            ).filter(
+                Reservation.status.in_(ACTIVE_STATUSES)
+            ).order_by(Reservation.room_id, Reservation.check_in, Reservation.id).all()
+
+            rooms = {}
+            room_of = {}
+            for row in rows:
+                entry = self._make_entry(row.id, row.room_id, row.check_in, row.check_out, row.status,
+                                         f"{row.first_name or ''} {row.last_name or ''}".strip())
+                bucket = rooms.setdefault(row.room_id, {'keys': [], 'entries': [], 'max_end': []})
+                bucket['keys'].append((entry['check_in'], entry['reservation_id']))
+                bucket['entries'].append(entry)
+                room_of[row.id] = row.room_id
+
+            for bucket in rooms.values():
+                self._rebuild_max_end(bucket)
+
+            with self._lock:
+                self._rooms = rooms
+                self._room_of = room_of
+                self._loaded = True
+
+            print(f"✅ ایندکس موجودی اتاق‌ها بارگذاری شد ({len(room_of)} رزرو فعال)")
+            self._notify(None)
+        except Exception as e:
+            print(f"❌ خطا در بارگذاری ایندکس موجودی: {e}")
+        finally:
+            session.close()
+
+    def refresh_reservations(self, reservation_ids):
+        """بارگذاری مجدد چند رزرو مشخص از دیتابیس (مثلاً بعد از تغییر در ترمینال دیگر)"""
+        if not self._loaded:
+            return
+        session = self.Session()
+        try:
+            rows = session.query(
+                Reservation.id,
+                Reservation.room_id,
+                Reservation.check_in,
+                Reservation.check_out,
+                Reservation.status,
+                Guest.first_name,
+                Guest.last_name
+            ).outerjoin(
+                Guest, Reservation.guest_id == Guest.id
+            ).filter(
+                Reservation.id.in_(reservation_ids)
+            ).all()
+        except Exception as e:
+            print(f"❌ خطا در بروزرسانی ایندکس موجودی: {e}")
+            return
+        finally:
+            session.close()
+
+        found = set()
+        for row in rows:
+            found.add(row.id)
+            self.upsert(row.id, row.room_id, row.check_in, row.check_out, row.status,
+                        f"{row.first_name or ''} {row.last_name or ''}".strip())
+        for reservation_id in set(reservation_ids) - found:
+            self.remove(reservation_id)
+
+    def upsert(self, reservation_id, room_id, check_in, check_out, status, guest_name=""):
+        """افزودن یا بروزرسانی یک رزرو در ایندکس (رزروهای غیرفعال حذف می‌شوند)"""
+        with self._lock:
+            previous_room_id = self._remove_locked(reservation_id)
+            changed_rooms = [] if previous_room_id is None else [previous_room_id]
+            if status in ACTIVE_STATUSES:
+                self._insert_locked(reservation_id, room_id, check_in, check_out, status, guest_name)
+                if room_id not in changed_rooms:
+                    changed_rooms.append(room_id)
+
+        if changed_rooms:
+            self._notify(changed_rooms)
+
+    def remove(self, reservation_id):
+        """حذف یک رزرو از ایندکس"""
+        with self._lock:
+            room_id = self._remove_locked(reservation_id)
+
+        if room_id is not None:
+            self._notify([room_id])
+
+    def _insert_locked(self, reservation_id, room_id, check_in, check_out, status, guest_name):
+        entry = self._make_entry(reservation_id, room_id, check_in, check_out, status, guest_name)
+        bucket = self._rooms.setdefault(room_id, {'keys': [], 'entries': [], 'max_end': []})
+        key = (entry['check_in'], reservation_id)
+        position = bisect_left(bucket['keys'], key)
+        bucket['keys'].insert(position, key)
+        bucket['entries'].insert(position, entry)
+        self._rebuild_max_end(bucket)
+        self._room_of[reservation_id] = room_id
+
+    def _notify(self, room_ids):
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(room_ids)
+            except Exception as e:
+                print(f"❌ خطا در اطلاع‌رسانی تغییر موجودی: {e}")
+
+    def overlapping(self, room_id, start, end):
+        """رزروهای اتاق که با بازه [start, end) تداخل دارند، مرتب بر اساس ورود"""
+        start, end = self._as_datetime(start), self._as_datetime(end)
+        return self._scan(room_id, end, inclusive=False, threshold=start)
+
+    def at(self, room_id, moment):
+        """اولین رزروی که لحظه مشخص در بازه [ورود، خروج) آن قرار دارد"""
+        moment = self._as_datetime(moment)
+        matches = self._scan(room_id, moment, inclusive=True, threshold=moment)
+        return matches[0] if matches else None
+
+    def starting_at(self, room_id, moment):
+        """اولین رزروی که دقیقاً در لحظه مشخص شروع می‌شود"""
+        moment = self._as_datetime(moment)
+        self.ensure_loaded()
+        with self._lock:
+            bucket = self._rooms.get(room_id)
+            if not bucket:
+                return None
+            position = bisect_left(bucket['keys'], (moment,))
+            if position < len(bucket['entries']) and bucket['entries'][position]['check_in'] == moment:
+                return bucket['entries'][position]
+            return None
+
+    def ending_at(self, room_id, moment):
+        """اولین رزروی که دقیقاً در لحظه مشخص تمام می‌شود"""
+        moment = self._as_datetime(moment)
+        matches = self._scan(room_id, moment, inclusive=True, threshold=moment, exact=True)
+        return matches[0] if matches else None
+
+    def _scan(self, room_id, before, inclusive, threshold, exact=False):
+        """رزروهای با ورود قبل از before (یا برابر آن اگر inclusive) که خروجشان بعد از threshold
+        (یا دقیقاً برابر آن اگر exact) است
+
+        پیمایش از آخرین رزرو واجد شرط ورود به عقب انجام می‌شود و به محض اینکه بیشینه
+        خروج رزروهای قبلی به threshold نرسد متوقف می‌شود.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            bucket = self._rooms.get(room_id)
+            if not bucket:
+                return []
+
+            keys = bucket['keys']
+            entries = bucket['entries']
+            max_end = bucket['max_end']
+            if inclusive:
+                position = bisect_right(keys, (before, float('inf')))
+            else:
+                position = bisect_left(keys, (before,))
+
+            matches = []
+            for index in range(position - 1, -1, -1):
+                if max_end[index] < threshold or (not exact and max_end[index] == threshold):
+                    break
+                check_out = entries[index]['check_out']
+                if (check_out == threshold) if exact else (check_out > threshold):
+                    matches.append(entries[index])
+
+            matches.reverse()
+            return matches
+
+    def _remove_locked(self, reservation_id):
+        room_id = self._room_of.pop(reservation_id, None)
+        if room_id is None:
+            return None
+        bucket = self._rooms.get(room_id)
+        if not bucket:
+            return room_id
+        for position, entry in enumerate(bucket['entries']):
+            if entry['reservation_id'] == reservation_id:
+                del bucket['keys'][position]
+                del bucket['entries'][position]
+                break
+        self._rebuild_max_end(bucket)
+        return room_id
+
+    @staticmethod
+    def _rebuild_max_end(bucket):
+        max_end = []
+        current = None
+        for entry in bucket['entries']:
+            if current is None or entry['check_out'] > current:
+                current = entry['check_out']
+            max_end.append(current)
+        bucket['max_end'] = max_end
+
+    @staticmethod
+    def _make_entry(reservation_id, room_id, check_in, check_out, status, guest_name):
+        return {
+            'reservation_id': reservation_id,
+            'room_id': room_id,
+            'check_in': AvailabilityIndex._as_datetime(check_in),
+            'check_out': AvailabilityIndex._as_datetime(check_out),
+            'status': status,
+            'guest_name': guest_name
+        }
+
+    @staticmethod
+    def _as_datetime(value):
+        """تبدیل date به datetime (نیمه‌شب) تا مقایسه‌ها مثل ستون DATETIME دیتابیس باشد"""
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, date):
+            return datetime(value.year, value.month, value.day)
+        return value
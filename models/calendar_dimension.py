@@ -0,0 +1,88 @@
+from sqlalchemy import select, func
+from datetime import timedelta
+import jdatetime
+
+from models.models import CalendarDay
+
+# بازه‌ای که جدول پوشش می‌دهد؛ با هر اجرای create_all تا DEFAULT_YEARS_AHEAD سال بعد تمدید می‌شود
+DEFAULT_FIRST_YEAR = 1395
+DEFAULT_YEARS_AHEAD = 10
+
+# تعطیلات رسمی با تاریخ شمسی ثابت (ماه، روز)؛ تعطیلات قمری هر سال جابجا می‌شوند
+# و باید مستقیم در جدول calendar_days علامت بخورند
+FIXED_HOLIDAYS = {
+    (1, 1), (1, 2), (1, 3), (1, 4), (1, 12), (1, 13),
+    (3, 14), (3, 15), (11, 22), (12, 29),
+}
+FRIDAY = 6  # weekday در jdatetime از شنبه (0) شروع می‌شود
+
+JALALI_MONTHS = ["فروردین", "اردیبهشت", "خرداد", "تیر", "مرداد", "شهریور",
+                 "مهر", "آبان", "آذر", "دی", "بهمن", "اسفند"]
+
+
+def add_months(year, month, count):
+    """(سال، ماه) شمسی count ماه بعد (یا قبل با count منفی) بدون جابجایی روزشمار"""
+    index = year * 12 + (month - 1) + count
+    return index // 12, index % 12 + 1
+
+
+def jalali_month_start(year, month):
+    """اولین روز میلادی یک ماه شمسی"""
+    return jdatetime.date(year, month, 1).togregorian()
+
+
+def month_bounds(year, month, months=1):
+    """بازه میلادی [شروع، پایان) برای months ماه شمسی از (year, month)"""
+    end_year, end_month = add_months(year, month, months)
+    return jalali_month_start(year, month), jalali_month_start(end_year, end_month)
+
+
+def calendar_row(day):
+    jalali = jdatetime.date.fromgregorian(date=day)
+    weekday = jalali.weekday()
+    return {
+        'date': day,
+        'jalali_year': jalali.year,
+        'jalali_month': jalali.month,
+        'jalali_day': jalali.day,
+        'weekday': weekday,
+        'is_holiday': weekday == FRIDAY or (jalali.month, jalali.day) in FIXED_HOLIDAYS
+    }
+
+
+def ensure_calendar(connection, start_date, end_date):
+    """اضافه کردن روزهای ناموجود بازه [start_date, end_date) به جدول تقویم؛ تعداد روزهای اضافه‌شده"""
+    total_days = (end_date - start_date).days
+    if total_days <= 0:
+        return 0
+
+    in_range = (CalendarDay.date >= start_date, CalendarDay.date < end_date)
+    existing_count = connection.execute(select(func.count()).select_from(CalendarDay).where(*in_range)).scalar()
+    if existing_count >= total_days:
+        return 0
+
+    existing = set(connection.execute(select(CalendarDay.date).where(*in_range)).scalars())
+    rows = [
+        calendar_row(start_date + timedelta(days=offset))
+        for offset in range(total_days)
+        if start_date + timedelta(days=offset) not in existing
+    ]
+    if rows:
+        connection.execute(CalendarDay.__table__.insert(), rows)
+    return len(rows)
+
+
+def extend_calendar(connection):
+    """پر کردن روزهای ناموجود از DEFAULT_FIRST_YEAR تا پایان DEFAULT_YEARS_AHEAD سال بعد"""
+    last_year = jdatetime.date.today().year + DEFAULT_YEARS_AHEAD
+    start_date, end_date = month_bounds(DEFAULT_FIRST_YEAR, 1, (last_year - DEFAULT_FIRST_YEAR + 1) * 12)
+    added = ensure_calendar(connection, start_date, end_date)
+    if added:
+        print(f"   📅 {added} روز به جدول تقویم اضافه شد")
+    return added
+
+
+def create_calendar(connection):
+    """ساخت جدول تقویم و پر کردن بازه پیش‌فرض آن"""
+    CalendarDay.__table__.create(connection, checkfirst=True)
+    extend_calendar(connection)
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def classify_room_cells(room_reservations, start_date, end_date):
+    """ساخت سلول‌های روزانه یک اتاق در بازه [start_date, end_date) با یک پیمایش
+
+    room_reservations باید بر اساس (تاریخ ورود، id) مرتب باشند و هر کدام ویژگی‌های
+    id، check_in، check_out، package_type، first_name و last_name را داشته باشند
+    (ردیف کوئری یا شیء Reservation با نام مهمان).
+
+    هر روز به اولین رزروی (بر اساس تاریخ ورود) می‌رسد که آن را پوشش می‌دهد. چون
+    رزروها مرتب هستند روزهای پوشش داده شده همیشه یک بازه پیوسته از ورود رزرو فعلی تا
+    «بیشترین خروج تا اینجا» است؛ پس هر روز فقط یک بار ساخته می‌شود و هزینه کل
+    O(تعداد رزروها + تعداد روزها) است، حتی برای اقامت‌های طولانی و Back-to-Back زیاد.
+
+    خروجی دیکشنری {day: cell_data} است که day شماره روز از ابتدای بازه (از 1) است.
+    """
+    start_date = _as_date(start_date)
+    end_date = _as_date(end_date)
+    checkout_dates = {_as_date(res.check_out) for res in room_reservations}
+    checkin_dates = {_as_date(res.check_in) for res in room_reservations}
+
+    cells = {}
+    covered_until = start_date
+    for res in room_reservations:
+        check_in_date = _as_date(res.check_in)
+        check_out_date = _as_date(res.check_out)
+        nights = (check_out_date - check_in_date).days
+        last_night = check_out_date - timedelta(days=1)
+        guest_name = f"{res.first_name} {res.last_name}"
+
+        current = max(check_in_date, covered_until)
+        stop = min(check_out_date, end_date)
+        while current < stop:
+            day_position = (current - check_in_date).days
+
+            # رزرو خود این روز هرگز در همین روز خروج ندارد، پس هر خروجی در این تاریخ از رزرو دیگری است
+            if day_position == 0:
+                cell_type = 'start' if current in checkout_dates else 'full'
+            elif current == last_night:
+                cell_type = 'end' if current in checkin_dates else 'full'
+            else:
+                cell_type = 'middle'
+
+            cells[(current - start_date).days + 1] = {
+                'guest_name': guest_name,
+                'nights': nights,
+                'package': res.package_type,
+                'check_in': res.check_in,
+                'check_out': res.check_out,
+                'cell_type': cell_type,
+                'day_position': day_position,
+                'total_nights': nights,
+                'reservation_id': res.id
+            }
+            current += timedelta(days=1)
+
+        covered_until = max(covered_until, stop)
+
+    return cells
+
+
+def build_cell_grid(rows, start_date, end_date):
+    """ساخت جدول {room_id: {day: cell_data}} از ردیف‌های مرتب بر اساس (اتاق، ورود، id)"""
+    reservations_by_room = {}
+    for row in rows:
+        reservations_by_room.setdefault(row.room_id, []).append(row)
+
+    return {
+        room_id: classify_room_cells(room_reservations, start_date, end_date)
+        for room_id, room_reservations in reservations_by_room.items()
+    }
@@ -0,0 +1,193 @@
+from sqlalchemy import event, inspect, select, func
+from datetime import datetime, date
+import threading
+
+from models.models import ChangeLog
+from models.event_broker import create_broker
+
+# جدول‌هایی که تغییراتشان در فید ثبت می‌شود
+TRACKED_TABLES = {
+    'reservations': ('room_id', 'guest_id', 'check_in', 'check_out', 'status', 'package_type'),
+    'rooms': ('room_number', 'floor', 'capacity', 'is_active', 'status'),
+    'guests': ('first_name', 'last_name'),
+    'agencies': ('name', 'is_active'),
+}
+
+
+class ChangeFeed:
+    """فید تغییرات دیتابیس
+
+    هر insert/update/delete روی جدول‌های TRACKED_TABLES در همان تراکنش در جدول
+    change_log با یک شماره ترتیبی ثبت می‌شود (رویداد after_flush سشن). بعد از commit،
+    رویدادها از طریق کارگزار (models.event_broker) بلافاصله به مشترک‌های همین پروسه
+    و در صورت تنظیم Redis به ترمینال‌های دیگر فرستاده می‌شوند. تغییراتی که از این
+    مسیر نرسند با poll_external دریافت می‌شوند که فقط وقتی PRAGMA data_version تغییر
+    کرده باشد جدول را می‌خواند. هر شماره فقط یک بار تحویل داده می‌شود.
+
+    هر رویداد یک دیکشنری است:
+        {'seq', 'table', 'record_id', 'operation', 'payload', 'origin'}
+    """
+
+    def __init__(self, engine, session_factory, broker_config=None):
+        self.engine = engine
+        self.broker = create_broker(broker_config, on_remote=self.receive_remote)
+        self._lock = threading.Lock()
+        self._seen_seqs = set()        # شماره‌هایی که قبلاً تحویل داده شده‌اند (محلی یا از Redis)
+        self._last_polled_seq = None
+        self._watch_connection = None
+        self._data_version = None
+
+        event.listen(session_factory, 'after_flush', self._after_flush)
+        event.listen(session_factory, 'after_commit', self._after_commit)
+        event.listen(session_factory, 'after_rollback', self._after_rollback)
+
+    def subscribe(self, callback):
+        """ثبت تابعی که با لیست رویدادهای هر تراکنش صدا زده می‌شود (از نخی که رویداد را دریافت کرده)"""
+        self.broker.subscribe(callback)
+
+    def unsubscribe(self, callback):
+        """حذف تابع ثبت‌شده با subscribe"""
+        self.broker.unsubscribe(callback)
+
+    def receive_remote(self, events):
+        """تحویل رویدادهای ترمینال‌های دیگر (از Redis) بدون تکرار در پایش بعدی"""
+        with self._lock:
+            events = [
+                event_data for event_data in events
+                if event_data['seq'] not in self._seen_seqs
+                and (self._last_polled_seq is None or event_data['seq'] > self._last_polled_seq)
+            ]
+            self._seen_seqs.update(event_data['seq'] for event_data in events)
+        self.broker.deliver(events)
+
+    def _after_flush(self, session, flush_context):
+        """ثبت ردیف‌های change_log در همان تراکنش تغییر"""
+        rows = []
+        for operation, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+            for obj in objects:
+                table_name = getattr(obj, '__tablename__', None)
+                if table_name not in TRACKED_TABLES:
+                    continue
+                if operation == 'update' and not session.is_modified(obj, include_collections=False):
+                    continue
+                rows.append({
+                    'table_name': table_name,
+                    'record_id': obj.id,
+                    'operation': operation,
+                    'payload': self._payload(obj, table_name, operation),
+                    'changed_at': datetime.now()
+                })
+
+        if not rows:
+            return
+
+        connection = session.connection()
+        events = session.info.setdefault('change_feed_events', [])
+        for row in rows:
+            result = connection.execute(ChangeLog.__table__.insert().values(**row))
+            events.append({
+                'seq': result.inserted_primary_key[0],
+                'table': row['table_name'],
+                'record_id': row['record_id'],
+                'operation': row['operation'],
+                'payload': row['payload'],
+                'origin': 'local'
+            })
+
+    def _after_commit(self, session):
+        events = session.info.pop('change_feed_events', None)
+        if not events:
+            return
+        with self._lock:
+            self._seen_seqs.update(event_data['seq'] for event_data in events)
+        self.broker.publish(events)
+
+    def _after_rollback(self, session):
+        session.info.pop('change_feed_events', None)
+
+    @staticmethod
+    def _payload(obj, table_name, operation):
+        """مقادیر کلیدی رکورد؛ برای رزروها اتاق و تاریخ‌های قبلی هم ثبت می‌شوند تا جابجایی دیده شود"""
+        payload = {}
+        for name in TRACKED_TABLES[table_name]:
+            value = getattr(obj, name, None)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            payload[name] = value
+
+        if table_name == 'reservations' and operation == 'update':
+            state = inspect(obj)
+            for name in ('room_id', 'check_in', 'check_out'):
+                previous = state.attrs[name].history.deleted
+                if previous and previous[0] != getattr(obj, name):
+                    value = previous[0]
+                    if isinstance(value, (datetime, date)):
+                        value = value.isoformat()
+                    payload[f'previous_{name}'] = value
+        return payload
+
+    def poll_external(self, limit=500):
+        """خواندن تغییرات ثبت‌شده توسط پروسه‌های دیگر
+
+        PRAGMA data_version فقط وقتی تغییر می‌کند که اتصال دیگری commit کرده باشد و
+        خواندن آن هزینه‌ای ندارد؛ جدول change_log فقط در این حالت خوانده می‌شود.
+        """
+        try:
+            if self._watch_connection is None:
+                self._watch_connection = self.engine.connect()
+                self._last_polled_seq = self._watch_connection.execute(
+                    select(func.coalesce(func.max(ChangeLog.seq), 0))
+                ).scalar()
+                self._data_version = self._read_data_version()
+                self._watch_connection.rollback()
+                return []
+
+            data_version = self._read_data_version()
+            if data_version is not None and data_version == self._data_version:
+                self._watch_connection.rollback()
+                return []
+            self._data_version = data_version
+
+            rows = self._watch_connection.execute(
+                select(ChangeLog).where(ChangeLog.seq > self._last_polled_seq).order_by(ChangeLog.seq).limit(limit)
+            ).fetchall()
+            self._watch_connection.rollback()
+        except Exception as e:
+            print(f"❌ خطا در خواندن فید تغییرات: {e}")
+            return []
+
+        events = []
+        with self._lock:
+            for row in rows:
+                self._last_polled_seq = max(self._last_polled_seq, row.seq)
+                if row.seq in self._seen_seqs:
+                    continue
+                events.append({
+                    'seq': row.seq,
+                    'table': row.table_name,
+                    'record_id': row.record_id,
+                    'operation': row.operation,
+                    'payload': row.payload or {},
+                    'origin': 'remote'
+                })
+            # شماره‌های قدیمی‌تر از آخرین خوانده‌شده دیگر لازم نیستند
+            self._seen_seqs = {seq for seq in self._seen_seqs if seq > self._last_polled_seq}
+
+        if len(rows) == limit:
+            # ادامه در فراخوانی بعدی حتی اگر data_version تغییر نکند
+            self._data_version = None
+
+        self.broker.deliver(events)
+        return events
+
+    def _read_data_version(self):
+        if self.engine.dialect.name != 'sqlite':
+            return None
+        return self._watch_connection.exec_driver_sql("PRAGMA data_version").scalar()
+
+    def close(self):
+        """بستن کارگزار و اتصال پایش"""
+        self.broker.close()
+        if self._watch_connection is not None:
+            self._watch_connection.close()
+            self._watch_connection = None
@@ -0,0 +1,260 @@
+from sqlalchemy import create_engine, inspect, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+import threading
+import atexit
+import json
+import os
+
+from models.models import Base
+from models.availability_index import AvailabilityIndex
+from models.room_catalog import RoomCatalog
+from models.audit_log import AuditLogWriter
+from models.change_feed import ChangeFeed
+from models.search_index import SearchIndexSync, has_search_index, rebuild_search_index
+from models.calendar_dimension import extend_calendar
+from models import migrations
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATABASE_PATH = os.path.join(PROJECT_ROOT, 'database', 'hotel.db')
+CONFIG_FILE = os.path.join(PROJECT_ROOT, 'database', 'database_config.json')
+
+# متغیرهای محیطی برای تغییر آدرس دیتابیس و پروفایل SQLite بدون ویرایش فایل تنظیمات
+DATABASE_URL_ENV = 'HOTEL_DATABASE_URL'
+SQLITE_PROFILE_ENV = 'HOTEL_SQLITE_PROFILE'
+REDIS_URL_ENV = 'HOTEL_REDIS_URL'
+
+# پروفایل‌های PRAGMA که روی هر اتصال SQLite اعمال می‌شوند
+#   fast: حالت WAL (خواننده‌ها نویسنده را قفل نمی‌کنند) با synchronous=NORMAL؛ برای دیسک محلی
+#   safe: ژورنال rollback با synchronous=FULL؛ برای وقتی فایل دیتابیس روی اشتراک شبکه است
+#         (WAL روی فایل‌سیستم شبکه‌ای پشتیبانی نمی‌شود)
+SQLITE_PROFILES = {
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,        # 64 مگابایت
+        "mmap_size": 268435456,      # 256 مگابایت
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000
+    },
+    "safe": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "cache_size": -16384,        # 16 مگابایت
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 15000
+    }
+}
+
+# ترتیب اعمال مهم است: busy_timeout قبل از journal_mode تا تغییر حالت ژورنال منتظر قفل بماند
+PRAGMA_ORDER = ("busy_timeout", "journal_mode", "synchronous", "cache_size", "mmap_size", "temp_store")
+
+DEFAULT_CONFIG = {
+    "url": f"sqlite:///{DEFAULT_DATABASE_PATH}",
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 3600,
+    "echo": False,
+    "sqlite_profile": "fast",
+    "sqlite_pragmas": {},
+    # synchronous=true لاگ‌ها را بدون نخ پس‌زمینه و بلافاصله می‌نویسد (مناسب تست)
+    "audit_log": {
+        "synchronous": False,
+        "batch_size": 50,
+        "flush_interval_ms": 500,
+        "max_queue": 1000
+    },
+    # پخش تغییرات بین ترمینال‌ها: "local" یا "redis"
+    "broker": {
+        "type": "local",
+        "url": "redis://localhost:6379/0",
+        "channel": "hotel:changes"
+    }
+}
+
+
+def load_database_config(config_file=CONFIG_FILE):
+    """خواندن تنظیمات دیتابیس از فایل JSON و متغیر محیطی (در صورت وجود)"""
+    config = dict(DEFAULT_CONFIG)
+    try:
+        if os.path.exists(config_file):
+            with open(config_file, 'r', encoding='utf-8') as f:
+                config.update(json.load(f))
+    except Exception as e:
+        print(f"⚠️ خطا در خواندن تنظیمات دیتابیس: {e}")
+
+    if os.environ.get(DATABASE_URL_ENV):
+        config['url'] = os.environ[DATABASE_URL_ENV]
+    if os.environ.get(SQLITE_PROFILE_ENV):
+        config['sqlite_profile'] = os.environ[SQLITE_PROFILE_ENV]
+    if os.environ.get(REDIS_URL_ENV):
+        config['broker'] = dict(config.get('broker') or {}, type='redis', url=os.environ[REDIS_URL_ENV])
+    return config
+
+
+class DatabaseContext:
+    """زمینه دیتابیس برنامه: یک engine با pool تنظیم‌شده، یک sessionmaker و ایندکس موجودی مشترک
+
+    همه مدیرها (رزرو، آژانس و ...) این شیء را دریافت می‌کنند و engine جداگانه نمی‌سازند.
+    """
+
+    def __init__(self, config=None):
+        self.config = config or load_database_config()
+        self.url = make_url(self.config['url'])
+
+        engine_options = {'echo': self.config.get('echo', False)}
+        if self.url.get_backend_name() == 'sqlite':
+            database = self.url.database
+            if database and database != ':memory:':
+                os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+                engine_options.update(self._pool_options())
+        else:
+            engine_options.update(self._pool_options())
+            engine_options['pool_pre_ping'] = True
+
+        self.engine = create_engine(self.url, **engine_options)
+        self.pragmas = {}
+        if self.url.get_backend_name() == 'sqlite':
+            self.pragmas = self._sqlite_pragmas()
+            event.listen(self.engine, 'connect', self._apply_pragmas)
+        self.Session = sessionmaker(bind=self.engine)
+        self.availability_index = AvailabilityIndex(self.Session)
+        self.room_catalog = RoomCatalog(self.Session)
+        self.change_feed = ChangeFeed(self.engine, self.Session, self.config.get('broker'))
+        self.change_feed.subscribe(self._on_changes)
+        self.search_sync = SearchIndexSync(self.Session)
+
+        self._setup_lock = threading.Lock()
+        self._setup_done = set()
+        self._audit_log = None
+
+        print(f"🔧 دیتابیس: {self.url.render_as_string(hide_password=True)}")
+
+    def _sqlite_pragmas(self):
+        """PRAGMAهای پروفایل انتخاب‌شده به همراه تغییرات دستی از فایل تنظیمات"""
+        profile = self.config.get('sqlite_profile', 'fast')
+        if profile not in SQLITE_PROFILES:
+            print(f"⚠️ پروفایل SQLite نامعتبر: {profile} - از پروفایل fast استفاده می‌شود")
+            profile = 'fast'
+            self.config['sqlite_profile'] = profile
+
+        pragmas = dict(SQLITE_PROFILES[profile])
+        pragmas.update(self.config.get('sqlite_pragmas') or {})
+        return pragmas
+
+    def _apply_pragmas(self, dbapi_connection, connection_record):
+        """اعمال PRAGMAها روی هر اتصال جدید SQLite"""
+        cursor = dbapi_connection.cursor()
+        try:
+            ordered = [name for name in PRAGMA_ORDER if name in self.pragmas]
+            ordered += [name for name in self.pragmas if name not in PRAGMA_ORDER]
+            for name in ordered:
+                cursor.execute(f"PRAGMA {name}={self.pragmas[name]}")
+        except Exception as e:
+            print(f"⚠️ خطا در اعمال PRAGMA روی اتصال: {e}")
+        finally:
+            cursor.close()
+
+    def diagnostics(self):
+        """وضعیت فعلی اتصال دیتابیس: پروفایل، مقادیر واقعی PRAGMAها و وضعیت pool"""
+        info = {
+            'url': self.url.render_as_string(hide_password=True),
+            'backend': self.url.get_backend_name(),
+            'pool': self.engine.pool.status(),
+            'broker': self.change_feed.broker.name
+        }
+        if info['backend'] != 'sqlite':
+            return info
+
+        info['profile'] = self.config.get('sqlite_profile')
+        with self.engine.connect() as connection:
+            info['sqlite_version'] = connection.exec_driver_sql("SELECT sqlite_version()").scalar()
+            for name in PRAGMA_ORDER + ('page_size',):
+                info[name] = connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+        return info
+
+    def _pool_options(self):
+        return {
+            'pool_size': self.config.get('pool_size', 5),
+            'max_overflow': self.config.get('max_overflow', 10),
+            'pool_timeout': self.config.get('pool_timeout', 30),
+            'pool_recycle': self.config.get('pool_recycle', 3600)
+        }
+
+    def _on_changes(self, events):
+        """همگام نگه داشتن ایندکس موجودی (تغییرات رزروهای ترمینال‌های دیگر) و فهرست اتاق‌ها"""
+        if any(event_data['table'] == 'rooms' for event_data in events):
+            self.room_catalog.invalidate()
+        remote_ids = [
+            event_data['record_id'] for event_data in events
+            if event_data['origin'] == 'remote' and event_data['table'] == 'reservations'
+        ]
+        if remote_ids:
+            self.availability_index.refresh_reservations(remote_ids)
+
+    @property
+    def audit_log(self):
+        """نویسنده لاگ سیستم (در اولین استفاده ساخته می‌شود)"""
+        with self._setup_lock:
+            if self._audit_log is None:
+                options = dict(DEFAULT_CONFIG['audit_log'])
+                options.update(self.config.get('audit_log') or {})
+                self._audit_log = AuditLogWriter(self.engine, **options)
+                atexit.register(self._audit_log.close)
+        return self._audit_log
+
+    def has_schema(self):
+        """آیا جداول اصلی قبلاً ساخته شده‌اند"""
+        return inspect(self.engine).has_table('rooms')
+
+    def create_all(self):
+        """ایجاد جداول تعریف‌نشده و اعمال مایگریشن‌های باقی‌مانده (بدون تغییر داده‌های موجود)
+
+        جدول تقویم هم در صورت نیاز تمدید می‌شود تا گزارش‌ها فقط خواننده باشند.
+        """
+        Base.metadata.create_all(self.engine)
+        migrations.upgrade(self.engine)
+        with self.engine.begin() as connection:
+            extend_calendar(connection)
+
+    def rebuild_search_index(self):
+        """ساخت دوباره ایندکس جستجو بعد از ورود داده با سشنی غیر از self.Session (مثل داده‌های نمونه)"""
+        with self.engine.begin() as connection:
+            if has_search_index(connection):
+                rebuild_search_index(connection)
+
+    def check_query_plans(self):
+        """بررسی استفاده پرس‌وجوهای اصلی از ایندکس‌ها"""
+        return migrations.check_query_plans(self.engine)
+
+    def run_once(self, name, setup):
+        """اجرای یک مرحله راه‌اندازی فقط یک بار در طول عمر برنامه"""
+        with self._setup_lock:
+            if name in self._setup_done:
+                return False
+            self._setup_done.add(name)
+        setup()
+        return True
+
+    def dispose(self):
+        """نوشتن لاگ‌های باقی‌مانده و بستن تمام اتصال‌های pool"""
+        if self._audit_log is not None:
+            self._audit_log.close()
+        self.change_feed.close()
+        self.engine.dispose()
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    """زمینه دیتابیس مشترک کل برنامه (در اولین فراخوانی ساخته می‌شود)"""
+    global _database
+    if _database is None:
+        with _database_lock:
+            if _database is None:
+                _database = DatabaseContext()
+    return _database
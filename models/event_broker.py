@@ -0,0 +1,119 @@
+import threading
+import json
+import uuid
+
+try:
+    import redis
+except ImportError:  # redis اختیاری است؛ بدون آن فقط کارگزار محلی در دسترس است
+    redis = None
+
+
+class LocalBroker:
+    """کارگزار داخل پروسه: رویدادها بلافاصله به مشترک‌های همین برنامه داده می‌شوند
+
+    برای نصب‌های تک‌کامپیوتری و تست‌ها؛ تغییرات ترمینال‌های دیگر در این حالت فقط
+    از طریق پایش فید تغییرات دیتابیس دریافت می‌شوند.
+    """
+
+    name = 'local'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """ثبت تابعی که با لیست رویدادها صدا زده می‌شود"""
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def publish(self, events):
+        """انتشار رویدادهای همین پروسه"""
+        self.deliver(events)
+
+    def deliver(self, events):
+        """تحویل رویدادها به مشترک‌های محلی (بدون ارسال به ترمینال‌های دیگر)"""
+        if not events:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(events)
+            except Exception as e:
+                print(f"❌ خطا در ارسال رویداد تغییر: {e}")
+
+    def close(self):
+        pass
+
+
+class RedisBroker(LocalBroker):
+    """کارگزار Redis pub/sub برای پخش تغییرات بین ترمینال‌های هتل
+
+    رویدادهای همین پروسه هم به صورت محلی تحویل و هم روی کانال Redis منتشر می‌شوند.
+    پیام‌های ترمینال‌های دیگر در نخ پس‌زمینه دریافت و با origin='remote' به
+    on_remote داده می‌شوند. اگر Redis در دسترس نباشد انتشار بی‌صدا رد می‌شود و
+    پایش فید تغییرات دیتابیس همچنان کار می‌کند.
+    """
+
+    name = 'redis'
+
+    def __init__(self, url, channel='hotel:changes', on_remote=None):
+        super().__init__()
+        if redis is None:
+            raise RuntimeError("پکیج redis نصب نشده است")
+
+        self.channel = channel
+        self.sender_id = uuid.uuid4().hex
+        self.on_remote = on_remote or self.deliver
+        self.client = redis.Redis.from_url(url, socket_connect_timeout=2, health_check_interval=30)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.pubsub.subscribe(**{channel: self._handle_message})
+        self.thread = self.pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def publish(self, events):
+        self.deliver(events)
+        if not events:
+            return
+        try:
+            message = json.dumps({'sender': self.sender_id, 'events': events}, ensure_ascii=False)
+            self.client.publish(self.channel, message)
+        except Exception as e:
+            print(f"⚠️ خطا در انتشار رویداد روی Redis: {e}")
+
+    def _handle_message(self, message):
+        try:
+            data = json.loads(message['data'])
+            if data.get('sender') == self.sender_id:
+                return
+            events = [dict(event_data, origin='remote') for event_data in data.get('events', [])]
+            self.on_remote(events)
+        except Exception as e:
+            print(f"❌ خطا در دریافت پیام Redis: {e}")
+
+    def close(self):
+        try:
+            self.thread.stop()
+            self.pubsub.close()
+            self.client.close()
+        except Exception as e:
+            print(f"⚠️ خطا در بستن اتصال Redis: {e}")
+
+
+def create_broker(config, on_remote=None):
+    """ساخت کارگزار بر اساس تنظیمات؛ در صورت نبود یا خطای Redis کارگزار محلی برگردانده می‌شود"""
+    config = config or {}
+    if config.get('type') == 'redis':
+        try:
+            broker = RedisBroker(config.get('url', 'redis://localhost:6379/0'),
+                                 config.get('channel', 'hotel:changes'), on_remote)
+            print(f"📡 پخش تغییرات از طریق Redis: {config.get('url')}")
+            return broker
+        except Exception as e:
+            print(f"⚠️ اتصال به Redis ممکن نشد، از کارگزار محلی استفاده می‌شود: {e}")
+    return LocalBroker()
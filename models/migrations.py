@@ -0,0 +1,182 @@
+from sqlalchemy import inspect, text
+from datetime import datetime
+
+from models.models import Guest, Reservation, SystemLog, ChangeLog
+from models.search_index import create_search_index, drop_legacy_triggers, recreate_search_index
+from models.calendar_dimension import create_calendar
+
+# جدول نسخه‌های اعمال‌شده؛ هر مایگریشن فقط یک بار روی هر دیتابیس اجرا می‌شود
+VERSION_TABLE = 'schema_migrations'
+
+
+def _add_column_if_missing(connection, table_name, column_name, ddl):
+    columns = {column['name'] for column in inspect(connection).get_columns(table_name)}
+    if column_name not in columns:
+        connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}"))
+        print(f"   ➕ ستون {table_name}.{column_name} اضافه شد")
+
+
+def _reservation_extra_columns(connection):
+    """ستون‌هایی که بعد از نسخه اول به جدول رزروها اضافه شدند (migration.py قدیمی)"""
+    _add_column_if_missing(connection, 'reservations', 'is_half_charge', "BOOLEAN DEFAULT FALSE")
+    _add_column_if_missing(connection, 'reservations', 'check_in_time', "VARCHAR(10) DEFAULT '14:00'")
+    _add_column_if_missing(connection, 'reservations', 'check_out_time', "VARCHAR(10) DEFAULT '12:00'")
+    _add_column_if_missing(connection, 'reservations', 'agency_id', "INTEGER")
+    _add_column_if_missing(connection, 'reservations', 'settlement_type', "VARCHAR(100)")
+    _add_column_if_missing(connection, 'reservations', 'tracking_code', "VARCHAR(100)")
+    _add_column_if_missing(connection, 'reservations', 'receipt_file', "BLOB")
+    _add_column_if_missing(connection, 'reservations', 'receipt_filename', "VARCHAR(255)")
+
+
+def _hot_query_indexes(connection):
+    """ایندکس‌های تعریف‌شده روی رزروها و لاگ‌ها در models.py"""
+    for table in (Reservation.__table__, SystemLog.__table__):
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+            print(f"   📇 ایندکس {index.name}")
+
+
+def _change_log_table(connection):
+    """جدول فید تغییرات (models.change_feed)"""
+    ChangeLog.__table__.create(connection, checkfirst=True)
+
+
+def _guest_contact_columns(connection):
+    """تلفن و ایمیل مهمان (تب مهمانان و داده‌های نمونه main.py از آن‌ها استفاده می‌کنند)"""
+    _add_column_if_missing(connection, 'guests', 'phone', "VARCHAR(20)")
+    _add_column_if_missing(connection, 'guests', 'email', "VARCHAR(100)")
+
+
+def _guest_directory_indexes(connection):
+    """ایندکس‌های مرتب‌سازی فهرست مهمانان (ReservationManager.get_guest_page)"""
+    for index in Guest.__table__.indexes:
+        index.create(connection, checkfirst=True)
+        print(f"   📇 ایندکس {index.name}")
+
+
+def _search_index(connection):
+    """ایندکس FTS5 جستجوی مهمانان و رزروها (models.search_index)"""
+    if connection.dialect.name != 'sqlite':
+        print("   ⚠️ ایندکس FTS5 فقط برای SQLite ساخته می‌شود؛ جستجو از LIKE استفاده می‌کند")
+        return
+    create_search_index(connection)
+
+
+def _calendar_dimension(connection):
+    """جدول تقویم شمسی برای گزارش‌های ماهانه (models.calendar_dimension)"""
+    create_calendar(connection)
+
+
+def _search_index_app_sync(connection):
+    """حذف تریگرهای وابسته به تابع hotel_normalize و ساخت دوباره ایندکس جستجو با ستون ایمیل
+
+    از این نسخه ایندکس در سشن‌های برنامه (models.search_index.SearchIndexSync) به‌روز می‌شود.
+    """
+    if connection.dialect.name != 'sqlite':
+        return
+    drop_legacy_triggers(connection)
+    recreate_search_index(connection)
+
+
+# (نسخه، نام، تابع) - مایگریشن‌های جدید فقط به انتهای این لیست اضافه می‌شوند
+MIGRATIONS = [
+    (1, 'reservation_extra_columns', _reservation_extra_columns),
+    (2, 'hot_query_indexes', _hot_query_indexes),
+    (3, 'change_log_table', _change_log_table),
+    (4, 'guest_contact_columns', _guest_contact_columns),
+    (5, 'guest_directory_indexes', _guest_directory_indexes),
+    (6, 'search_index', _search_index),
+    (7, 'calendar_dimension', _calendar_dimension),
+    (8, 'search_index_app_sync', _search_index_app_sync),
+]
+
+
+def get_schema_version(engine):
+    """آخرین نسخه مایگریشن اعمال‌شده (0 اگر هیچ‌کدام)"""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(VERSION_TABLE):
+            return 0
+        version = connection.execute(text(f"SELECT MAX(version) FROM {VERSION_TABLE}")).scalar()
+        return version or 0
+
+
+def upgrade(engine):
+    """اعمال مایگریشن‌های باقی‌مانده به ترتیب؛ هر مایگریشن در یک تراکنش جداگانه"""
+    with engine.begin() as connection:
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ("
+            "version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at DATETIME NOT NULL)"
+        ))
+
+    current_version = get_schema_version(engine)
+    applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version <= current_version:
+            continue
+        print(f"🔄 اجرای مایگریشن {version}: {name}")
+        with engine.begin() as connection:
+            migrate(connection)
+            connection.execute(
+                text(f"INSERT INTO {VERSION_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {'version': version, 'name': name, 'applied_at': datetime.now()}
+            )
+        applied.append(version)
+
+    if applied:
+        print(f"✅ مایگریشن‌ها اعمال شدند (نسخه فعلی: {applied[-1]})")
+    return applied
+
+
+# پرس‌وجوهای اصلی برنامه که باید از ایندکس استفاده کنند
+HOT_QUERIES = [
+    ("موجودی اتاق",
+     "SELECT id, check_in, check_out FROM reservations "
+     "WHERE room_id = :room_id AND status IN ('confirmed', 'checked_in') "
+     "AND check_in < :end AND check_out > :start",
+     {'room_id': 1, 'start': '2025-01-01', 'end': '2025-01-05'}),
+    ("رزروهای ماه رک",
+     "SELECT id, room_id, check_in, check_out FROM reservations "
+     "WHERE status IN ('confirmed', 'checked_in') AND check_in < :end AND check_out >= :start "
+     "ORDER BY room_id, check_in, id",
+     {'start': '2025-01-01', 'end': '2025-02-01'}),
+    ("ورودهای امروز",
+     "SELECT id FROM reservations WHERE status = 'confirmed' AND check_in >= :start AND check_in < :end",
+     {'start': '2025-01-01', 'end': '2025-01-02'}),
+    ("رزروهای یک مهمان",
+     "SELECT id FROM reservations WHERE guest_id = :guest_id AND status = 'checked_in'",
+     {'guest_id': 1}),
+    ("صفحه فهرست مهمانان",
+     "SELECT id FROM guests WHERE (last_name, first_name, id) > (:last_name, :first_name, :id) "
+     "ORDER BY last_name, first_name, id LIMIT 101",
+     {'last_name': '', 'first_name': '', 'id': 0}),
+    ("آخرین لاگ‌ها",
+     "SELECT id FROM system_logs ORDER BY changed_at DESC LIMIT 100",
+     {}),
+    ("لاگ‌های یک عملیات",
+     "SELECT id FROM system_logs WHERE action = :action ORDER BY changed_at DESC LIMIT 100",
+     {'action': 'CREATE'}),
+    ("تاریخچه یک رکورد",
+     "SELECT id FROM system_logs WHERE table_name = :table_name AND record_id = :record_id ORDER BY changed_at",
+     {'table_name': 'reservations', 'record_id': 1}),
+    ("کاربران لاگ",
+     "SELECT DISTINCT changed_by FROM system_logs",
+     {}),
+]
+
+
+def check_query_plans(engine):
+    """بررسی EXPLAIN QUERY PLAN پرس‌وجوهای اصلی؛ خروجی لیست دیکشنری‌ها با پرچم uses_index است"""
+    results = []
+    with engine.connect() as connection:
+        for name, sql, params in HOT_QUERIES:
+            rows = connection.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+            details = [row[-1] for row in rows]
+            # «SCAN جدول» بدون USING یعنی پیمایش کامل جدول
+            full_scan = any(detail.startswith('SCAN') and 'USING' not in detail for detail in details)
+            uses_index = any('USING' in detail and 'INDEX' in detail for detail in details)
+            results.append({
+                'name': name,
+                'uses_index': uses_index and not full_scan,
+                'plan': details
+            })
+    return results
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Float, Text, JSON, LargeBinary
+from sqlalchemy import create_engine, Column, Integer, String, Date, DateTime, Boolean, Float, Text, JSON, LargeBinary, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -45,6 +45,14 @@ class Guest(Base):
     last_name = Column(String(100), nullable=False)
     id_number = Column(String(50))
     nationality = Column(String(100), default="ایرانی")
+    phone = Column(String(20))
+    email = Column(String(100))
+    
+    __table_args__ = (
+        # صفحه‌بندی keyset فهرست مهمانان بر اساس نام خانوادگی یا نام (id ضمنی در ایندکس SQLite)
+        Index('ix_guests_last_first', 'last_name', 'first_name'),
+        Index('ix_guests_first_last', 'first_name', 'last_name'),
+    )
     
     def __repr__(self):
         return f"<Guest({self.first_name} {self.last_name})>"
@@ -75,6 +83,15 @@ class Reservation(Base):
     companion_type = Column(String(50), default="بزرگسال")
     created_at = Column(DateTime, default=datetime.now)
     
+    __table_args__ = (
+        # موجودی اتاق، رک و Back-to-Back
+        Index('ix_reservations_room_status_dates', 'room_id', 'status', 'check_in', 'check_out'),
+        # رزروهای هر مهمان (تب مهمانان)
+        Index('ix_reservations_guest_status', 'guest_id', 'status'),
+        # بازه‌های تاریخ بدون اتاق مشخص (ماه رک، ورود و خروج امروز، گزارش‌ها)
+        Index('ix_reservations_status_dates', 'status', 'check_in', 'check_out'),
+    )
+    
     def __repr__(self):
         return f"<Reservation(Room: {self.room_id}, Guest: {self.guest_id})>"
 
@@ -91,5 +108,50 @@ class SystemLog(Base):
     changed_at = Column(DateTime, default=datetime.now)
     description = Column(Text)
     
+    __table_args__ = (
+        Index('ix_system_logs_changed_at', 'changed_at'),
+        Index('ix_system_logs_action_changed_at', 'action', 'changed_at'),
+        # تاریخچه تغییرات یک رکورد
+        Index('ix_system_logs_record', 'table_name', 'record_id', 'changed_at'),
+        Index('ix_system_logs_changed_by', 'changed_by'),
+    )
+    
+    def __repr__(self):
+        return f"<SystemLog({self.action} on {self.table_name}.{self.record_id})>"
+
+class ChangeLog(Base):
+    """فید تغییرات: هر تغییر رزرو، اتاق، مهمان یا آژانس در همان تراکنش با یک شماره ترتیبی ثبت می‌شود"""
+    __tablename__ = 'change_log'
+    
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String(50), nullable=False)
+    record_id = Column(Integer, nullable=False)
+    operation = Column(String(10), nullable=False)  # insert, update, delete
+    payload = Column(JSON)
+    changed_at = Column(DateTime, default=datetime.now)
+    
+    __table_args__ = (
+        # جدول فقط افزایشی است؛ AUTOINCREMENT تضمین می‌کند شماره‌ها هیچ‌وقت دوباره استفاده نشوند
+        {'sqlite_autoincrement': True},
+    )
+    
+    def __repr__(self):
+        return f"<ChangeLog({self.seq}: {self.operation} {self.table_name}.{self.record_id})>"
+
+class CalendarDay(Base):
+    """بعد تقویم: هر روز میلادی با سال، ماه و روز شمسی متناظر (گزارش‌ها با GROUP BY روی ماه شمسی)"""
+    __tablename__ = 'calendar_days'
+    
+    date = Column(Date, primary_key=True)
+    jalali_year = Column(Integer, nullable=False)
+    jalali_month = Column(Integer, nullable=False)
+    jalali_day = Column(Integer, nullable=False)
+    weekday = Column(Integer, nullable=False)  # 0 = شنبه ... 6 = جمعه
+    is_holiday = Column(Boolean, default=False, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_calendar_days_jalali_month', 'jalali_year', 'jalali_month', 'date'),
+    )
+    
     def __repr__(self):
-        return f"<SystemLog({self.action} on {self.table_name}.{self.record_id})>"
\ No newline at end of file
+        return f"<CalendarDay({self.date} = {self.jalali_year}/{self.jalali_month}/{self.jalali_day})>"
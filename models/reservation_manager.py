@@ -1,6 +1,6 @@
-from sqlalchemy import create_engine, and_, or_
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import and_, or_, func, select, exists, tuple_, type_coerce, cast, case, String, Integer
 from datetime import datetime, timedelta
+import jdatetime
 import os
 import sys
 import json
@@ -8,16 +8,24 @@ import json
 current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(current_dir)
 
-from models.models import Base, Room, Guest, Reservation, SystemLog, Agency
+from models.models import Room, Guest, Reservation, SystemLog, Agency, CalendarDay
+from models.database import get_database
+from models.audit_log import AuditLogWriter
+from models.cell_grid import build_cell_grid
+from models.search_index import normalize_text, has_search_index, search_index, matching_ids
+from models.calendar_dimension import month_bounds
 
 class ReservationManager:
-    def __init__(self):
-        db_path = os.path.join(current_dir, 'database', 'hotel.db')
-        db_url = f"sqlite:///{db_path}"
-        self.engine = create_engine(db_url)
-        self.Session = sessionmaker(bind=self.engine)
-        self.create_tables()
-        self.init_sample_agencies()
+    def __init__(self, db=None):
+        # engine، sessionmaker و ایندکس موجودی بین همه مدیرها مشترک است
+        self.db = db or get_database()
+        self.engine = self.db.engine
+        self.Session = self.db.Session
+        self.availability_index = self.db.availability_index
+        self.room_catalog = self.db.room_catalog
+        self._search_index_available = None
+        self.db.run_once('create_tables', self.create_tables)
+        self.db.run_once('init_sample_agencies', self.init_sample_agencies)
     
     def init_sample_agencies(self):
         """ایجاد آژانس‌های نمونه در صورت عدم وجود"""
@@ -56,7 +64,11 @@ class ReservationManager:
             session.close()
 
     def create_reservation(self, reservation_data, guest_data, changed_by="سیستم"):
-        """ایجاد رزرو جدید"""
+        """ایجاد رزرو جدید
+
+        مهمان، رزرو و لاگ سیستم در یک تراکنش و با یک commit ثبت می‌شوند؛ شناسه‌ها با
+        flush گرفته می‌شوند و بعد از commit به اشیای منقضی‌شده دست زده نمی‌شود.
+        """
         session = self.Session()
         try:
             print(f"🔍 شروع ایجاد رزرو برای مهمان: {guest_data['first_name']} {guest_data['last_name']}")
@@ -69,62 +81,58 @@ class ReservationManager:
                 nationality=guest_data.get('nationality', 'ایرانی')
             )
             session.add(guest)
-            session.commit()
-            print(f"✅ مهمان ایجاد شد با ID: {guest.id}")
+            session.flush()
+            guest_id = guest.id
             
             # ایجاد رزرو
+            new_data = {
+                'room_id': reservation_data['room_id'],
+                'guest_id': guest_id,
+                'check_in': reservation_data['check_in'],
+                'check_out': reservation_data['check_out'],
+                'status': reservation_data.get('status', 'confirmed'),
+                'adults': reservation_data.get('adults', 1),
+                'children': reservation_data.get('children', 0),
+                'total_amount': reservation_data.get('total_amount', 0),
+                'paid_amount': reservation_data.get('paid_amount', 0),
+                'package_type': reservation_data.get('package_type', 'فقط اسکان'),
+                'guest_type': reservation_data.get('guest_type', 'حضوری'),
+                'agency_id': reservation_data.get('agency_id'),
+                'settlement_type': reservation_data.get('settlement_type', 'تسویه با هتل'),
+                'tracking_code': reservation_data.get('tracking_code')
+            }
             reservation = Reservation(
-                room_id=reservation_data['room_id'],
-                guest_id=guest.id,
-                check_in=reservation_data['check_in'],
-                check_out=reservation_data['check_out'],
-                status=reservation_data.get('status', 'confirmed'),
-                adults=reservation_data.get('adults', 1),
-                children=reservation_data.get('children', 0),
-                total_amount=reservation_data.get('total_amount', 0),
-                paid_amount=reservation_data.get('paid_amount', 0),
-                package_type=reservation_data.get('package_type', 'فقط اسکان'),
-                guest_type=reservation_data.get('guest_type', 'حضوری'),
-                agency_id=reservation_data.get('agency_id'),
-                settlement_type=reservation_data.get('settlement_type', 'تسویه با هتل'),
-                tracking_code=reservation_data.get('tracking_code'),
                 receipt_file=reservation_data.get('receipt_file'),
-                receipt_filename=reservation_data.get('receipt_filename')
+                receipt_filename=reservation_data.get('receipt_filename'),
+                **new_data
             )
-            
             session.add(reservation)
-            session.commit()
-            print(f"✅ رزرو ایجاد شد با ID: {reservation.id}")
-            
-            # ثبت لاگ
-            new_data = {
-                'room_id': reservation.room_id,
-                'guest_id': reservation.guest_id,
-                'check_in': reservation.check_in.isoformat(),
-                'check_out': reservation.check_out.isoformat(),
-                'status': reservation.status,
-                'adults': reservation.adults,
-                'children': reservation.children,
-                'total_amount': reservation.total_amount,
-                'paid_amount': reservation.paid_amount,
-                'package_type': reservation.package_type,
-                'guest_type': reservation.guest_type,
-                'agency_id': reservation.agency_id,
-                'settlement_type': reservation.settlement_type,
-                'tracking_code': reservation.tracking_code
-            }
+            session.flush()
+            reservation_id = reservation.id
             
-            self.log_system_action(
+            # ثبت لاگ در همان تراکنش
+            new_data['check_in'] = new_data['check_in'].isoformat()
+            new_data['check_out'] = new_data['check_out'].isoformat()
+            session.add(self._make_log_entry(
                 action="create",
                 table_name="reservations",
-                record_id=reservation.id,
+                record_id=reservation_id,
                 old_data=None,
                 new_data=new_data,
                 changed_by=changed_by,
                 description="ثبت رزرو جدید"
+            ))
+            
+            session.commit()
+            print(f"✅ رزرو ایجاد شد با ID: {reservation_id} (مهمان: {guest_id})")
+            
+            self.availability_index.upsert(
+                reservation_id, reservation_data['room_id'], reservation_data['check_in'],
+                reservation_data['check_out'], new_data['status'],
+                f"{guest_data['first_name']} {guest_data['last_name']}"
             )
             
-            return True, "رزرو با موفقیت ثبت شد", reservation.id
+            return True, "رزرو با موفقیت ثبت شد", reservation_id
             
         except Exception as e:
             print(f"❌ خطا در ثبت رزرو: {e}")
@@ -139,7 +147,7 @@ class ReservationManager:
         """ایجاد تمام جداول در دیتابیس"""
         try:
             # این خط تمام جدول‌های تعریف شده در Base رو ایجاد می‌کنه
-            Base.metadata.create_all(self.engine)
+            self.db.create_all()
             print("✅ تمام جداول با موفقیت ایجاد شدند")
             
             # تست ایجاد جدول system_logs
@@ -153,36 +161,30 @@ class ReservationManager:
             import traceback
             traceback.print_exc()
     
+    def _make_log_entry(self, action, table_name, record_id, old_data=None, new_data=None, changed_by="سیستم", description=""):
+        """ساخت رکورد لاگ سیستم (بدون ذخیره) تا در تراکنش فراخواننده اضافه شود"""
+        return SystemLog(**AuditLogWriter.make_row(
+            action, table_name, record_id, old_data, new_data, changed_by, description
+        ))
+    
     def log_system_action(self, action, table_name, record_id, old_data=None, new_data=None, changed_by="سیستم", description=""):
-        """ثبت action در سیستم لاگ"""
-        session = self.Session()
+        """ثبت action در سیستم لاگ
+
+        ردیف به نویسنده پس‌زمینه لاگ سپرده می‌شود و به صورت دسته‌ای در دیتابیس ثبت
+        می‌شود؛ فراخواننده منتظر commit نمی‌ماند.
+        """
         try:
-            # تبدیل داده‌ها به JSON برای ذخیره در دیتابیس
-            old_data_json = json.dumps(old_data, ensure_ascii=False) if old_data else None
-            new_data_json = json.dumps(new_data, ensure_ascii=False) if new_data else None
-            
-            log = SystemLog(
-                action=action,
-                table_name=table_name,
-                record_id=record_id,
-                old_data=old_data_json,
-                new_data=new_data_json,
-                changed_by=changed_by,
-                description=description
-            )
-            session.add(log)
-            session.commit()
-            print(f"✅ لاگ ثبت شد: {action} روی {table_name}.{record_id} توسط {changed_by}")
+            self.db.audit_log.write(AuditLogWriter.make_row(
+                action, table_name, record_id, old_data, new_data, changed_by, description
+            ))
             return True
         except Exception as e:
             print(f"❌ خطا در ثبت لاگ: {e}")
-            session.rollback()
             return False
-        finally:
-            session.close()
     
     def get_all_logs(self):
         """دریافت تمام لاگ‌ها (برای تست)"""
+        self.db.audit_log.flush()
         session = self.Session()
         try:
             logs = session.query(SystemLog).order_by(SystemLog.changed_at.desc()).all()
@@ -211,6 +213,7 @@ class ReservationManager:
     def get_system_logs(self, action_filter=None, table_filter=None, user_filter=None, 
                        date_from=None, date_to=None, limit=1000):
         """دریافت لاگ‌های سیستم با فیلترهای مختلف"""
+        self.db.audit_log.flush()
         session = self.Session()
         try:
             query = session.query(SystemLog)
@@ -295,9 +298,7 @@ class ReservationManager:
                 if hasattr(reservation, key):
                     setattr(reservation, key, value)
             
-            session.commit()
-            
-            # ذخیره داده‌های جدید برای لاگ
+            # ذخیره داده‌های جدید برای لاگ و ایندکس قبل از commit (بعد از آن اشیا منقضی می‌شوند)
             new_data = {
                 'room_id': reservation.room_id,
                 'guest_id': reservation.guest_id,
@@ -310,6 +311,16 @@ class ReservationManager:
                 'package_type': reservation.package_type,
                 'guest_type': getattr(reservation, 'guest_type', 'حضوری')
             }
+            guest = session.get(Guest, reservation.guest_id) if reservation.guest_id else None
+            index_entry = (
+                reservation.id, reservation.room_id, reservation.check_in, reservation.check_out,
+                reservation.status, f"{guest.first_name} {guest.last_name}" if guest else ""
+            )
+            
+            session.commit()
+            
+            # بروزرسانی ایندکس موجودی اتاق‌ها
+            self.availability_index.upsert(*index_entry)
             
             # ثبت لاگ
             log_success = self.log_system_action(
@@ -334,128 +345,55 @@ class ReservationManager:
         finally:
             session.close()
 
-    def create_reservation(self, reservation_data, guest_data, changed_by="سیستم"):
-        """ایجاد رزرو جدید و ثبت لاگ - نسخه نهایی"""
-        session = self.Session()
+    def find_available_rooms(self, check_in, check_out, guests):
+        """پیدا کردن تمام اتاق‌های خالی با ظرفیت کافی در یک مرحله
+
+        اتاق‌ها از فهرست اتاق‌ها (RoomCatalog) خوانده می‌شوند و موجودی همه آن‌ها در یک
+        پیمایش از روی ایندکس حافظه بررسی می‌شود. خروجی لیست دیکشنری‌های اتاق به همراه پرچم
+        Back-to-Back و قیمت کل اقامت است.
+        """
         try:
-            print(f"🔍 شروع ایجاد رزرو برای مهمان: {guest_data['first_name']} {guest_data['last_name']}")
-            print(f"📅 تاریخ ورود: {reservation_data['check_in']}")
-            print(f"📅 تاریخ خروج: {reservation_data['check_out']}")
-            print(f"🏨 اتاق: {reservation_data['room_id']}")
-            
-            # ایجاد مهمان جدید
-            guest = Guest(
-                first_name=guest_data['first_name'],
-                last_name=guest_data['last_name'],
-                nationality=guest_data.get('nationality', 'ایرانی')
-            )
-            session.add(guest)
-            session.commit()  # کامیت فوری برای گرفتن ID
-            print(f"✅ مهمان ایجاد شد با ID: {guest.id}")
-            
-            # ایجاد رزرو
-            reservation = Reservation(
-                room_id=reservation_data['room_id'],
-                guest_id=guest.id,
-                check_in=reservation_data['check_in'],
-                check_out=reservation_data['check_out'],
-                status=reservation_data.get('status', 'confirmed'),
-                adults=reservation_data.get('adults', 1),
-                children=reservation_data.get('children', 0),
-                total_amount=reservation_data.get('total_amount', 0),
-                paid_amount=reservation_data.get('paid_amount', 0),
-                package_type=reservation_data.get('package_type', 'فقط اسکان'),
-                guest_type=reservation_data.get('guest_type', 'حضوری')
-            )
-            
-            session.add(reservation)
-            session.commit()  # کامیت نهایی
-            print(f"✅ رزرو ایجاد شد با ID: {reservation.id}")
-            
-            # ثبت لاگ
-            new_data = {
-                'room_id': reservation.room_id,
-                'guest_id': reservation.guest_id,
-                'check_in': reservation.check_in.isoformat(),
-                'check_out': reservation.check_out.isoformat(),
-                'status': reservation.status,
-                'adults': reservation.adults,
-                'children': reservation.children,
-                'total_amount': reservation.total_amount,
-                'package_type': reservation.package_type,
-                'guest_type': reservation.guest_type
-            }
-            
-            log_success = self.log_system_action(
-                action="create",
-                table_name="reservations",
-                record_id=reservation.id,
-                old_data=None,
-                new_data=new_data,
-                changed_by=changed_by,
-                description="ثبت رزرو جدید"
-            )
-            
-            if log_success:
-                print(f"✅ لاگ رزرو {reservation.id} ثبت شد")
-            else:
-                print(f"⚠️ رزرو ذخیره شد اما ثبت لاگ با مشکل مواجه شد")
-            
-            return True, "رزرو با موفقیت ثبت شد", reservation.id
-            
+            rooms = self.room_catalog.with_capacity(guests)
         except Exception as e:
-            print(f"❌ خطا در ثبت رزرو: {e}")
-            session.rollback()
-            import traceback
-            traceback.print_exc()
-            return False, f"خطا در ثبت رزرو: {str(e)}", None
-        finally:
-            session.close()
-            print("🔒 session بسته شد")
+            print(f"خطا در دریافت اتاق‌ها: {e}")
+            return []
+        
+        stay_duration = (check_out - check_in).days
+        available_rooms = []
+        for room in rooms:
+            is_available, conflicts = self.get_room_availability_with_back_to_back(room['id'], check_in, check_out)
+            if not is_available:
+                continue
+            
+            available_rooms.append({
+                'id': room['id'],
+                'number': room['number'],
+                'type': room['type'],
+                'capacity': room['capacity'],
+                'price': room['price'],
+                'nights': stay_duration,
+                'total_price': room['price'] * stay_duration,
+                'has_back_to_back': any(c['type'] == 'back_to_back_possible' for c in conflicts)
+            })
         
+        return available_rooms
+    
     def get_suggested_rooms(self, check_in, check_out, capacity):
         """دریافت اتاق‌های پیشنهادی با ظرفیت مناسب"""
-        session = self.Session()
-        try:
-            suitable_rooms = session.query(Room).filter(
-                Room.is_active == True,
-                Room.capacity >= capacity
-            ).all()
-            
-            available_rooms = []
-            for room in suitable_rooms:
-                if self.is_room_available(room.id, check_in, check_out):
-                    available_rooms.append(room)
-            
-            return available_rooms
-            
-        except Exception as e:
-            print(f"خطا در دریافت اتاق‌های پیشنهادی: {e}")
-            return []
-        finally:
-            session.close()
+        return self.find_available_rooms(check_in, check_out, capacity)
     
     def get_room_conflicts(self, room_id, check_in, check_out):
         """دریافت رزروهای متضاد برای یک اتاق"""
-        session = self.Session()
         try:
-            conflicts = session.query(Reservation, Guest).join(
-                Guest, and_(Reservation.guest_id == Guest.id)
-            ).filter(
-                Reservation.room_id == room_id,
-                Reservation.status.in_(['confirmed', 'checked_in']),
-                or_(
-                    and_(Reservation.check_in < check_out, Reservation.check_out > check_in)
-                )
-            ).all()
+            conflicts = self.availability_index.overlapping(room_id, check_in, check_out)
             
             conflict_info = []
-            for reservation, guest in conflicts:
+            for entry in conflicts:
                 conflict_info.append({
-                    'guest_name': f"{guest.first_name} {guest.last_name}",
-                    'check_in': reservation.check_in,
-                    'check_out': reservation.check_out,
-                    'status': reservation.status
+                    'guest_name': entry['guest_name'],
+                    'check_in': entry['check_in'],
+                    'check_out': entry['check_out'],
+                    'status': entry['status']
                 })
             
             return conflict_info
@@ -463,70 +401,370 @@ class ReservationManager:
         except Exception as e:
             print(f"خطا در دریافت تضادها: {e}")
             return []
-        finally:
-            session.close()
     
     def get_reservation_for_date(self, room_id, date):
         """دریافت رزرو برای یک اتاق در تاریخ مشخص"""
+        # اتاق خالی بدون مراجعه به دیتابیس تشخیص داده می‌شود
+        entry = self.availability_index.at(room_id, date)
+        if not entry:
+            return None
+        
         session = self.Session()
         try:
-            from sqlalchemy import and_
-            
-            reservation = session.query(Reservation, Guest).join(
+            return session.query(Reservation, Guest).join(
                 Guest, 
                 and_(Reservation.guest_id == Guest.id)
             ).filter(
-                Reservation.room_id == room_id,
-                Reservation.check_in <= date,
-                Reservation.check_out > date,
-                Reservation.status.in_(['confirmed', 'checked_in'])
+                Reservation.id == entry['reservation_id']
             ).first()
-            
-            return reservation
         except Exception as e:
             print(f"خطا در دریافت رزرو: {e}")
             return None
         finally:
             session.close()
     
-    def search_reservations(self, search_text):
-        """جستجو بر اساس نام مهمان یا شماره اتاق"""
+    def search(self, search_text, kinds=('guest', 'reservation'), limit=50):
+        """جستجوی سریع مهمانان و رزروها با ایندکس FTS (models.search_index)
+        
+        نام و نام خانوادگی، کد ملی، تلفن، ایمیل، کد پیگیری و شماره اتاق جستجو می‌شوند و حروف
+        عربی/فارسی، نیم‌فاصله، اعراب و ارقام فارسی یکسان‌سازی می‌شوند. خروجی حداکثر limit
+        دیکشنری به ترتیب رتبه است با کلیدهای kind ('guest' یا 'reservation')، id، guest_id،
+        guest_name، phone و id_number؛ رزروها room_number، check_in، check_out، status و
+        tracking_code را هم دارند.
+        """
+        if not normalize_text(search_text):
+            return []
+        
         session = self.Session()
+        try:
+            if self._has_search_index(session):
+                hits = search_index(session.connection(), search_text, kinds, limit)
+            else:
+                hits = self._search_hits_like(session, search_text, kinds, limit)
+            
+            guest_ids = [record_id for kind, record_id in hits if kind == 'guest']
+            reservation_ids = [record_id for kind, record_id in hits if kind == 'reservation']
+            results = {}
+            
+            if guest_ids:
+                for guest in session.query(
+                    Guest.id, Guest.first_name, Guest.last_name, Guest.phone, Guest.id_number
+                ).filter(Guest.id.in_(guest_ids)):
+                    results[('guest', guest.id)] = {
+                        'kind': 'guest',
+                        'id': guest.id,
+                        'guest_id': guest.id,
+                        'guest_name': f"{guest.first_name} {guest.last_name}",
+                        'phone': guest.phone,
+                        'id_number': guest.id_number
+                    }
+            
+            if reservation_ids:
+                for row in session.query(
+                    Reservation.id,
+                    Reservation.guest_id,
+                    Reservation.check_in,
+                    Reservation.check_out,
+                    Reservation.status,
+                    Reservation.tracking_code,
+                    Guest.first_name,
+                    Guest.last_name,
+                    Guest.phone,
+                    Guest.id_number,
+                    Room.room_number
+                ).outerjoin(
+                    Guest, Guest.id == Reservation.guest_id
+                ).outerjoin(
+                    Room, Room.id == Reservation.room_id
+                ).filter(Reservation.id.in_(reservation_ids)):
+                    results[('reservation', row.id)] = {
+                        'kind': 'reservation',
+                        'id': row.id,
+                        'guest_id': row.guest_id,
+                        'guest_name': f"{row.first_name or ''} {row.last_name or ''}".strip(),
+                        'phone': row.phone,
+                        'id_number': row.id_number,
+                        'room_number': row.room_number,
+                        'check_in': row.check_in,
+                        'check_out': row.check_out,
+                        'status': row.status,
+                        'tracking_code': row.tracking_code
+                    }
+            
+            return [results[hit] for hit in hits if hit in results]
         
+        except Exception as e:
+            print(f"خطا در جستجو: {e}")
+            return []
+        finally:
+            session.close()
+    
+    def _has_search_index(self, session):
+        """آیا ایندکس FTS جستجو در این دیتابیس ساخته شده است (یک بار بررسی می‌شود)"""
+        if self._search_index_available is None:
+            self._search_index_available = has_search_index(session.connection())
+        return self._search_index_available
+    
+    def _search_hits_like(self, session, search_text, kinds, limit):
+        """جستجوی جایگزین با LIKE برای دیتابیس‌هایی که ایندکس FTS ندارند"""
+        hits = []
+        pattern = f"%{search_text.strip()}%"
+        if not kinds or 'guest' in kinds:
+            guest_ids = session.query(Guest.id).filter(or_(
+                Guest.first_name.ilike(pattern),
+                Guest.last_name.ilike(pattern),
+                Guest.id_number.ilike(pattern),
+                Guest.phone.ilike(pattern),
+                Guest.email.ilike(pattern)
+            )).order_by(Guest.id.desc()).limit(limit)
+            hits.extend(('guest', row.id) for row in guest_ids)
+        if not kinds or 'reservation' in kinds:
+            reservation_ids = session.query(Reservation.id).outerjoin(
+                Guest, Guest.id == Reservation.guest_id
+            ).outerjoin(
+                Room, Room.id == Reservation.room_id
+            ).filter(or_(
+                Guest.first_name.ilike(pattern),
+                Guest.last_name.ilike(pattern),
+                Guest.id_number.ilike(pattern),
+                Guest.phone.ilike(pattern),
+                Guest.email.ilike(pattern),
+                Reservation.tracking_code.ilike(pattern),
+                Room.room_number.ilike(pattern)
+            )).order_by(Reservation.id.desc()).limit(limit)
+            hits.extend(('reservation', row.id) for row in reservation_ids)
+        return hits[:limit]
+    
+    def search_reservations(self, search_text, limit=50):
+        """جستجوی رزروها بر اساس نام مهمان، کد ملی، کد پیگیری یا شماره اتاق (به ترتیب رتبه)"""
+        reservation_ids = [
+            result['id'] for result in self.search(search_text, kinds=('reservation',), limit=limit)
+        ]
+        if not reservation_ids:
+            return []
+        
+        session = self.Session()
         try:
-            from sqlalchemy import and_
-            
-            # جستجو در مهمانان
-            guest_results = session.query(Reservation, Guest).join(
-                Guest, and_(Reservation.guest_id == Guest.id)
-            ).filter(
-                or_(
-                    Guest.first_name.ilike(f"%{search_text}%"),
-                    Guest.last_name.ilike(f"%{search_text}%")
-                )
-            ).all()
-            
-            # جستجو در اتاق‌ها
-            room_results = session.query(Reservation, Room).join(
-                Room, and_(Reservation.room_id == Room.id)
-            ).filter(
-                Room.room_number.ilike(f"%{search_text}%")
-            ).all()
-            
-            # ترکیب نتایج
-            all_results = list(set([r[0] for r in guest_results] + [r[0] for r in room_results]))
-            return all_results
-            
+            reservations = {
+                reservation.id: reservation
+                for reservation in session.query(Reservation).filter(Reservation.id.in_(reservation_ids))
+            }
+            return [reservations[reservation_id] for reservation_id in reservation_ids if reservation_id in reservations]
+        
         except Exception as e:
             print(f"خطا در جستجو: {e}")
             return []
         finally:
             session.close()
+    
+    # کلیدهای مرتب‌سازی فهرست مهمانان (get_guest_page)
+    GUEST_SORT_KEYS = ('first_name', 'last_name', 'phone', 'email', 'last_check_in')
+    
+    def _guest_scope_filter(self, scope):
+        """شرط SQL محدوده فهرست مهمانان: 'active' (دارای رزرو checked_in)، 'checked_out' یا 'has_reservation'"""
+        if scope == 'active':
+            return exists().where(Reservation.guest_id == Guest.id, Reservation.status == 'checked_in')
+        if scope == 'checked_out':
+            return exists().where(Reservation.guest_id == Guest.id, Reservation.status == 'checked_out')
+        if scope == 'has_reservation':
+            return exists().where(Reservation.guest_id == Guest.id)
+        return None
+    
+    def get_guest_page(self, scope='all', search=None, status=None, guest_type=None,
+                       sort_key='last_name', descending=False, after=None, limit=100):
+        """یک صفحه از فهرست مهمانان با صفحه‌بندی keyset
+        
+        محدوده تب (scope)، فیلتر وضعیت (status با همان مقادیر scope)، نوع مهمان آخرین رزرو،
+        متن جستجو (نام، تلفن و ایمیل) و مرتب‌سازی همه در SQL اعمال می‌شوند و فقط limit ردیف
+        خوانده می‌شود. after کلید مرتب‌سازی آخرین ردیف صفحه قبل است و صفحه بعد با مقایسه
+        row value از همان‌جا ادامه پیدا می‌کند؛ هزینه هر صفحه به عمق آن بستگی ندارد.
+        
+        خروجی (rows, next_after) است. rows لیست دیکشنری‌هایی با کلیدهای id، first_name،
+        last_name، phone، email، last_check_in، guest_type، room_number و is_active است و
+        next_after برای صفحه آخر None است.
+        """
+        session = self.Session()
+        try:
+            last_check_in = select(func.max(Reservation.check_in)).where(
+                Reservation.guest_id == Guest.id
+            ).correlate(Guest).scalar_subquery()
+            
+            # NULL با رشته خالی جایگزین می‌شود تا مقایسه keyset همیشه تعریف‌شده باشد
+            sort_columns = {
+                'first_name': (Guest.first_name, Guest.last_name),
+                'last_name': (Guest.last_name, Guest.first_name),
+                'phone': (func.coalesce(Guest.phone, ''),),
+                'email': (func.coalesce(Guest.email, ''),),
+                'last_check_in': (type_coerce(func.coalesce(last_check_in, ''), String),),
+            }[sort_key] + (Guest.id,)
+            
+            query = session.query(*[column.label(f'key_{i}') for i, column in enumerate(sort_columns)])
+            
+            for scope_name in (scope, status):
+                condition = self._guest_scope_filter(scope_name)
+                if condition is not None:
+                    query = query.filter(condition)
+            
+            if guest_type:
+                last_guest_type = select(Reservation.guest_type).where(
+                    Reservation.guest_id == Guest.id
+                ).order_by(
+                    Reservation.check_in.desc(), Reservation.id.desc()
+                ).limit(1).correlate(Guest).scalar_subquery()
+                query = query.filter(last_guest_type == guest_type)
+            
+            if search and self._has_search_index(session):
+                # ایندکس FTS (models.search_index) به جای LIKE با wildcard ابتدایی
+                guest_ids = matching_ids(search, 'guest')
+                if guest_ids is not None:
+                    query = query.filter(Guest.id.in_(guest_ids))
+            elif search:
+                pattern = f"%{search.strip()}%"
+                query = query.filter(or_(
+                    Guest.first_name.ilike(pattern),
+                    Guest.last_name.ilike(pattern),
+                    (Guest.first_name + ' ' + Guest.last_name).ilike(pattern),
+                    Guest.id_number.ilike(pattern),
+                    Guest.phone.ilike(pattern),
+                    Guest.email.ilike(pattern)
+                ))
+            
+            if after is not None:
+                keyset = tuple_(*sort_columns)
+                query = query.filter(keyset < tuple_(*after) if descending else keyset > tuple_(*after))
+            
+            order = [column.desc() if descending else column for column in sort_columns]
+            # یک ردیف اضافه فقط برای دانستن اینکه صفحه بعدی وجود دارد یا نه
+            keys = [tuple(row) for row in query.order_by(*order).limit(limit + 1).all()]
+            
+            next_after = keys[limit - 1] if len(keys) > limit else None
+            keys = keys[:limit]
+            
+            guest_ids = [key[-1] for key in keys]
+            details = self._guest_page_details(session, guest_ids)
+            return [details[guest_id] for guest_id in guest_ids if guest_id in details], next_after
+        
+        except Exception as e:
+            print(f"خطا در دریافت لیست مهمانان: {e}")
+            return [], None
+        finally:
+            session.close()
+    
+    def _guest_page_details(self, session, guest_ids):
+        """آخرین رزرو و اقامت فعال (با شماره اتاق) مهمانان یک صفحه با یک کوئری"""
+        if not guest_ids:
+            return {}
+        
+        # آخرین رزرو هر مهمان (بر اساس تاریخ ورود)
+        last_ranked = select(
+            Reservation.guest_id,
+            Reservation.check_in,
+            Reservation.guest_type,
+            func.row_number().over(
+                partition_by=Reservation.guest_id,
+                order_by=(Reservation.check_in.desc(), Reservation.id.desc())
+            ).label('rank')
+        ).where(Reservation.guest_id.in_(guest_ids)).subquery()
+        
+        # اقامت فعال هر مهمان
+        active_ranked = select(
+            Reservation.guest_id,
+            Reservation.room_id,
+            func.row_number().over(
+                partition_by=Reservation.guest_id,
+                order_by=(Reservation.check_in.desc(), Reservation.id.desc())
+            ).label('rank')
+        ).where(
+            Reservation.guest_id.in_(guest_ids),
+            Reservation.status == 'checked_in'
+        ).subquery()
+        
+        rows = session.query(
+            Guest.id,
+            Guest.first_name,
+            Guest.last_name,
+            Guest.phone,
+            Guest.email,
+            last_ranked.c.check_in.label('last_check_in'),
+            last_ranked.c.guest_type,
+            Room.room_number,
+            active_ranked.c.guest_id.isnot(None).label('is_active')
+        ).outerjoin(
+            last_ranked, and_(last_ranked.c.guest_id == Guest.id, last_ranked.c.rank == 1)
+        ).outerjoin(
+            active_ranked, and_(active_ranked.c.guest_id == Guest.id, active_ranked.c.rank == 1)
+        ).outerjoin(
+            Room, Room.id == active_ranked.c.room_id
+        ).filter(Guest.id.in_(guest_ids)).all()
+        
+        return {
+            row.id: {
+                'id': row.id,
+                'first_name': row.first_name,
+                'last_name': row.last_name,
+                'phone': row.phone,
+                'email': row.email,
+                'last_check_in': row.last_check_in,
+                'guest_type': row.guest_type,
+                'room_number': row.room_number,
+                'is_active': bool(row.is_active)
+            }
+            for row in rows
+        }
+    
+    def get_month_cell_grid(self, jalali_year, jalali_month, room_ids=None):
+        """دریافت جدول کامل سلول‌های رک (اتاق × روز) برای یک ماه شمسی با یک کوئری
+
+        خروجی دیکشنری {room_id: {day: cell_data}} است که day شماره روز ماه شمسی است
+        و cell_data همان ساختار قبلی سلول رک (شامل cell_type برای Back-to-Back) را دارد.
+        با room_ids فقط ردیف همان اتاق‌ها ساخته می‌شود (بروزرسانی جزئی رک).
+        """
+        month_start = jdatetime.date(jalali_year, jalali_month, 1)
+        if jalali_month == 12:
+            next_month_start = jdatetime.date(jalali_year + 1, 1, 1)
+        else:
+            next_month_start = jdatetime.date(jalali_year, jalali_month + 1, 1)
+
+        return self.get_cell_grid(month_start.togregorian(), next_month_start.togregorian(), room_ids)
+
+    def get_cell_grid(self, start_date, end_date, room_ids=None):
+        """جدول سلول‌های رک برای بازه دلخواه [start_date, end_date) (رک، چاپ و خروجی‌ها)
+
+        day در خروجی شماره روز از ابتدای بازه است (از 1). دسته‌بندی سلول‌ها با
+        models.cell_grid در یک پیمایش خطی روی رزروهای هر اتاق انجام می‌شود.
+        """
+        session = self.Session()
+        try:
+            # رزروهایی که با بازه تداخل دارند یا در روز اول آن خروج دارند (برای تشخیص Back-to-Back)
+            query = session.query(
+                Reservation.id,
+                Reservation.room_id,
+                Reservation.check_in,
+                Reservation.check_out,
+                Reservation.package_type,
+                Guest.first_name,
+                Guest.last_name
+            ).join(
+                Guest, Reservation.guest_id == Guest.id
+            ).filter(
+                Reservation.status.in_(['confirmed', 'checked_in']),
+                Reservation.check_in < datetime.combine(end_date, datetime.min.time()),
+                Reservation.check_out >= datetime.combine(start_date, datetime.min.time())
+            )
+            if room_ids is not None:
+                query = query.filter(Reservation.room_id.in_(list(room_ids)))
+            rows = query.order_by(Reservation.room_id, Reservation.check_in, Reservation.id).all()
+
+            return build_cell_grid(rows, start_date, end_date)
+
+        except Exception as e:
+            print(f"❌ خطا در بارگذاری داده‌های رک: {e}")
+            return {}
+        finally:
+            session.close()
 
     def get_room_availability_with_back_to_back(self, room_id, check_in, check_out):
         """بررسی موجود بودن اتاق با پشتیبانی کامل از Back-to-Back"""
-        session = self.Session()
-        
         try:
             # تبدیل به datetime اگر string است
             if isinstance(check_in, str):
@@ -534,40 +772,12 @@ class ReservationManager:
             if isinstance(check_out, str):
                 check_out = datetime.fromisoformat(check_out)
             
-            print(f"🔍 بررسی اتاق {room_id}")
-            print(f"   ورود اصلی: {check_in} (نوع: {type(check_in)})")
-            print(f"   خروج اصلی: {check_out} (نوع: {type(check_out)})")
-            
-            # تنظیم زمان‌های استاندارد هتل - روش صحیح و ساده
-            if hasattr(check_in, 'hour'):  # اگر datetime است
-                check_in_time = datetime(check_in.year, check_in.month, check_in.day, 14, 0, 0)
-            else:  # اگر date است
-                check_in_time = datetime(check_in.year, check_in.month, check_in.day, 14, 0, 0)
-                
-            if hasattr(check_out, 'hour'):  # اگر datetime است
-                check_out_time = datetime(check_out.year, check_out.month, check_out.day, 12, 0, 0)
-            else:  # اگر date است
-                check_out_time = datetime(check_out.year, check_out.month, check_out.day, 12, 0, 0)
-            
-            print(f"   ورود تنظیم شده: {check_in_time}")
-            print(f"   خروج تنظیم شده: {check_out_time}")
+            # تنظیم زمان‌های استاندارد هتل (ورود 14:00 و خروج 12:00)
+            check_in_time = datetime(check_in.year, check_in.month, check_in.day, 14, 0, 0)
+            check_out_time = datetime(check_out.year, check_out.month, check_out.day, 12, 0, 0)
             
-            # پیدا کردن رزروهای متضاد
-            from sqlalchemy import and_, or_
-            
-            conflicting_reservations = session.query(Reservation).filter(
-                Reservation.room_id == room_id,
-                Reservation.status.in_(['confirmed', 'checked_in']),
-                or_(
-                    # تداخل عادی
-                    and_(
-                        Reservation.check_in < check_out_time,
-                        Reservation.check_out > check_in_time
-                    )
-                )
-            ).all()
-            
-            print(f"📊 تعداد رزروهای متضاد: {len(conflicting_reservations)}")
+            # پیدا کردن رزروهای متضاد از ایندکس حافظه
+            conflicting_reservations = self.availability_index.overlapping(room_id, check_in_time, check_out_time)
             
             # اگر رزرو متضاد وجود ندارد، اتاق آزاد است
             if not conflicting_reservations:
@@ -578,33 +788,28 @@ class ReservationManager:
             conflicts_info = []
             
             for reservation in conflicting_reservations:
-                print(f"  🔍 بررسی رزرو {reservation.id}: {reservation.check_in} تا {reservation.check_out}")
-                
                 # اگر رزرو موجود دقیقاً در زمان check-out تمام شود و رزرو جدید شروع شود
-                if (reservation.check_out == check_in_time and 
-                    reservation.status == 'checked_in'):
+                if (reservation['check_out'] == check_in_time and 
+                    reservation['status'] == 'checked_in'):
                     # Back-to-Back ممکن است
                     conflicts_info.append({
                         'type': 'back_to_back_possible',
-                        'reservation_id': reservation.id,
-                        'check_out': reservation.check_out,
+                        'reservation_id': reservation['reservation_id'],
+                        'check_out': reservation['check_out'],
                         'new_check_in': check_in_time,
                         'message': 'امکان Back-to-Back وجود دارد'
                     })
-                    print(f"  ✅ Back-to-Back ممکن است با رزرو {reservation.id}")
                 else:
                     # تداخل واقعی وجود دارد
                     back_to_back_possible = False
                     conflicts_info.append({
                         'type': 'conflict',
-                        'reservation_id': reservation.id,
-                        'check_in': reservation.check_in,
-                        'check_out': reservation.check_out,
-                        'message': f'تداخل با رزرو {reservation.id}'
+                        'reservation_id': reservation['reservation_id'],
+                        'check_in': reservation['check_in'],
+                        'check_out': reservation['check_out'],
+                        'message': f"تداخل با رزرو {reservation['reservation_id']}"
                     })
-                    print(f"  ❌ تداخل با رزرو {reservation.id}")
             
-            print(f"🎯 نتیجه: Back-to-Back ممکن است = {back_to_back_possible}")
             return back_to_back_possible, conflicts_info
             
         except Exception as e:
@@ -612,8 +817,6 @@ class ReservationManager:
             import traceback
             traceback.print_exc()
             return False, [{'type': 'error', 'message': str(e)}]
-        finally:
-            session.close()
     
     def is_room_available(self, room_id, check_in, check_out):
         """بررسی موجود بودن اتاق در بازه زمانی مشخص با پشتیبانی از Back-to-Back"""
@@ -672,29 +875,12 @@ class ReservationManager:
 
     def get_room_back_to_back_status(self, room_id, date):
         """دریافت وضعیت Back-to-Back برای یک اتاق در تاریخ مشخص"""
-        session = self.Session()
         try:
-            from sqlalchemy import and_, or_
-            
             target_date = date.replace(hour=14, minute=0, second=0, microsecond=0)
             
-            # رزروی که در این تاریخ تمام می‌شود
-            ending_reservation = session.query(Reservation, Guest).join(
-                Guest, and_(Reservation.guest_id == Guest.id)
-            ).filter(
-                Reservation.room_id == room_id,
-                Reservation.check_out == target_date,
-                Reservation.status.in_(['confirmed', 'checked_in'])
-            ).first()
-            
-            # رزروی که در این تاریخ شروع می‌شود
-            starting_reservation = session.query(Reservation, Guest).join(
-                Guest, and_(Reservation.guest_id == Guest.id)
-            ).filter(
-                Reservation.room_id == room_id,
-                Reservation.check_in == target_date,
-                Reservation.status.in_(['confirmed', 'checked_in'])
-            ).first()
+            # رزروی که در این تاریخ تمام می‌شود و رزروی که در این تاریخ شروع می‌شود
+            ending_reservation = self.availability_index.ending_at(room_id, target_date)
+            starting_reservation = self.availability_index.starting_at(room_id, target_date)
             
             result = {
                 'has_ending': ending_reservation is not None,
@@ -703,22 +889,18 @@ class ReservationManager:
             }
             
             if ending_reservation:
-                res, guest = ending_reservation
-                result['ending_guest'] = f"{guest.first_name} {guest.last_name}"
-                result['ending_reservation_id'] = res.id
+                result['ending_guest'] = ending_reservation['guest_name']
+                result['ending_reservation_id'] = ending_reservation['reservation_id']
                 
             if starting_reservation:
-                res, guest = starting_reservation
-                result['starting_guest'] = f"{guest.first_name} {guest.last_name}"
-                result['starting_reservation_id'] = res.id
+                result['starting_guest'] = starting_reservation['guest_name']
+                result['starting_reservation_id'] = starting_reservation['reservation_id']
                 
             return result
             
         except Exception as e:
             print(f"❌ خطا در دریافت وضعیت Back-to-Back: {e}")
             return {'has_ending': False, 'has_starting': False, 'is_back_to_back': False}
-        finally:
-            session.close()
 
     
     def get_room_status(self, room_id, date):
@@ -742,7 +924,7 @@ class ReservationManager:
         session = self.Session()
         
         try:
-            total_rooms = session.query(Room).filter(Room.is_active == True).count()
+            total_rooms = self.room_catalog.count()
             occupied_rooms = session.query(Reservation).filter(
                 Reservation.check_in <= date,
                 Reservation.check_out > date,
@@ -757,6 +939,103 @@ class ReservationManager:
         finally:
             session.close()
     
+    def get_monthly_report(self, jalali_year, jalali_month, months=1):
+        """آمار months ماه شمسی از (jalali_year, jalali_month) با یک کوئری GROUP BY روی جدول تقویم
+        
+        برای هر ماه: تعداد روزها و روزهای تعطیل، تعداد رزروها و درآمد (بر اساس ماه ورود و
+        مثل گزارش قبلی شامل همه وضعیت‌ها) و شب-اتاق‌های اشغال شده (رزروهای تایید شده، مقیم و خروجی)
+        با نرخ اشغال واقعی = شب-اتاق‌ها / (تعداد اتاق‌ها × روزهای ماه).
+        خروجی لیست دیکشنری‌هایی با کلیدهای year، month، days، holidays، reservations،
+        revenue، room_nights و occupancy به ترتیب ماه است. گزارش فقط می‌خواند؛ جدول تقویم
+        در create_all پر و تمدید می‌شود.
+        """
+        start_date, end_date = month_bounds(jalali_year, jalali_month, months)
+        start_dt = datetime.combine(start_date, datetime.min.time())
+        end_dt = datetime.combine(end_date, datetime.min.time())
+        
+        session = self.Session()
+        try:
+            month_key = (CalendarDay.jalali_year, CalendarDay.jalali_month)
+            in_range = (CalendarDay.date >= start_date, CalendarDay.date < end_date)
+            
+            days = select(
+                *month_key,
+                func.count().label('days'),
+                func.sum(cast(CalendarDay.is_holiday, Integer)).label('holidays')
+            ).where(*in_range).group_by(*month_key).subquery()
+            
+            # رزروها با شرط بازه روی خود ستون check_in (ایندکس) پیدا می‌شوند و هر کدام فقط
+            # با کلید اصلی به روز ورودش در تقویم وصل می‌شود
+            bookings = select(
+                *month_key,
+                func.count(Reservation.id).label('reservations'),
+                func.sum(Reservation.total_amount).label('revenue')
+            ).select_from(Reservation).join(
+                CalendarDay, CalendarDay.date == func.date(Reservation.check_in)
+            ).where(
+                Reservation.check_in >= start_dt,
+                Reservation.check_in < end_dt
+            ).group_by(*month_key).subquery()
+            
+            # هر رزرو همپوشان با بازه (شرط روی خود ستون‌ها) × شب‌هایش در همان بازه؛ مرز شب‌ها
+            # از ردیف رزرو حساب و با CASE به بازه بریده می‌شود (max/min دوآرگومانی فقط در SQLite
+            # هست) تا روزها با بازه کلید اصلی تقویم خوانده شوند
+            stay_start = func.date(Reservation.check_in)
+            stay_end = func.date(Reservation.check_out)
+            first_night = case((stay_start > start_date, stay_start), else_=start_date)
+            last_day = case((stay_end < end_date, stay_end), else_=end_date)
+            nights = select(
+                *month_key,
+                func.count().label('room_nights')
+            ).select_from(Reservation).join(
+                CalendarDay, and_(
+                    CalendarDay.date >= first_night,
+                    CalendarDay.date < last_day
+                )
+            ).where(
+                Reservation.status.in_(['confirmed', 'checked_in', 'checked_out']),
+                Reservation.check_in < end_dt,
+                Reservation.check_out > start_dt
+            ).group_by(*month_key).subquery()
+            
+            def same_month(other):
+                return and_(other.c.jalali_year == days.c.jalali_year, other.c.jalali_month == days.c.jalali_month)
+            
+            rows = session.query(
+                days.c.jalali_year,
+                days.c.jalali_month,
+                days.c.days,
+                days.c.holidays,
+                func.coalesce(bookings.c.reservations, 0).label('reservations'),
+                func.coalesce(bookings.c.revenue, 0).label('revenue'),
+                func.coalesce(nights.c.room_nights, 0).label('room_nights')
+            ).outerjoin(
+                bookings, same_month(bookings)
+            ).outerjoin(
+                nights, same_month(nights)
+            ).order_by(days.c.jalali_year, days.c.jalali_month).all()
+            
+            total_rooms = self.room_catalog.count()
+            return [
+                {
+                    'year': row.jalali_year,
+                    'month': row.jalali_month,
+                    'days': row.days,
+                    'holidays': row.holidays or 0,
+                    'reservations': row.reservations,
+                    'revenue': row.revenue,
+                    'room_nights': row.room_nights,
+                    'occupancy': (row.room_nights / (total_rooms * row.days) * 100) if total_rooms else 0
+                }
+                for row in rows
+            ]
+        
+        except Exception as e:
+            print(f"❌ خطا در گزارش ماهانه: {e}")
+            return []
+        finally:
+            session.close()
+    
     def get_todays_arrivals(self):
         """دریافت تعداد ورودی‌های امروز"""
         session = self.Session()
@@ -0,0 +1,99 @@
+import threading
+
+from models.models import Room
+
+
+class RoomCatalog:
+    """فهرست اتاق‌های فعال هتل در حافظه
+
+    همه اتاق‌های فعال با یک کوئری خوانده و بر اساس id و شماره اتاق نگه داشته
+    می‌شوند. رک، دیالوگ رزرو، جستجوی اتاق خالی و گزارش‌ها به جای کوئری جداگانه
+    برای هر اتاق از این فهرست استفاده می‌کنند. با هر تغییر جدول rooms در فید
+    تغییرات (models.change_feed) فهرست در اولین استفاده بعدی دوباره خوانده می‌شود.
+
+    هر اتاق یک دیکشنری است:
+        {'id', 'number', 'type', 'floor', 'capacity', 'max_guests', 'price', 'status'}
+    """
+
+    def __init__(self, session_factory):
+        self.Session = session_factory
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._rooms = []          # مرتب بر اساس طبقه و شماره اتاق
+        self._by_id = {}
+        self._by_number = {}
+
+    def ensure_loaded(self):
+        """بارگذاری تنبل فهرست در اولین استفاده"""
+        with self._lock:
+            if not self._loaded:
+                self.reload()
+
+    def reload(self):
+        """خواندن دوباره همه اتاق‌های فعال با یک کوئری"""
+        session = self.Session()
+        try:
+            rows = session.query(
+                Room.id,
+                Room.room_number,
+                Room.room_type,
+                Room.floor,
+                Room.capacity,
+                Room.max_guests,
+                Room.price_per_night,
+                Room.status
+            ).filter(Room.is_active == True).all()
+        finally:
+            session.close()
+
+        rooms = [
+            {
+                'id': row.id,
+                'number': row.room_number,
+                'type': row.room_type,
+                'floor': row.floor,
+                'capacity': row.capacity,
+                'max_guests': row.max_guests,
+                'price': row.price_per_night,
+                'status': row.status
+            }
+            for row in rows
+        ]
+        # "1001" بعد از "999"؛ شماره‌ها رشته هستند
+        rooms.sort(key=lambda room: (room['floor'], len(room['number']), room['number']))
+
+        with self._lock:
+            self._rooms = rooms
+            self._by_id = {room['id']: room for room in rooms}
+            self._by_number = {room['number']: room for room in rooms}
+            self._loaded = True
+
+    def invalidate(self):
+        """علامت‌گذاری برای خواندن دوباره در اولین استفاده بعدی"""
+        with self._lock:
+            self._loaded = False
+
+    def all(self):
+        """لیست همه اتاق‌های فعال (مرتب بر اساس طبقه و شماره)"""
+        self.ensure_loaded()
+        with self._lock:
+            return list(self._rooms)
+
+    def get(self, room_id):
+        self.ensure_loaded()
+        with self._lock:
+            return self._by_id.get(room_id)
+
+    def by_number(self, room_number):
+        self.ensure_loaded()
+        with self._lock:
+            return self._by_number.get(room_number)
+
+    def with_capacity(self, guests):
+        """اتاق‌هایی که ظرفیت حداقل guests نفر دارند"""
+        return [room for room in self.all() if room['capacity'] >= guests]
+
+    def count(self):
+        self.ensure_loaded()
+        with self._lock:
+            return len(self._rooms)
@@ -0,0 +1,297 @@
+from sqlalchemy import text, inspect, column, bindparam, event, Integer
+
+# جدول FTS5 جستجوی مهمانان و رزروها (توکنایزر trigram: جستجوی زیررشته با ایندکس)
+SEARCH_TABLE = 'search_index'
+SEARCH_COLUMNS = ('guest_name', 'id_number', 'phone', 'email', 'tracking_code', 'room_number')
+# وزن ستون‌ها در bm25 به همان ترتیب SEARCH_COLUMNS
+SEARCH_WEIGHTS = (10.0, 8.0, 5.0, 4.0, 8.0, 4.0)
+
+# rowid هر ردیف از نوع و id رکورد ساخته می‌شود تا بروزرسانی هر رکورد مستقیم باشد
+KIND_GUEST = 0
+KIND_RESERVATION = 1
+KIND_NAMES = {KIND_GUEST: 'guest', KIND_RESERVATION: 'reservation'}
+
+# کوتاه‌ترین زیررشته‌ای که ایندکس trigram پیدا می‌کند
+MIN_TRIGRAM_LENGTH = 3
+
+# یکسان‌سازی حروف عربی/فارسی برای ایندکس و متن جستجو
+NORMALIZE_MAP = [
+    ('ي', 'ی'), ('ى', 'ی'),
+    ('ك', 'ک'),
+    ('ة', 'ه'), ('ۀ', 'ه'),
+    ('أ', 'ا'), ('إ', 'ا'), ('ٱ', 'ا'),
+    ('ؤ', 'و'),
+    ('‌', ''), ('‍', ''), ('‎', ''), ('‏', ''),  # نیم‌فاصله و علامت‌های جهت
+    ('ـ', ''),  # کشیده
+] + [
+    (chr(code), '') for code in range(0x064B, 0x0653)  # اعراب (فتحه، کسره، ضمه، تنوین، تشدید، سکون)
+] + [
+    ('ٰ', ''),  # الف مقصوره کوچک
+] + [
+    (persian, str(digit)) for digit, persian in enumerate('۰۱۲۳۴۵۶۷۸۹')
+] + [
+    (arabic, str(digit)) for digit, arabic in enumerate('٠١٢٣٤٥٦٧٨٩')
+]
+
+_TRANSLATION = str.maketrans({source: target for source, target in NORMALIZE_MAP})
+
+
+def normalize_text(value):
+    """یکسان‌سازی متن برای ایندکس و جستجو (ی/ک عربی، نیم‌فاصله، اعراب و ارقام فارسی)"""
+    if not value:
+        return ''
+    return ' '.join(str(value).translate(_TRANSLATION).lower().split())
+
+
+# ستون‌هایی که تغییرشان ردیف ایندکس را عوض می‌کند
+GUEST_SEARCH_FIELDS = ('first_name', 'last_name', 'id_number', 'phone', 'email')
+RESERVATION_SEARCH_FIELDS = ('guest_id', 'room_id', 'tracking_code')
+ROOM_SEARCH_FIELDS = ('room_number',)
+
+# تریگرهای نسخه اول ایندکس که به تابع SQL ثبت‌شده در برنامه (hotel_normalize) نیاز داشتند
+LEGACY_TRIGGERS = (
+    'search_guests_ai', 'search_guests_au', 'search_guests_ad',
+    'search_reservations_ai', 'search_reservations_au', 'search_reservations_ad',
+    'search_rooms_au',
+)
+
+GUEST_SELECT = "SELECT g.id, g.first_name, g.last_name, g.id_number, g.phone, g.email FROM guests g"
+RESERVATION_SELECT = (
+    "SELECT r.id, g.first_name, g.last_name, g.id_number, g.phone, g.email, r.tracking_code, rm.room_number "
+    "FROM reservations r "
+    "LEFT JOIN guests g ON g.id = r.guest_id "
+    "LEFT JOIN rooms rm ON rm.id = r.room_id"
+)
+
+
+def _entry(rowid, first_name, last_name, id_number, phone, email, tracking_code='', room_number=''):
+    """ردیف ایندکس با مقادیر یکسان‌سازی‌شده (ترتیب کلیدها همان SEARCH_COLUMNS)"""
+    return {
+        'rowid': rowid,
+        'guest_name': normalize_text(f"{first_name or ''} {last_name or ''}"),
+        'id_number': normalize_text(id_number),
+        'phone': normalize_text(phone),
+        'email': normalize_text(email),
+        'tracking_code': normalize_text(tracking_code),
+        'room_number': normalize_text(room_number),
+    }
+
+
+def _guest_entries(rows):
+    return [_entry(row[0] * 2 + KIND_GUEST, *row[1:]) for row in rows]
+
+
+def _reservation_entries(rows):
+    return [_entry(row[0] * 2 + KIND_RESERVATION, *row[1:]) for row in rows]
+
+
+def _insert_entries(connection, entries):
+    if entries:
+        connection.execute(text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(SEARCH_COLUMNS)}) "
+            f"VALUES (:rowid, {', '.join(':' + name for name in SEARCH_COLUMNS)})"
+        ), entries)
+
+
+def _delete_rowids(connection, rowids):
+    if rowids:
+        connection.execute(
+            text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN :rowids").bindparams(bindparam('rowids', expanding=True)),
+            {'rowids': sorted(rowids)}
+        )
+
+
+def _ids_param(statement, name):
+    return text(statement).bindparams(bindparam(name, expanding=True))
+
+
+def reindex(connection, guest_ids=(), reservation_ids=(), room_ids=()):
+    """بروزرسانی ردیف‌های ایندکس از روی جدول‌های اصلی
+
+    ردیف مهمان‌های guest_ids، رزروهای reservation_ids و همه رزروهای آن مهمان‌ها و
+    اتاق‌های room_ids دوباره ساخته می‌شوند؛ رکوردهایی که دیگر وجود ندارند فقط حذف می‌شوند.
+    """
+    guest_ids = sorted(set(guest_ids))
+    reservation_ids = set(reservation_ids)
+    room_ids = sorted(set(room_ids))
+
+    if guest_ids:
+        _delete_rowids(connection, [guest_id * 2 + KIND_GUEST for guest_id in guest_ids])
+        rows = connection.execute(_ids_param(f"{GUEST_SELECT} WHERE g.id IN :ids", 'ids'), {'ids': guest_ids})
+        _insert_entries(connection, _guest_entries(rows))
+        reservation_ids.update(connection.execute(
+            _ids_param("SELECT id FROM reservations WHERE guest_id IN :ids", 'ids'), {'ids': guest_ids}
+        ).scalars())
+    if room_ids:
+        reservation_ids.update(connection.execute(
+            _ids_param("SELECT id FROM reservations WHERE room_id IN :ids", 'ids'), {'ids': room_ids}
+        ).scalars())
+
+    if reservation_ids:
+        reservation_ids = sorted(reservation_ids)
+        _delete_rowids(connection, [reservation_id * 2 + KIND_RESERVATION for reservation_id in reservation_ids])
+        rows = connection.execute(_ids_param(f"{RESERVATION_SELECT} WHERE r.id IN :ids", 'ids'), {'ids': reservation_ids})
+        _insert_entries(connection, _reservation_entries(rows))
+
+
+def _indexed_columns(connection):
+    return tuple(row[1] for row in connection.execute(text(f"PRAGMA table_info({SEARCH_TABLE})")))
+
+
+def create_search_index(connection):
+    """ساخت جدول FTS5 و پر کردن اولیه آن از داده‌های موجود؛ اگر جدول وجود دارد کاری انجام نمی‌شود"""
+    if _indexed_columns(connection):
+        return
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} "
+        f"USING fts5({', '.join(SEARCH_COLUMNS)}, tokenize='trigram')"
+    ))
+    rebuild_search_index(connection)
+
+
+def drop_legacy_triggers(connection):
+    """حذف تریگرهای نسخه اول ایندکس (همگام‌سازی حالا با SearchIndexSync انجام می‌شود)"""
+    for name in LEGACY_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def recreate_search_index(connection):
+    """ساخت دوباره جدول FTS5 با ستون‌های فعلی SEARCH_COLUMNS (FTS5 افزودن ستون را پشتیبانی نمی‌کند)"""
+    connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+    create_search_index(connection)
+
+
+def rebuild_search_index(connection):
+    """پر کردن دوباره کامل ایندکس (بعد از ساخت یا ورود داده از مسیری غیر از سشن‌های برنامه)"""
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    _insert_entries(connection, _guest_entries(connection.execute(text(GUEST_SELECT))))
+    _insert_entries(connection, _reservation_entries(connection.execute(text(RESERVATION_SELECT))))
+    count = connection.execute(text(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")).scalar()
+    print(f"   🔎 ایندکس جستجو با {count} ردیف ساخته شد")
+
+
+class SearchIndexSync:
+    """همگام نگه داشتن ایندکس با تغییرات ORM در همان تراکنش (رویداد after_flush سشن)
+
+    ردیف‌ها در پایتون با normalize_text ساخته می‌شوند و جدول‌های اصلی هیچ تریگر یا تابع
+    SQL وابسته به برنامه ندارند؛ نوشتن با ابزارهای دیگر (sqlite3، بازیابی پشتیبان) خطا
+    نمی‌دهد و فقط تا rebuild_search_index در جستجو دیده نمی‌شود. خطای ایندکس هم تراکنش
+    اصلی را متوقف نمی‌کند.
+    """
+
+    def __init__(self, session_factory):
+        self._available = None
+        event.listen(session_factory, 'after_flush', self._after_flush)
+
+    def _is_available(self, connection):
+        if self._available is None:
+            if connection.dialect.name != 'sqlite':
+                self._available = False
+            elif has_search_index(connection):
+                self._available = True
+            else:
+                return False  # شاید هنوز مایگریشن ایندکس اجرا نشده باشد
+        return self._available
+
+    def _after_flush(self, session, flush_context):
+        changes = {'guests': set(), 'reservations': set(), 'rooms': set()}
+        fields = {'guests': GUEST_SEARCH_FIELDS, 'reservations': RESERVATION_SEARCH_FIELDS, 'rooms': ROOM_SEARCH_FIELDS}
+        for operation, objects in (('insert', session.new), ('update', session.dirty), ('delete', session.deleted)):
+            for obj in objects:
+                table_name = getattr(obj, '__tablename__', None)
+                if table_name not in changes:
+                    continue
+                if operation == 'update':
+                    state = inspect(obj)
+                    if not any(state.attrs[name].history.has_changes() for name in fields[table_name]):
+                        continue
+                elif table_name == 'rooms':
+                    continue  # اتاق فقط با تغییر شماره روی ردیف رزروهایش اثر دارد
+                changes[table_name].add(obj.id)
+
+        if not any(changes.values()):
+            return
+
+        connection = session.connection()
+        if not self._is_available(connection):
+            return
+        try:
+            reindex(connection, changes['guests'], changes['reservations'], changes['rooms'])
+        except Exception as e:
+            print(f"⚠️ خطا در بروزرسانی ایندکس جستجو (با rebuild_search_index ترمیم می‌شود): {e}")
+
+
+def has_search_index(connection):
+    """آیا ایندکس FTS ساخته شده است (در دیتابیس‌های غیر SQLite ساخته نمی‌شود)"""
+    return inspect(connection).has_table(SEARCH_TABLE)
+
+
+def _like_pattern(token):
+    escaped = token.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def _match_conditions(tokens, params):
+    """شرط‌های WHERE برای کلمه‌های جستجو؛ True در خروجی یعنی MATCH (و رتبه bm25) در دسترس است"""
+    long_tokens = [token for token in tokens if len(token) >= MIN_TRIGRAM_LENGTH]
+    short_tokens = [token for token in tokens if len(token) < MIN_TRIGRAM_LENGTH]
+
+    conditions = []
+    if long_tokens:
+        conditions.append(f"{SEARCH_TABLE} MATCH :match")
+        params['match'] = ' AND '.join('"' + token.replace('"', '""') + '"' for token in long_tokens)
+
+    all_columns = " || ' ' || ".join(SEARCH_COLUMNS)
+    for i, token in enumerate(short_tokens):
+        conditions.append(f"({all_columns}) LIKE :short_{i} ESCAPE '\\'")
+        params[f'short_{i}'] = _like_pattern(token)
+    return conditions, bool(long_tokens)
+
+
+def search_index(connection, search_text, kinds=None, limit=50):
+    """جستجوی رتبه‌بندی‌شده در ایندکس
+
+    هر کلمه باید در یکی از ستون‌ها به صورت زیررشته پیدا شود. کلمه‌های سه حرفی و بلندتر
+    با MATCH روی ایندکس trigram پیدا و با bm25 رتبه‌بندی می‌شوند؛ کلمه‌های کوتاه‌تر
+    فقط روی همان نتیجه‌ها با LIKE بررسی می‌شوند (اگر همه کلمه‌ها کوتاه باشند، جدیدترین
+    رکوردها اول می‌آیند). kinds زیرمجموعه‌ای از ('guest', 'reservation') است.
+
+    خروجی لیست (kind, record_id) به ترتیب رتبه است.
+    """
+    tokens = normalize_text(search_text).split()
+    if not tokens:
+        return []
+
+    params = {'limit': limit}
+    conditions, ranked = _match_conditions(tokens, params)
+    if ranked:
+        order = f"bm25({SEARCH_TABLE}, {', '.join(str(weight) for weight in SEARCH_WEIGHTS)})"
+    else:
+        order = "rowid DESC"
+
+    if kinds:
+        kind_codes = [code for code, name in KIND_NAMES.items() if name in kinds]
+        conditions.append(f"rowid % 2 IN ({', '.join(str(code) for code in kind_codes)})")
+
+    rows = connection.execute(text(
+        f"SELECT rowid FROM {SEARCH_TABLE} WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT :limit"
+    ), params).fetchall()
+    return [(KIND_NAMES[row[0] % 2], row[0] // 2) for row in rows]
+
+
+def matching_ids(search_text, kind='guest'):
+    """زیرکوئری id همه رکوردهای یک نوع که با متن جستجو تطبیق دارند (برای فیلتر IN بدون محدودیت تعداد)
+
+    خروجی None است اگر متن جستجو خالی باشد.
+    """
+    tokens = normalize_text(search_text).split()
+    if not tokens:
+        return None
+
+    params = {}
+    conditions, _ = _match_conditions(tokens, params)
+    kind_code = next(code for code, name in KIND_NAMES.items() if name == kind)
+    conditions.append(f"rowid % 2 = {kind_code}")
+    return text(
+        f"SELECT rowid / 2 AS id FROM {SEARCH_TABLE} WHERE {' AND '.join(conditions)}"
+    ).bindparams(**params).columns(column('id', Integer))
@@ -1,53 +1,94 @@
-import threading
-import time
-from datetime import datetime
+from PyQt6.QtCore import QObject, QTimer, QThreadPool, pyqtSignal
 import os
 import sys
 
-sys.path.append(os.path.join(os.path.dirname(__file__), 'models'))
-from models import Reservation, Room
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ui'))
 
-class RealtimeManager:
-    def __init__(self, reservation_manager):
+from workers import BackgroundTask
+
+
+class RealtimeManager(QObject):
+    """رساندن رویدادهای فید تغییرات دیتابیس به نخ رابط کاربری
+
+    تغییرات همین برنامه بلافاصله بعد از commit و تغییرات ترمینال‌های دیگر از طریق
+    Redis (در صورت تنظیم) یا با بررسی ارزان PRAGMA data_version دریافت می‌شوند. رویدادهای نزدیک به هم در یک لیست
+    جمع و با سیگنال changes ارسال می‌شوند؛ هر رویداد دیکشنری‌ای با کلیدهای
+    seq، table، record_id، operation، payload و origin است.
+
+    پایش در یک QThreadPool اختصاصی با یک نخ اجرا می‌شود تا قفل یا کندی دیتابیس (تا
+    busy_timeout) نخ رابط کاربری را متوقف نکند؛ تا پایان هر پایش، پایش بعدی شروع نمی‌شود.
+    """
+
+    changes = pyqtSignal(list)
+    _incoming = pyqtSignal(list)  # از هر نخی emit می‌شود و در نخ این شیء دریافت می‌شود
+
+    def __init__(self, reservation_manager, poll_interval_ms=1000, batch_delay_ms=50, parent=None):
+        super().__init__(parent)
         self.reservation_manager = reservation_manager
-        self.last_update = datetime.now()
-        self.callbacks = []
-        self.running = True
-        self.thread = threading.Thread(target=self._monitor_changes)
-        self.thread.daemon = True
-        self.thread.start()
-    
-    def _monitor_changes(self):
-        """مانیتور تغییرات در پایگاه داده"""
-        while self.running:
-            try:
-                session = self.reservation_manager.Session()
-                latest_reservation = session.query(Reservation).order_by(
-                    Reservation.created_at.desc()
-                ).first()
-                
-                if latest_reservation and latest_reservation.created_at > self.last_update:
-                    self.last_update = latest_reservation.created_at
-                    self.notify_callbacks()
-                
-                session.close()
-                time.sleep(2)  # بررسی هر 2 ثانیه
-            except Exception as e:
-                print(f"خطا در مانیتورینگ: {e}")
-                time.sleep(5)
-    
+        self.change_feed = reservation_manager.db.change_feed
+        self.pending_events = []
+        self.polling = False
+
+        # اتصال پایش فید فقط از همین نخ استفاده می‌شود
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+
+        self._incoming.connect(self._queue_events)
+        self.change_feed.subscribe(self._on_feed_events)
+
+        # جمع کردن رویدادهای پشت سر هم در یک ارسال
+        self.batch_timer = QTimer(self)
+        self.batch_timer.setSingleShot(True)
+        self.batch_timer.setInterval(batch_delay_ms)
+        self.batch_timer.timeout.connect(self._deliver)
+
+        # بررسی تغییرات پروسه‌های دیگر؛ اگر data_version تغییر نکرده باشد کوئری‌ای اجرا نمی‌شود.
+        # با Redis پایش فقط پشتیبان پیام‌های از دست رفته است و کمتر اجرا می‌شود
+        if self.change_feed.broker.name == 'redis':
+            poll_interval_ms *= 10
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+        self.poll_timer.start(poll_interval_ms)
+        self.poll()
+
     def add_callback(self, callback):
-        """اضافه کردن تابع callback برای بروزرسانی"""
-        self.callbacks.append(callback)
-    
-    def notify_callbacks(self):
-        """اطلاع دادن به تمام callbackها"""
-        for callback in self.callbacks:
-            try:
-                callback()
-            except Exception as e:
-                print(f"خطا در اجرای callback: {e}")
-    
+        """اضافه کردن تابع callback برای بروزرسانی (با لیست رویدادها صدا زده می‌شود)"""
+        self.changes.connect(callback)
+
+    def poll(self):
+        """شروع یک پایش فید تغییرات در پس‌زمینه (اگر پایش قبلی هنوز تمام نشده باشد کاری نمی‌کند)
+
+        رویدادهای پیدا شده از طریق مشترک فید (_on_feed_events) به نخ رابط کاربری می‌رسند.
+        """
+        if self.polling:
+            return
+        self.polling = True
+        task = BackgroundTask(0, self.change_feed.poll_external)
+        task.signals.finished.connect(self._on_poll_done)
+        task.signals.failed.connect(self._on_poll_done)
+        self.thread_pool.start(task)
+
+    def _on_poll_done(self, generation, result):
+        self.polling = False
+
+    def _on_feed_events(self, events):
+        # ممکن است از نخ دیگری صدا زده شود؛ سیگنال رویدادها را به نخ رابط کاربری می‌برد
+        self._incoming.emit(events)
+
+    def _queue_events(self, events):
+        self.pending_events.extend(events)
+        if not self.batch_timer.isActive():
+            self.batch_timer.start()
+
+    def _deliver(self):
+        events, self.pending_events = self.pending_events, []
+        if events:
+            self.changes.emit(events)
+
     def stop(self):
-        """توقف مانیتورینگ"""
-        self.running = False
\ No newline at end of file
+        """توقف دریافت رویدادها"""
+        self.poll_timer.stop()
+        self.batch_timer.stop()
+        self.thread_pool.waitForDone()
+        self.change_feed.unsubscribe(self._on_feed_events)
@@ -0,0 +1,43 @@
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from models.database import DatabaseContext, DEFAULT_CONFIG
+from models.models import Room
+
+
+@pytest.fixture
+def db(tmp_path):
+    """دیتابیس SQLite خالی در پوشه موقت با لاگ همزمان و کارگزار محلی"""
+    config = dict(DEFAULT_CONFIG, url=f"sqlite:///{tmp_path / 'hotel.db'}", audit_log={'synchronous': True})
+    context = DatabaseContext(config)
+    context.create_all()
+    yield context
+    context.dispose()
+
+
+@pytest.fixture
+def manager(db):
+    from models.reservation_manager import ReservationManager
+    return ReservationManager(db)
+
+
+@pytest.fixture
+def rooms(db):
+    """چهار اتاق در دو طبقه؛ خروجی لیست id اتاق‌ها"""
+    session = db.Session()
+    try:
+        rooms = [
+            Room(room_number=number, room_type='دبل', floor=int(number[0]), price_per_night=100,
+                 capacity=2, max_guests=2)
+            for number in ('101', '102', '201', '202')
+        ]
+        session.add_all(rooms)
+        session.commit()
+        return [room.id for room in rooms]
+    finally:
+        session.close()
@@ -0,0 +1,114 @@
+import logging
+
+import pytest
+from sqlalchemy import create_engine, select, func
+
+from models.audit_log import AuditLogWriter, DROP_WARNING_INTERVAL
+from models.models import SystemLog
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    SystemLog.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+def row(number):
+    return AuditLogWriter.make_row('CREATE', 'reservations', number, new_data={'id': number}, description=f"ردیف {number}")
+
+
+def logged_ids(engine):
+    with engine.connect() as connection:
+        return list(connection.execute(select(SystemLog.record_id).order_by(SystemLog.id)).scalars())
+
+
+def count_inserts(writer):
+    """شمارش INSERTهای نویسنده (اندازه هر دسته)"""
+    batches = []
+    insert = writer._insert
+
+    def counting_insert(rows):
+        batches.append(len(rows))
+        insert(rows)
+
+    writer._insert = counting_insert
+    return batches
+
+
+def test_synchronous_writes_immediately(engine):
+    writer = AuditLogWriter(engine, synchronous=True)
+    assert writer._thread is None
+
+    writer.write(row(1))
+    assert logged_ids(engine) == [1]
+    writer.write(row(2))
+    assert logged_ids(engine) == [1, 2]
+    assert writer.dropped == 0
+
+
+def test_rows_are_batched(engine):
+    writer = AuditLogWriter(engine, batch_size=4, flush_interval_ms=500)
+    batches = count_inserts(writer)
+    # تا نوشته شدن همه ردیف‌ها نخ نویسنده منتظر می‌ماند
+    with writer._write_lock:
+        for number in range(10):
+            writer.write(row(number))
+    writer.close()
+
+    assert logged_ids(engine) == list(range(10))
+    assert sum(batches) == 10
+    assert max(batches) == 4
+    assert len(batches) < 10
+
+
+def test_close_flushes_pending_rows(engine):
+    # ردیف‌ها تا پایان مهلت دسته در صف می‌مانند و close منتظر نوشته شدن آن‌ها می‌ماند
+    writer = AuditLogWriter(engine, batch_size=100, flush_interval_ms=1000)
+    for number in range(5):
+        writer.write(row(number))
+    assert logged_ids(engine) == []
+    writer.close()
+
+    assert logged_ids(engine) == list(range(5))
+    assert not writer._thread.is_alive()
+
+    # بعد از close نوشتن همزمان انجام می‌شود
+    writer.write(row(5))
+    assert logged_ids(engine) == list(range(6))
+
+
+def test_full_queue_drops_without_blocking(engine):
+    writer = AuditLogWriter(engine, batch_size=1, flush_interval_ms=50, max_queue=2)
+    with writer._write_lock:
+        for number in range(10):
+            writer.write(row(number))
+        dropped = writer.dropped
+    writer.close()
+
+    assert dropped > 0
+    assert len(logged_ids(engine)) + writer.dropped == 10
+
+
+def test_bad_row_does_not_lose_batch(engine):
+    writer = AuditLogWriter(engine, synchronous=True)
+    bad = dict(row(2), action=None)  # action نمی‌تواند NULL باشد
+
+    writer._write_batch([row(1), bad, row(3)])
+
+    assert logged_ids(engine) == [1, 3]
+    assert writer.dropped == 1
+
+
+def test_dropped_warning_is_throttled(engine, caplog):
+    writer = AuditLogWriter(engine, synchronous=True)
+    with caplog.at_level(logging.WARNING, logger='models.audit_log'):
+        writer._count_dropped(1, "تست")
+        writer._count_dropped(DROP_WARNING_INTERVAL - 2, "تست")
+        writer._count_dropped(1, "تست")
+        writer._count_dropped(1, "تست")
+
+    assert writer.dropped == DROP_WARNING_INTERVAL + 1
+    # اولین ردیف و عبور از هر مضرب DROP_WARNING_INTERVAL
+    assert len(caplog.records) == 2
@@ -0,0 +1,72 @@
+from datetime import datetime, date
+
+import pytest
+
+from models.availability_index import AvailabilityIndex
+
+
+@pytest.fixture
+def index(db):
+    index = AvailabilityIndex(db.Session)
+    index.ensure_loaded()
+    return index
+
+
+def ids(entries):
+    return [entry['reservation_id'] for entry in entries]
+
+
+def test_overlapping_uses_half_open_ranges(index):
+    index.upsert(1, 10, datetime(2025, 1, 1), datetime(2025, 1, 4), 'confirmed')
+    index.upsert(2, 10, datetime(2025, 1, 4), datetime(2025, 1, 6), 'confirmed')
+
+    assert ids(index.overlapping(10, datetime(2025, 1, 3), datetime(2025, 1, 5))) == [1, 2]
+    # خروج یک رزرو و ورود رزرو بعدی در یک روز تداخل نیست (Back-to-Back)
+    assert ids(index.overlapping(10, datetime(2025, 1, 4), datetime(2025, 1, 5))) == [2]
+    assert ids(index.overlapping(10, datetime(2024, 12, 30), datetime(2025, 1, 1))) == []
+    assert ids(index.overlapping(10, datetime(2025, 1, 6), datetime(2025, 1, 8))) == []
+    assert index.overlapping(11, datetime(2025, 1, 1), datetime(2025, 2, 1)) == []
+
+
+def test_long_stay_is_found_behind_later_short_stays(index):
+    # اقامت طولانی قبل از چند اقامت کوتاه شروع می‌شود؛ بیشینه خروج باید پیمایش را تا آن ادامه دهد
+    index.upsert(1, 10, datetime(2025, 1, 1), datetime(2025, 2, 1), 'checked_in')
+    for reservation_id, day in ((2, 3), (3, 5), (4, 7)):
+        index.upsert(reservation_id, 10, datetime(2025, 1, day), datetime(2025, 1, day + 1), 'confirmed')
+
+    assert ids(index.overlapping(10, datetime(2025, 1, 20), datetime(2025, 1, 21))) == [1]
+    assert ids(index.overlapping(10, datetime(2025, 1, 5), datetime(2025, 1, 6))) == [1, 3]
+    assert index.at(10, datetime(2025, 1, 25))['reservation_id'] == 1
+
+
+def test_max_end_is_rebuilt_after_remove(index):
+    index.upsert(1, 10, datetime(2025, 1, 1), datetime(2025, 2, 1), 'confirmed')
+    index.upsert(2, 10, datetime(2025, 1, 3), datetime(2025, 1, 4), 'confirmed')
+    index.remove(1)
+
+    assert index.overlapping(10, datetime(2025, 1, 20), datetime(2025, 1, 21)) == []
+    assert ids(index.overlapping(10, datetime(2025, 1, 3), datetime(2025, 1, 4))) == [2]
+
+
+def test_upsert_moves_rooms_and_drops_inactive_statuses(index):
+    changes = []
+    index.add_listener(changes.append)
+
+    index.upsert(1, 10, datetime(2025, 1, 1), datetime(2025, 1, 3), 'confirmed')
+    index.upsert(1, 11, datetime(2025, 1, 1), datetime(2025, 1, 3), 'confirmed')
+    assert index.at(10, datetime(2025, 1, 2)) is None
+    assert index.at(11, datetime(2025, 1, 2))['reservation_id'] == 1
+
+    index.upsert(1, 11, datetime(2025, 1, 1), datetime(2025, 1, 3), 'cancelled')
+    assert index.at(11, datetime(2025, 1, 2)) is None
+    assert changes == [[10], [10, 11], [11]]
+
+
+def test_boundary_lookups_accept_dates(index):
+    index.upsert(1, 10, datetime(2025, 1, 1), datetime(2025, 1, 3), 'confirmed')
+    index.upsert(2, 10, datetime(2025, 1, 3), datetime(2025, 1, 5), 'confirmed')
+
+    assert index.ending_at(10, date(2025, 1, 3))['reservation_id'] == 1
+    assert index.starting_at(10, date(2025, 1, 3))['reservation_id'] == 2
+    assert index.at(10, date(2025, 1, 3))['reservation_id'] == 2
+    assert index.at(10, date(2025, 1, 5)) is None
@@ -0,0 +1,62 @@
+from datetime import date
+
+import jdatetime
+import pytest
+from sqlalchemy import create_engine, select, func
+
+from models.calendar_dimension import add_months, month_bounds, calendar_row, ensure_calendar
+from models.models import CalendarDay
+
+
+@pytest.mark.parametrize('year, month, count, expected', [
+    (1403, 1, 0, (1403, 1)),
+    (1403, 11, 2, (1404, 1)),
+    (1403, 12, 1, (1404, 1)),
+    (1403, 1, -1, (1402, 12)),
+    (1403, 3, -15, (1401, 12)),
+    (1400, 6, 30, (1402, 12)),
+])
+def test_add_months(year, month, count, expected):
+    assert add_months(year, month, count) == expected
+
+
+def test_month_bounds_follow_jalali_month_lengths():
+    start, end = month_bounds(1403, 1)
+    assert start == date(2024, 3, 20)
+    assert (end - start).days == 31
+
+    assert (month_bounds(1403, 7)[1] - month_bounds(1403, 7)[0]).days == 30
+    # اسفند سال کبیسه 30 روز و سال عادی 29 روز است
+    assert (month_bounds(1403, 12)[1] - month_bounds(1403, 12)[0]).days == 30
+    assert (month_bounds(1402, 12)[1] - month_bounds(1402, 12)[0]).days == 29
+
+
+def test_month_bounds_spans_months_across_years():
+    start, end = month_bounds(1402, 11, 3)
+    assert start == jdatetime.date(1402, 11, 1).togregorian()
+    assert end == jdatetime.date(1403, 2, 1).togregorian()
+
+
+def test_calendar_row_marks_fridays_and_fixed_holidays():
+    nowruz = calendar_row(jdatetime.date(1403, 1, 1).togregorian())
+    assert (nowruz['jalali_year'], nowruz['jalali_month'], nowruz['jalali_day']) == (1403, 1, 1)
+    assert nowruz['is_holiday']
+
+    friday = calendar_row(date(2025, 1, 3))
+    assert friday['weekday'] == 6
+    assert friday['is_holiday']
+
+    assert not calendar_row(date(2025, 1, 4))['is_holiday']
+
+
+def test_ensure_calendar_only_adds_missing_days():
+    engine = create_engine('sqlite://')
+    with engine.begin() as connection:
+        CalendarDay.__table__.create(connection)
+        start, end = month_bounds(1403, 1)
+        assert ensure_calendar(connection, start, end) == 31
+        assert ensure_calendar(connection, start, end) == 0
+
+        wider_start, wider_end = month_bounds(1402, 12, 3)
+        assert ensure_calendar(connection, wider_start, wider_end) == 29 + 31
+        assert connection.execute(select(func.count()).select_from(CalendarDay)).scalar() == 29 + 31 + 31
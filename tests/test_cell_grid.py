@@ -0,0 +1,75 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from models.cell_grid import classify_room_cells, build_cell_grid
+
+
+def stay(reservation_id, check_in, check_out, room_id=1, name='مهمان'):
+    return SimpleNamespace(
+        id=reservation_id, room_id=room_id, check_in=check_in, check_out=check_out,
+        package_type='فقط اسکان', first_name=name, last_name=str(reservation_id)
+    )
+
+
+def cell_types(cells):
+    return {day: (cell['reservation_id'], cell['cell_type']) for day, cell in cells.items()}
+
+
+def test_single_stay_covers_nights_only():
+    cells = classify_room_cells([stay(1, date(2025, 1, 2), date(2025, 1, 5))], date(2025, 1, 1), date(2025, 1, 10))
+
+    assert cell_types(cells) == {2: (1, 'full'), 3: (1, 'middle'), 4: (1, 'full')}
+    assert cells[2]['nights'] == 3
+    assert cells[3]['day_position'] == 1
+    assert cells[2]['guest_name'] == 'مهمان 1'
+
+
+def test_back_to_back_marks_start_and_end():
+    cells = classify_room_cells(
+        [stay(1, date(2025, 1, 1), date(2025, 1, 3)), stay(2, date(2025, 1, 3), date(2025, 1, 5))],
+        date(2025, 1, 1), date(2025, 1, 10)
+    )
+
+    assert cell_types(cells) == {1: (1, 'full'), 2: (1, 'full'), 3: (2, 'start'), 4: (2, 'full')}
+
+
+def test_last_night_before_next_arrival_is_end():
+    cells = classify_room_cells(
+        [stay(1, date(2025, 1, 1), date(2025, 1, 4)), stay(2, date(2025, 1, 3), date(2025, 1, 6))],
+        date(2025, 1, 1), date(2025, 1, 10)
+    )
+
+    # روز سوم به رزروی می‌رسد که زودتر وارد شده و آخرین شب آن است
+    assert cells[3]['reservation_id'] == 1
+    assert cells[3]['cell_type'] == 'end'
+    assert [cells[day]['reservation_id'] for day in (4, 5)] == [2, 2]
+
+
+def test_range_clips_stays_and_accepts_datetimes():
+    cells = classify_room_cells(
+        [stay(1, datetime(2024, 12, 28, 14), datetime(2025, 1, 3, 12))],
+        datetime(2025, 1, 1), datetime(2025, 1, 2)
+    )
+
+    assert list(cells) == [1]
+    assert cells[1]['day_position'] == 4
+
+
+def test_day_is_built_once_under_long_stay():
+    cells = classify_room_cells(
+        [stay(1, date(2025, 1, 1), date(2025, 1, 30)), stay(2, date(2025, 1, 5), date(2025, 1, 7))],
+        date(2025, 1, 1), date(2025, 2, 1)
+    )
+
+    assert len(cells) == 29
+    assert {cell['reservation_id'] for cell in cells.values()} == {1}
+
+
+def test_build_cell_grid_groups_by_room():
+    grid = build_cell_grid(
+        [stay(1, date(2025, 1, 1), date(2025, 1, 2), room_id=7), stay(2, date(2025, 1, 1), date(2025, 1, 3), room_id=9)],
+        date(2025, 1, 1), date(2025, 1, 5)
+    )
+
+    assert sorted(grid) == [7, 9]
+    assert sorted(grid[9]) == [1, 2]
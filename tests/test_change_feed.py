@@ -0,0 +1,79 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models.change_feed import ChangeFeed
+from models.models import Guest
+
+
+def collect(db):
+    received = []
+    db.change_feed.subscribe(received.extend)
+    return received
+
+
+def add_guest(session_factory, first_name):
+    session = session_factory()
+    try:
+        session.add(Guest(first_name=first_name, last_name='تست'))
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_local_commit_is_delivered_once(db):
+    received = collect(db)
+    db.change_feed.poll_external()
+
+    add_guest(db.Session, 'علی')
+    assert [(event['table'], event['operation'], event['origin']) for event in received] == [('guests', 'insert', 'local')]
+
+    # پایش بعدی همان شماره را دوباره تحویل نمی‌دهد
+    assert db.change_feed.poll_external() == []
+    assert len(received) == 1
+
+
+def test_other_process_changes_are_polled_and_deduplicated(db):
+    received = collect(db)
+    db.change_feed.poll_external()
+
+    # پروسه دیگر: engine و فید جداگانه روی همان فایل
+    other_engine = create_engine(db.engine.url)
+    other_sessions = sessionmaker(bind=other_engine)
+    other_feed = ChangeFeed(other_engine, other_sessions)
+    try:
+        add_guest(other_sessions, 'سارا')
+        add_guest(other_sessions, 'رضا')
+    finally:
+        other_feed.close()
+        other_engine.dispose()
+
+    polled = db.change_feed.poll_external()
+    assert [event['origin'] for event in polled] == ['remote', 'remote']
+    assert [event['payload']['first_name'] for event in polled] == ['سارا', 'رضا']
+    assert received == polled
+
+    # همان رویدادها اگر بعداً از Redis هم برسند تکراری هستند
+    db.change_feed.receive_remote(polled)
+    assert db.change_feed.poll_external() == []
+    assert len(received) == 2
+
+
+def test_remote_events_are_not_polled_again(db):
+    received = collect(db)
+    db.change_feed.poll_external()
+
+    other_engine = create_engine(db.engine.url)
+    other_sessions = sessionmaker(bind=other_engine)
+    other_feed = ChangeFeed(other_engine, other_sessions)
+    remote = []
+    other_feed.subscribe(remote.extend)
+    try:
+        add_guest(other_sessions, 'مریم')
+    finally:
+        other_feed.close()
+        other_engine.dispose()
+
+    # رویداد ابتدا از کارگزار (Redis) می‌رسد و پایش آن را دوباره تحویل نمی‌دهد
+    db.change_feed.receive_remote([dict(event, origin='remote') for event in remote])
+    assert db.change_feed.poll_external() == []
+    assert [event['payload']['first_name'] for event in received] == ['مریم']
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+
+from models.models import Guest, Reservation
+
+
+@pytest.fixture
+def guests(db, rooms):
+    """25 مهمان با نام‌های تکراری (برای بررسی id در کلید keyset) و رزرو برای بعضی از آن‌ها"""
+    session = db.Session()
+    try:
+        first_names = ['علی', 'سارا', 'رضا', 'مریم', 'زهرا']
+        last_names = ['احمدی', 'کاظمی', 'رحمتی']
+        guests = [
+            Guest(first_name=first_names[i % 5], last_name=last_names[i % 3],
+                  phone=f"0912{i % 4:07d}" if i % 6 else None, email=f"guest{i}@example.com",
+                  id_number=f"{i:010d}")
+            for i in range(25)
+        ]
+        session.add_all(guests)
+        session.flush()
+        for i, guest in enumerate(guests[::3]):
+            session.add(Reservation(
+                room_id=rooms[i % len(rooms)], guest_id=guest.id, check_in=datetime(2025, 1, 1 + i),
+                check_out=datetime(2025, 1, 3 + i), status='checked_in' if i % 2 else 'confirmed',
+                total_amount=100
+            ))
+        session.commit()
+        return [guest.id for guest in guests]
+    finally:
+        session.close()
+
+
+def all_pages(manager, limit=7, **options):
+    rows, after, pages = [], None, 0
+    while True:
+        page, after = manager.get_guest_page(after=after, limit=limit, **options)
+        rows.extend(page)
+        pages += 1
+        if after is None:
+            return rows, pages
+
+
+@pytest.mark.parametrize('sort_key', ['first_name', 'last_name', 'phone', 'email', 'last_check_in'])
+@pytest.mark.parametrize('descending', [False, True])
+def test_keyset_pages_cover_every_guest_once_in_order(manager, guests, sort_key, descending):
+    rows, pages = all_pages(manager, sort_key=sort_key, descending=descending)
+
+    assert sorted(row['id'] for row in rows) == sorted(guests)
+    assert pages == 4
+
+    def key(row):
+        if sort_key == 'first_name':
+            return (row['first_name'], row['last_name'], row['id'])
+        if sort_key == 'last_name':
+            return (row['last_name'], row['first_name'], row['id'])
+        if sort_key == 'last_check_in':
+            return (row['last_check_in'].isoformat(' ') if row['last_check_in'] else '', row['id'])
+        return (row[sort_key] or '', row['id'])
+    assert [key(row) for row in rows] == sorted((key(row) for row in rows), reverse=descending)
+
+
+def test_scope_and_search_filters(manager, guests):
+    active, _ = all_pages(manager, scope='active')
+    assert active and all(row['is_active'] for row in active)
+
+    matches, _ = all_pages(manager, search='guest1')
+    assert sorted(row['email'] for row in matches) == sorted(
+        f"guest{i}@example.com" for i in range(25) if str(i).startswith('1')
+    )
+
+
+def test_like_search_without_fts_index(db, manager, guests):
+    # دیتابیس بدون جدول FTS (مثلاً غیر SQLite) از LIKE استفاده می‌کند
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql("DROP TABLE search_index")
+    manager._search_index_available = None
+
+    matches, _ = all_pages(manager, search='0000000007')
+    assert [row['id'] for row in matches] == [guests[7]]
+    matches, _ = all_pages(manager, search='guest24@')
+    assert [row['id'] for row in matches] == [guests[24]]
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from models.calendar_dimension import month_bounds
+from models.models import Guest, Reservation
+
+
+def add_reservations(db, rooms, stays):
+    session = db.Session()
+    try:
+        guest = Guest(first_name='مهمان', last_name='گزارش')
+        session.add(guest)
+        session.flush()
+        for room_index, check_in, nights, status, amount in stays:
+            session.add(Reservation(
+                room_id=rooms[room_index], guest_id=guest.id, check_in=check_in,
+                check_out=check_in + timedelta(days=nights), status=status, total_amount=amount
+            ))
+        session.commit()
+    finally:
+        session.close()
+
+
+def test_monthly_report_counts_nights_inside_each_month(db, manager, rooms):
+    farvardin_start, ordibehesht_start = month_bounds(1403, 1)
+    first = datetime.combine(farvardin_start, datetime.min.time())
+    second = datetime.combine(ordibehesht_start, datetime.min.time())
+    add_reservations(db, rooms, [
+        (0, first + timedelta(hours=14), 3, 'confirmed', 300),
+        # دو شب آخر فروردین و یک شب اردیبهشت
+        (1, second - timedelta(days=2), 3, 'checked_out', 450),
+        (2, first + timedelta(days=5), 2, 'cancelled', 999),
+        (3, second + timedelta(days=1), 1, 'checked_in', 150),
+    ])
+
+    report = manager.get_monthly_report(1403, 1, months=2)
+
+    assert [(row['year'], row['month'], row['days']) for row in report] == [(1403, 1, 31), (1403, 2, 31)]
+    farvardin, ordibehesht = report
+    # رزرو لغو شده مثل گزارش قبلی در تعداد و درآمد هست ولی شب-اتاق ندارد
+    assert (farvardin['reservations'], farvardin['revenue'], farvardin['room_nights']) == (3, 1749, 5)
+    assert (ordibehesht['reservations'], ordibehesht['revenue'], ordibehesht['room_nights']) == (1, 150, 2)
+    assert farvardin['occupancy'] == 5 / (len(rooms) * 31) * 100
+    assert farvardin['holidays'] >= 6
+
+
+def test_monthly_report_does_not_write(db, manager):
+    before = db.engine.connect()
+    try:
+        version = before.exec_driver_sql("PRAGMA data_version").scalar()
+        # ماه‌های خارج از جدول تقویم اضافه نمی‌شوند؛ فقط در خروجی نیستند
+        assert manager.get_monthly_report(1390, 1, months=12) == []
+        assert before.exec_driver_sql("PRAGMA data_version").scalar() == version
+    finally:
+        before.close()
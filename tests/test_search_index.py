@@ -0,0 +1,126 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import text
+
+from models import migrations
+from models.models import Guest, Room
+from models.search_index import normalize_text, rebuild_search_index, search_index
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('علي كريمي', 'علی کریمی'),
+    ('مي‌خواهم', 'میخواهم'),
+    ('  احمد   رضا  ', 'احمد رضا'),
+    ('۰۹۱۲۳٤٥٦٧٨٩', '09123456789'),
+    ('مُحَمَّد', 'محمد'),
+    ('Guest@Example.COM', 'guest@example.com'),
+    (None, ''),
+    (1205, '1205'),
+])
+def test_normalize_text(value, expected):
+    assert normalize_text(value) == expected
+
+
+def add_guest(db, **fields):
+    session = db.Session()
+    try:
+        guest = Guest(**fields)
+        session.add(guest)
+        session.commit()
+        return guest.id
+    finally:
+        session.close()
+
+
+def hits(manager, search_text, kinds=('guest', 'reservation')):
+    return [(result['kind'], result['id']) for result in manager.search(search_text, kinds=kinds)]
+
+
+def test_orm_writes_keep_the_index_in_sync(db, manager):
+    guest_id = add_guest(db, first_name='كريم', last_name='يزدي', phone='۰۹۱۲۰۰۰۱۱۲۲', email='karim@example.com')
+
+    assert hits(manager, 'کریم یزدی') == [('guest', guest_id)]
+    assert hits(manager, '09120001122') == [('guest', guest_id)]
+    assert hits(manager, 'karim@exa') == [('guest', guest_id)]
+
+    session = db.Session()
+    try:
+        session.get(Guest, guest_id).email = 'k.yazdi@example.org'
+        session.commit()
+    finally:
+        session.close()
+    assert hits(manager, 'karim@exa') == []
+    assert hits(manager, 'yazdi@example.org') == [('guest', guest_id)]
+
+    session = db.Session()
+    try:
+        session.delete(session.get(Guest, guest_id))
+        session.commit()
+    finally:
+        session.close()
+    assert hits(manager, 'کریم') == []
+
+
+def test_reservation_rows_follow_guest_and_room_changes(db, manager, rooms):
+    from datetime import datetime
+    _, _, reservation_id = manager.create_reservation(
+        {'room_id': rooms[0], 'check_in': datetime(2025, 1, 1), 'check_out': datetime(2025, 1, 3),
+         'total_amount': 100, 'tracking_code': 'TRK-7788'},
+        {'first_name': 'سارا', 'last_name': 'موسوی'}
+    )
+    assert ('reservation', reservation_id) in hits(manager, 'TRK-7788')
+    assert hits(manager, 'موسوی 101', kinds=('reservation',)) == [('reservation', reservation_id)]
+
+    session = db.Session()
+    try:
+        session.get(Room, rooms[0]).room_number = '105'
+        session.commit()
+    finally:
+        session.close()
+    assert hits(manager, 'موسوی 105', kinds=('reservation',)) == [('reservation', reservation_id)]
+    assert hits(manager, 'موسوی 101', kinds=('reservation',)) == []
+
+
+def test_other_clients_can_write_without_app_functions(db, manager):
+    guest_id = add_guest(db, first_name='نرگس', last_name='قاسمی')
+    database = db.engine.url.database
+
+    # اتصال بیرونی (مثل sqlite3 خط فرمان) هیچ تابع یا تریگری از برنامه ندارد
+    connection = sqlite3.connect(database)
+    connection.execute("UPDATE guests SET last_name = 'جعفری' WHERE id = ?", (guest_id,))
+    connection.execute("INSERT INTO guests (first_name, last_name) VALUES ('امیر', 'مرادی')")
+    connection.commit()
+    connection.close()
+
+    assert hits(manager, 'جعفری') == []
+    with db.engine.begin() as connection:
+        rebuild_search_index(connection)
+        assert search_index(connection, 'نرگس جعفری') == [('guest', guest_id)]
+        assert len(search_index(connection, 'امیر مرادی')) == 1
+        assert connection.execute(text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger'")).scalar() == 0
+
+
+def test_version_8_replaces_the_trigger_index(db, manager):
+    guest_id = add_guest(db, first_name='لیلا', last_name='صادقی', email='leila@example.com')
+    database = db.engine.url.database
+
+    # دیتابیس نسخه 7: جدول بدون ستون ایمیل و تریگرهایی که تابع hotel_normalize می‌خواهند
+    connection = sqlite3.connect(database)
+    connection.executescript("""
+        DROP TABLE search_index;
+        CREATE VIRTUAL TABLE search_index USING fts5(guest_name, id_number, phone, tracking_code, room_number, tokenize='trigram');
+        CREATE TRIGGER search_guests_ai AFTER INSERT ON guests BEGIN
+            INSERT INTO search_index (rowid, guest_name) VALUES (new.id * 2, hotel_normalize(new.first_name));
+        END;
+        DELETE FROM schema_migrations WHERE version = 8;
+    """)
+    connection.close()
+
+    assert migrations.upgrade(db.engine) == [8]
+
+    connection = sqlite3.connect(database)
+    connection.execute("INSERT INTO guests (first_name, last_name) VALUES ('امیر', 'مرادی')")
+    connection.commit()
+    connection.close()
+    assert hits(manager, 'leila@example') == [('guest', guest_id)]
@@ -1,7 +1,7 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QTableWidget, QTableWidgetItem, QTabWidget,
+                            QTableView, QTabWidget,
                             QHeaderView, QPushButton, QLineEdit, QComboBox, QScrollArea)
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
 from PyQt6.QtGui import QFont, QColor, QBrush
 import sys
 import os
@@ -10,13 +10,147 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'models'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 from reservation_manager import ReservationManager
-from models import Guest, Reservation, Room
 from jalali import JalaliDate
 
+# تعداد ردیف هر صفحه فهرست مهمانان
+GUEST_PAGE_SIZE = 100
+# تاخیر اعمال فیلتر بعد از آخرین کلید (میلی‌ثانیه)
+FILTER_DEBOUNCE_MS = 150
+GUEST_TYPES = ["حضوری", "آژانس", "رزرو", "سایت", "اینستاگرام", "تلفنی"]
+# گزینه‌های فیلتر وضعیت و محدوده متناظر در ReservationManager.get_guest_page
+STATUS_FILTERS = [
+    ("همه", None),
+    ("مهمانان فعال", 'active'),
+    ("مهمانان خروجی", 'checked_out'),
+    ("دارای رزرو", 'has_reservation'),
+]
+
+
+class GuestDirectoryModel(QAbstractTableModel):
+    """مدل فهرست مهمانان با بارگذاری تنبل صفحه‌ها (canFetchMore/fetchMore)
+    
+    فقط صفحه‌هایی که کاربر تا آن‌ها اسکرول کرده در حافظه هستند. مرتب‌سازی و فیلترها به
+    ReservationManager.get_guest_page داده می‌شوند و صفحه بعد با کلید آخرین ردیف
+    (keyset) خوانده می‌شود، پس تغییر فیلتر فقط یک کوئری صفحه اول است.
+    """
+    
+    HEADERS = ["نام", "نام خانوادگی", "تلفن", "ایمیل", "تاریخ آخرین رزرو",
+               "اتاق فعلی", "وضعیت", "نوع مهمان"]
+    # ستون‌های قابل مرتب‌سازی در SQL
+    SORT_KEYS = {0: 'first_name', 1: 'last_name', 2: 'phone', 3: 'email', 4: 'last_check_in'}
+    
+    def __init__(self, reservation_manager, scope='all', parent=None):
+        super().__init__(parent)
+        self.reservation_manager = reservation_manager
+        self.scope = scope
+        self.filters = {}
+        self.sort_key = 'last_name'
+        self.descending = False
+        self.rows = []
+        self.after = None
+        self.has_more = True
+        self.active_brush = QBrush(QColor("#d4edda"))    # سبز
+        self.inactive_brush = QBrush(QColor("#f8d7da"))  # قرمز
+    
+    def set_filters(self, search=None, status=None, guest_type=None):
+        self.filters = {'search': search or None, 'status': status, 'guest_type': guest_type}
+        self.reload()
+    
+    def reload(self):
+        """خالی کردن مدل و خواندن دوباره صفحه اول"""
+        self.beginResetModel()
+        self.rows = []
+        self.after = None
+        self.has_more = True
+        self.endResetModel()
+        self.fetchMore(QModelIndex())
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        rows, self.after = self.reservation_manager.get_guest_page(
+            self.scope,
+            sort_key=self.sort_key,
+            descending=self.descending,
+            after=self.after,
+            limit=GUEST_PAGE_SIZE,
+            **self.filters
+        )
+        self.has_more = self.after is not None
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+    
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        sort_key = self.SORT_KEYS.get(column)
+        descending = order == Qt.SortOrder.DescendingOrder
+        if sort_key is None or (sort_key == self.sort_key and descending == self.descending):
+            return
+        self.sort_key = sort_key
+        self.descending = descending
+        self.reload()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        guest = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return guest['first_name']
+            if column == 1:
+                return guest['last_name']
+            if column == 2:
+                return guest['phone'] or ""
+            if column == 3:
+                return guest['email'] or ""
+            if column == 4:
+                # تاریخ آخرین رزرو
+                if guest['last_check_in']:
+                    return JalaliDate.format_date(guest['last_check_in'], "%Y/%m/%d")
+                return ""
+            if column == 5:
+                # اتاق فعلی
+                return guest['room_number'] or ""
+            if column == 6:
+                return "فعال" if guest['is_active'] else "خروجی"
+            if column == 7:
+                return guest['guest_type'] or "نامشخص"
+        elif role == Qt.ItemDataRole.BackgroundRole and column == 6:
+            return self.active_brush if guest['is_active'] else self.inactive_brush
+        elif role == Qt.ItemDataRole.UserRole:
+            return guest['id']
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+
 class GuestsTab(QWidget):
     def __init__(self, reservation_manager):
         super().__init__()
         self.reservation_manager = reservation_manager
+        self.guest_models = []
+        
+        # اعمال فیلتر بعد از مکث کوتاه در تایپ
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.filter_timer.timeout.connect(self.load_guests_data)
+        
         self.setup_ui()
         self.load_guests_data()
     
@@ -42,15 +176,24 @@ class GuestsTab(QWidget):
         search_layout = QHBoxLayout()
         
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("جستجو بر اساس نام، تلفن یا ایمیل...")
+        self.search_input.setPlaceholderText("جستجو بر اساس نام، تلفن، ایمیل یا کد ملی...")
         self.search_input.textChanged.connect(self.filter_guests)
         
         self.status_filter = QComboBox()
-        self.status_filter.addItems(["همه", "مهمانان فعال", "مهمانان خروجی", "دارای رزرو"])
+        for label, status in STATUS_FILTERS:
+            self.status_filter.addItem(label, status)
         self.status_filter.currentTextChanged.connect(self.filter_guests)
         
+        self.guest_type_filter = QComboBox()
+        self.guest_type_filter.addItem("همه انواع", None)
+        for guest_type in GUEST_TYPES:
+            self.guest_type_filter.addItem(guest_type, guest_type)
+        self.guest_type_filter.currentTextChanged.connect(self.filter_guests)
+        
         search_layout.addWidget(QLabel("وضعیت:"))
         search_layout.addWidget(self.status_filter)
+        search_layout.addWidget(QLabel("نوع مهمان:"))
+        search_layout.addWidget(self.guest_type_filter)
         search_layout.addStretch()
         search_layout.addWidget(self.search_input)
         
@@ -60,15 +203,15 @@ class GuestsTab(QWidget):
         self.tabs = QTabWidget()
         
         # تب همه مهمانان
-        self.all_guests_tab = self.create_guests_table()
+        self.all_guests_tab = self.create_guests_table('all')
         self.tabs.addTab(self.all_guests_tab, "همه مهمانان")
         
         # تب مهمانان فعال
-        self.active_guests_tab = self.create_guests_table()
+        self.active_guests_tab = self.create_guests_table('active')
         self.tabs.addTab(self.active_guests_tab, "مهمانان فعال")
         
         # تب مهمانان خروجی
-        self.checked_out_tab = self.create_guests_table()
+        self.checked_out_tab = self.create_guests_table('checked_out')
         self.tabs.addTab(self.checked_out_tab, "مهمانان خروجی")
         
         layout.addWidget(self.tabs)
@@ -82,23 +225,26 @@ class GuestsTab(QWidget):
         main_layout.setContentsMargins(5, 5, 5, 5)
         main_layout.addWidget(scroll_area)
     
-    def create_guests_table(self):
+    def create_guests_table(self, scope):
         container = QWidget()
         layout = QVBoxLayout(container)
         
-        table = QTableWidget()
-        table.setColumnCount(8)
-        headers = ["نام", "نام خانوادگی", "تلفن", "ایمیل", "تاریخ آخرین رزرو", 
-                  "اتاق فعلی", "وضعیت", "نوع مهمان"]
-        table.setHorizontalHeaderLabels(headers)
+        model = GuestDirectoryModel(self.reservation_manager, scope, self)
+        self.guest_models.append(model)
+        
+        table = QTableView()
+        table.setModel(model)
         
         # تنظیمات جدول با ارتفاع بیشتر
         table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        table.horizontalHeader().setSortIndicator(1, Qt.SortOrder.AscendingOrder)
+        table.setSortingEnabled(True)
+        table.verticalHeader().setVisible(False)
         table.setAlternatingRowColors(True)
-        table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         table.setMinimumHeight(400)  # ارتفاع بیشتر برای خوانایی بهتر
         table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 gridline-color: #dee2e6;
                 selection-background-color: #3498db;
                 border: 1px solid #dee2e6;
@@ -106,13 +252,13 @@ class GuestsTab(QWidget):
                 background-color: white;
                 alternate-background-color: #f8f9fa;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 12px;  # padding بیشتر برای خوانایی بهتر
                 border-bottom: 1px solid #dee2e6;
                 font-family: "B Titr";
                 font-size: 11px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #3498db;
                 color: white;
             }
@@ -133,104 +279,18 @@ class GuestsTab(QWidget):
         return container
     
     def load_guests_data(self):
-        session = self.reservation_manager.Session()
+        """بارگذاری صفحه اول هر سه تب با فیلترهای فعلی (بقیه صفحه‌ها با اسکرول خوانده می‌شوند)"""
         try:
-            # دریافت همه مهمانان
-            guests = session.query(Guest).all()
+            search_text = self.search_input.text().strip()
+            status = self.status_filter.currentData()
+            guest_type = self.guest_type_filter.currentData()
             
-            # پر کردن تب همه مهمانان
-            self.fill_guests_table(self.all_guests_tab.layout().itemAt(0).widget(), guests)
-            
-            # پر کردن تب مهمانان فعال
-            active_guests = self.get_active_guests(session)
-            self.fill_guests_table(self.active_guests_tab.layout().itemAt(0).widget(), active_guests)
-            
-            # پر کردن تب مهمانان خروجی
-            checked_out_guests = self.get_checked_out_guests(session)
-            self.fill_guests_table(self.checked_out_tab.layout().itemAt(0).widget(), checked_out_guests)
+            for model in self.guest_models:
+                model.set_filters(search_text, status, guest_type)
             
         except Exception as e:
             print(f"خطا در بارگذاری داده مهمانان: {e}")
-        finally:
-            session.close()
-    
-    def get_active_guests(self, session):
-        """دریافت مهمانان فعال"""
-        active_reservations = session.query(Reservation).filter(
-            Reservation.status == 'checked_in'
-        ).all()
-        
-        guest_ids = [res.guest_id for res in active_reservations]
-        return session.query(Guest).filter(Guest.id.in_(guest_ids)).all() if guest_ids else []
-    
-    def get_checked_out_guests(self, session):
-        """دریافت مهمانان خروجی"""
-        checked_out_reservations = session.query(Reservation).filter(
-            Reservation.status == 'checked_out'
-        ).all()
-        
-        guest_ids = [res.guest_id for res in checked_out_reservations]
-        return session.query(Guest).filter(Guest.id.in_(guest_ids)).all() if guest_ids else []
-    
-    def fill_guests_table(self, table, guests):
-        """پر کردن جدول مهمانان"""
-        table.setRowCount(len(guests))
-        
-        session = self.reservation_manager.Session()
-        try:
-            for row, guest in enumerate(guests):
-                # دریافت آخرین رزرو
-                last_reservation = session.query(Reservation).filter(
-                    Reservation.guest_id == guest.id
-                ).order_by(Reservation.check_in.desc()).first()
-                
-                # دریافت رزرو فعال
-                active_reservation = session.query(Reservation).filter(
-                    Reservation.guest_id == guest.id,
-                    Reservation.status == 'checked_in'
-                ).first()
-                
-                # پر کردن ردیف
-                table.setItem(row, 0, QTableWidgetItem(guest.first_name))
-                table.setItem(row, 1, QTableWidgetItem(guest.last_name))
-                table.setItem(row, 2, QTableWidgetItem(guest.phone or ""))
-                table.setItem(row, 3, QTableWidgetItem(guest.email or ""))
-                
-                # تاریخ آخرین رزرو
-                last_res_date = ""
-                if last_reservation:
-                    last_res_date = JalaliDate.format_date(last_reservation.check_in, "%Y/%m/%d")
-                table.setItem(row, 4, QTableWidgetItem(last_res_date))
-                
-                # اتاق فعلی
-                current_room = ""
-                if active_reservation:
-                    room = session.query(Room).filter(Room.id == active_reservation.room_id).first()
-                    current_room = room.room_number if room else ""
-                table.setItem(row, 5, QTableWidgetItem(current_room))
-                
-                # وضعیت
-                status = "فعال" if active_reservation else "خروجی"
-                status_item = QTableWidgetItem(status)
-                if active_reservation:
-                    status_item.setBackground(QBrush(QColor("#d4edda")))  # سبز
-                else:
-                    status_item.setBackground(QBrush(QColor("#f8d7da")))  # قرمز
-                table.setItem(row, 6, status_item)
-                
-                # نوع مهمان
-                guest_type = last_reservation.guest_type if last_reservation else "نامشخص"
-                table.setItem(row, 7, QTableWidgetItem(guest_type))
-                
-        except Exception as e:
-            print(f"خطا در پر کردن جدول: {e}")
-        finally:
-            session.close()
     
     def filter_guests(self):
-        """فیلتر کردن مهمانان بر اساس جستجو"""
-        search_text = self.search_input.text().lower()
-        status_filter = self.status_filter.currentText()
-        
-        # این تابع می‌تواند برای فیلتر کردن real-time گسترش یابد
-        pass
\ No newline at end of file
+        """فیلتر کردن مهمانان بر اساس جستجو، وضعیت و نوع مهمان (در SQL و با تاخیر کوتاه)"""
+        self.filter_timer.start()
@@ -4,8 +4,8 @@ from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                             QComboBox, QSpinBox, QDateEdit, QDialogButtonBox,
                             QListWidget, QListWidgetItem, QApplication, QGroupBox,
                             QCheckBox, QFileDialog, QScrollArea)
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QFont, QPalette, QColor, QIcon, QPixmap
+from PyQt6.QtCore import Qt, QTimer, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QFont, QPalette, QColor, QIcon, QPixmap, QBrush
 from datetime import datetime, timedelta
 import os
 import sys
@@ -26,6 +26,9 @@ from rack_widget import RackWidget
 from guests_tab import GuestsTab
 from reports_tab import ReportsTab
 from settings_tab import SettingsTab
+from workers import BackgroundTask
+from quick_search import QuickSearchWidget
+from realtime_manager import RealtimeManager
 
 class JalaliDateEdit(QDateEdit):
     """ویجت ویرایش تاریخ شمسی"""
@@ -297,7 +300,7 @@ class EditReservationDialog(QDialog):
             session = self.reservation_manager.Session()
             
             # دریافت اطلاعات اتاق
-            room = session.query(Room).filter(Room.id == reservation.room_id).first()
+            room = self.reservation_manager.room_catalog.get(reservation.room_id)
             guest = session.query(Guest).filter(Guest.id == reservation.guest_id).first()
             
             if not guest:
@@ -306,7 +309,7 @@ class EditReservationDialog(QDialog):
                 return
             
             # پر کردن فرم
-            self.room_number.setText(room.room_number if room else "نامشخص")
+            self.room_number.setText(room['number'] if room else "نامشخص")
             self.first_name.setText(guest.first_name)
             self.last_name.setText(guest.last_name)
             self.adults_spin.setValue(reservation.adults)
@@ -401,6 +404,9 @@ class EditReservationDialog(QDialog):
 
 
 class ReservationDialog(QDialog):
+    # تغییر موجودی ممکن است از نخ دیگری گزارش شود؛ این سیگنال آن را به نخ رابط کاربری می‌رساند
+    availability_changed = pyqtSignal()
+    
     def __init__(self, reservation_manager, selected_room=None, selected_date=None, parent=None):
         super().__init__(parent)
         self.reservation_manager = reservation_manager
@@ -410,7 +416,14 @@ class ReservationDialog(QDialog):
         self.receipt_file_data = None
         self.receipt_filename = None
         
-        self.agency_manager = AgencyManager()
+        self.agency_manager = AgencyManager(self.reservation_manager.db)
+        
+        # جستجوی اتاق‌ها فقط پس از توقف تغییر ورودی‌ها و در پس‌زمینه اجرا می‌شود
+        self.rooms_generation = 0
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(300)
+        self.refresh_timer.timeout.connect(self.load_available_rooms)
         
         self.setWindowTitle("🎯 ثبت رزرو جدید - هتل آراد")
         self.setModal(True)
@@ -423,9 +436,9 @@ class ReservationDialog(QDialog):
         if selected_room and selected_date:
             self.prefill_form()
         
-        self.update_timer = QTimer()
-        self.update_timer.timeout.connect(self.load_available_rooms)
-        self.update_timer.start(2000)
+        # بروزرسانی لیست فقط وقتی رزروی واقعاً تغییر کند
+        self.availability_changed.connect(self.schedule_rooms_refresh)
+        self.reservation_manager.availability_index.add_listener(self.on_availability_changed)
     
     def setup_ui(self):
         main_layout = QVBoxLayout()
@@ -540,7 +553,7 @@ class ReservationDialog(QDialog):
         """)
         
         # تب رک مرکزی
-        self.rack_tab = RackWidget()
+        self.rack_tab = RackWidget(self.reservation_manager)
         self.rack_tab.cell_clicked.connect(self.on_rack_cell_clicked)
         tabs.addTab(self.rack_tab, "📋 رک مرکزی")
         
@@ -657,7 +670,7 @@ class ReservationDialog(QDialog):
             session = self.reservation_manager.Session()
             
             # دریافت اطلاعات اتاق
-            room = session.query(Room).filter(Room.id == reservation.room_id).first()
+            room = self.reservation_manager.room_catalog.get(reservation.room_id)
             guest = session.query(Guest).filter(Guest.id == reservation.guest_id).first()
             
             if not guest:
@@ -666,7 +679,7 @@ class ReservationDialog(QDialog):
                 return
             
             # پر کردن فرم
-            self.room_number.setText(room.room_number if room else "نامشخص")
+            self.room_number.setText(room['number'] if room else "نامشخص")
             self.first_name.setText(guest.first_name)
             self.last_name.setText(guest.last_name)
             self.adults_spin.setValue(reservation.adults)
@@ -778,11 +791,19 @@ class ReservationDialog(QDialog):
     
     def on_guests_changed(self):
         """هنگام تغییر تعداد مهمانان"""
-        self.load_available_rooms()
+        self.schedule_rooms_refresh()
     
     def on_dates_changed(self):
         """هنگام تغییر تاریخ‌ها"""
-        self.load_available_rooms()
+        self.schedule_rooms_refresh()
+    
+    def on_availability_changed(self, room_ids):
+        """اطلاع از ثبت یا تغییر یک رزرو (ممکن است از نخ دیگری صدا زده شود)"""
+        self.availability_changed.emit()
+    
+    def schedule_rooms_refresh(self):
+        """زمان‌بندی جستجوی مجدد اتاق‌ها؛ تغییرات پشت سر هم فقط یک جستجو ایجاد می‌کنند"""
+        self.refresh_timer.start()
     
     def on_room_selected(self, item):
         """هنگام انتخاب اتاق از لیست پیشنهادی"""
@@ -817,109 +838,134 @@ class ReservationDialog(QDialog):
             print(f"❌ خطا در انتخاب اتاق: {e}")
     
     def load_available_rooms(self):
-        """بارگذاری اتاق‌های قابل رزرو با بررسی Back-to-Back"""
+        """شروع جستجوی اتاق‌های قابل رزرو با بررسی Back-to-Back در پس‌زمینه"""
+        self.refresh_timer.stop()
+        self.rooms_generation += 1
+        
         try:
-            self.suggested_rooms_list.clear()
-            
             check_in = self.checkin_date.getJalaliDate().togregorian()
             check_out = self.checkout_date.getJalaliDate().togregorian()
             total_guests = self.adults_spin.value() + self.children_spin.value()
             
             # اعتبارسنجی اولیه تاریخ‌ها
             if check_in >= check_out:
-                item = QListWidgetItem("⚠️ تاریخ خروج باید بعد از تاریخ ورود باشد")
-                item.setForeground(Qt.GlobalColor.red)
-                self.suggested_rooms_list.addItem(item)
+                self.show_rooms_message("⚠️ تاریخ خروج باید بعد از تاریخ ورود باشد")
                 return
             
             if check_in < datetime.now().date():
-                item = QListWidgetItem("⚠️ تاریخ ورود نمی‌تواند در گذشته باشد")
-                item.setForeground(Qt.GlobalColor.red)
-                self.suggested_rooms_list.addItem(item)
+                self.show_rooms_message("⚠️ تاریخ ورود نمی‌تواند در گذشته باشد")
                 return
             
-            session = self.reservation_manager.Session()
+            # نتیجه جستجوهای قدیمی‌تر با مقایسه شماره نسل دور ریخته می‌شود
+            task = BackgroundTask(
+                self.rooms_generation,
+                self.reservation_manager.find_available_rooms,
+                check_in, check_out, total_guests,
+                is_current=lambda generation: generation == self.rooms_generation
+            )
+            task.signals.finished.connect(self.on_available_rooms_loaded)
+            task.signals.failed.connect(self.on_available_rooms_failed)
+            QThreadPool.globalInstance().start(task)
             
-            # پیدا کردن اتاق‌های خالی با ظرفیت مناسب
-            available_rooms = session.query(Room).filter(
-                Room.is_active == True,
-                Room.capacity >= total_guests
-            ).all()
-            
-            suitable_rooms = []
-            for room in available_rooms:
-                # بررسی دقیق موجودی اتاق با پشتیبانی از Back-to-Back
-                is_available, conflicts = self.reservation_manager.get_room_availability_with_back_to_back(
-                    room.id, check_in, check_out
-                )
-                
-                if is_available:
-                    suitable_rooms.append({
-                        'room': room,
-                        'conflicts': conflicts,
-                        'back_to_back_possible': any(c['type'] == 'back_to_back_possible' for c in conflicts)
-                    })
-            
-            if suitable_rooms:
-                for room_info in suitable_rooms:
-                    room = room_info['room']
-                    has_back_to_back = room_info['back_to_back_possible']
-                    
-                    # محاسبه قیمت کل
-                    stay_duration = (check_out - check_in).days
-                    total_price = room.price_per_night * stay_duration
-                    
-                    # آیکون بر اساس نوع اتاق
-                    room_icons = {
-                        "سینگل": "👤",
-                        "دبل": "👥", 
-                        "تویین": "🛏️",
-                        "سوئیت": "🏠",
-                        "دیلوکس": "⭐"
-                    }
-                    icon = room_icons.get(room.room_type, "🏨")
-                    
-                    # متن آیتم
-                    item_text = f"{icon} اتاق {room.room_number} - {room.room_type}\n"
-                    item_text += f"   📊 ظرفیت: {room.capacity} نفر | 💰 قیمت شبانه: {room.price_per_night:,} تومان\n"
-                    item_text += f"   💵 قیمت کل ({stay_duration} شب): {total_price:,} تومان"
-                    
-                    if has_back_to_back:
-                        item_text += f"\n   🔄 امکان Back-to-Back"
-                    
-                    item = QListWidgetItem(item_text)
-                    item.setData(Qt.ItemDataRole.UserRole, {
-                        'id': room.id,
-                        'number': room.room_number,
-                        'type': room.room_type,
-                        'capacity': room.capacity,
-                        'price': room.price_per_night,
-                        'has_back_to_back': has_back_to_back
-                    })
-                    
-                    # رنگ‌آمیزی برای اتاق‌های با Back-to-Back
-                    if has_back_to_back:
-                        item.setBackground(QColor("#FFF3CD"))  # زرد روشن
-                    
-                    self.suggested_rooms_list.addItem(item)
-                    
-                    # اگر اتاق انتخاب شده وجود دارد، آن را انتخاب کن
-                    if self.selected_room and room.room_number == self.selected_room:
-                        self.suggested_rooms_list.setCurrentItem(item)
-                        self.selected_room_id = room.id
-            else:
-                item = QListWidgetItem("❌ هیچ اتاق خالی با ظرفیت مورد نظر در تاریخ انتخاب شده یافت نشد")
-                item.setForeground(Qt.GlobalColor.red)
-                self.suggested_rooms_list.addItem(item)
-                
         except Exception as e:
             print(f"❌ خطا در بارگذاری اتاق‌ها: {e}")
-            item = QListWidgetItem(f"⚠️ خطا در بارگذاری: {str(e)}")
-            item.setForeground(Qt.GlobalColor.red)
-            self.suggested_rooms_list.addItem(item)
-        finally:
-            if 'session' in locals():
-                session.close()
+            self.show_rooms_message(f"⚠️ خطا در بارگذاری: {str(e)}")
+    
+    def on_available_rooms_failed(self, generation, error):
+        """نمایش خطای جستجوی پس‌زمینه"""
+        if generation != self.rooms_generation:
+            return
+        print(f"❌ خطا در بارگذاری اتاق‌ها: {error}")
+        self.show_rooms_message(f"⚠️ خطا در بارگذاری: {error}")
+    
+    def on_available_rooms_loaded(self, generation, suitable_rooms):
+        """بروزرسانی درجای لیست اتاق‌ها با حفظ اتاق انتخاب شده"""
+        if generation != self.rooms_generation:
+            return
+        
+        if not suitable_rooms:
+            self.show_rooms_message("❌ هیچ اتاق خالی با ظرفیت مورد نظر در تاریخ انتخاب شده یافت نشد")
+            return
+        
+        # آیکون بر اساس نوع اتاق
+        room_icons = {
+            "سینگل": "👤",
+            "دبل": "👥", 
+            "تویین": "🛏️",
+            "سوئیت": "🏠",
+            "دیلوکس": "⭐"
+        }
+        
+        rooms_list = self.suggested_rooms_list
+        current_item = rooms_list.currentItem()
+        current_data = current_item.data(Qt.ItemDataRole.UserRole) if current_item else None
+        current_room_id = current_data['id'] if current_data else None
+        
+        # حذف پیام‌ها و اتاق‌هایی که دیگر خالی نیستند؛ بقیه آیتم‌ها (و انتخاب) دست نمی‌خورند
+        available_ids = {room['id'] for room in suitable_rooms}
+        existing_items = {}
+        for row in range(rooms_list.count() - 1, -1, -1):
+            room_data = rooms_list.item(row).data(Qt.ItemDataRole.UserRole)
+            if room_data and room_data['id'] in available_ids:
+                existing_items[room_data['id']] = rooms_list.item(row)
+            else:
+                rooms_list.takeItem(row)
+        
+        if current_room_id is not None and current_room_id not in available_ids:
+            rooms_list.setCurrentRow(-1)
+            self.selected_room_id = None
+            current_room_id = None
+        
+        # ترتیب لیست همان ترتیب RoomCatalog (طبقه، شماره اتاق) است؛ آیتم جدید در جای خودش درج
+        # و آیتم موجودی که جایش عوض شده جابجا می‌شود
+        for position, room in enumerate(suitable_rooms):
+            has_back_to_back = room['has_back_to_back']
+            icon = room_icons.get(room['type'], "🏨")
+            
+            # متن آیتم
+            item_text = f"{icon} اتاق {room['number']} - {room['type']}\n"
+            item_text += f"   📊 ظرفیت: {room['capacity']} نفر | 💰 قیمت شبانه: {room['price']:,} تومان\n"
+            item_text += f"   💵 قیمت کل ({room['nights']} شب): {room['total_price']:,} تومان"
+            
+            if has_back_to_back:
+                item_text += f"\n   🔄 امکان Back-to-Back"
+            
+            item = existing_items.pop(room['id'], None)
+            if item is None:
+                item = QListWidgetItem()
+                rooms_list.insertItem(position, item)
+            elif rooms_list.row(item) != position:
+                rooms_list.takeItem(rooms_list.row(item))
+                rooms_list.insertItem(position, item)
+                if room['id'] == current_room_id:
+                    rooms_list.setCurrentItem(item)
+            
+            if item.text() != item_text:
+                item.setText(item_text)
+            item.setData(Qt.ItemDataRole.UserRole, {
+                'id': room['id'],
+                'number': room['number'],
+                'type': room['type'],
+                'capacity': room['capacity'],
+                'price': room['price'],
+                'has_back_to_back': has_back_to_back
+            })
+            
+            # رنگ‌آمیزی برای اتاق‌های با Back-to-Back
+            item.setBackground(QColor("#FFF3CD") if has_back_to_back else QBrush())
+            
+            # اگر اتاق انتخاب شده وجود دارد، آن را انتخاب کن
+            if current_room_id is None and self.selected_room and room['number'] == self.selected_room:
+                rooms_list.setCurrentItem(item)
+                self.selected_room_id = room['id']
+                current_room_id = room['id']
+    
+    def show_rooms_message(self, text):
+        """نمایش یک پیام به جای لیست اتاق‌ها"""
+        self.suggested_rooms_list.clear()
+        item = QListWidgetItem(text)
+        item.setForeground(Qt.GlobalColor.red)
+        self.suggested_rooms_list.addItem(item)
 
     def create_main_form(self, layout):
         # کانتینر فرم
@@ -983,6 +1029,8 @@ class ReservationDialog(QDialog):
         # فیلدهای اطلاعات رزرو
         self.adults_spin = self.create_spinbox(1, 10, 2, " نفر")
         self.children_spin = self.create_spinbox(0, 10, 0, " نفر")
+        self.adults_spin.valueChanged.connect(self.on_guests_changed)
+        self.children_spin.valueChanged.connect(self.on_guests_changed)
         self.nights_spin = self.create_spinbox(1, 30, 1, " شب")
         self.nights_spin.valueChanged.connect(self.on_nights_changed)
         
@@ -1502,10 +1550,12 @@ class ReservationDialog(QDialog):
             self.submit_btn.setEnabled(True)
             self.submit_btn.setText("✅ ثبت رزرو")
     
-    def closeEvent(self, event):
-        """هنگام بسته شدن دیالوگ"""
-        self.update_timer.stop()
-        super().closeEvent(event)
+    def done(self, result):
+        """هنگام بسته شدن دیالوگ (تایید، لغو یا بستن پنجره)"""
+        self.refresh_timer.stop()
+        self.rooms_generation += 1
+        self.reservation_manager.availability_index.remove_listener(self.on_availability_changed)
+        super().done(result)
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -1517,6 +1567,13 @@ class MainWindow(QMainWindow):
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_time)
         self.timer.start(1000)  # هر 1 ثانیه
+        
+        # بروزرسانی رک و آمار فقط وقتی داده‌ای واقعاً تغییر کند
+        self.realtime_manager = RealtimeManager(self.reservation_manager, parent=self)
+        self.realtime_manager.changes.connect(self.on_data_changed)
+        self.realtime_manager.changes.connect(self.rack_tab.on_data_changed)
+        self.realtime_manager.changes.connect(self.reports_tab.on_data_changed)
+        self.update_header_stats()
     
     def setup_ui(self):
         self.setWindowTitle("سیستم مدیریت رزرواسیون هتل آراد")
@@ -1535,11 +1592,18 @@ class MainWindow(QMainWindow):
         header = self.create_header()
         layout.addWidget(header)
         
+        # جستجوی سریع مهمانان و رزروها
+        self.quick_search = QuickSearchWidget(self.reservation_manager)
+        self.quick_search.reservation_selected.connect(self.show_edit_reservation_dialog)
+        self.quick_search.guest_selected.connect(self.show_guest_in_directory)
+        layout.addWidget(self.quick_search)
+        
         # تب‌ها
         tabs = QTabWidget()
+        self.main_tabs = tabs
         
         # تب رک - با بیشترین فضای ممکن
-        self.rack_tab = RackWidget()
+        self.rack_tab = RackWidget(self.reservation_manager)
         # اضافه کردن signal برای کلیک روی سلول
         self.rack_tab.cell_clicked.connect(self.on_rack_cell_clicked)
         tabs.addTab(self.rack_tab, "📋 رک مرکزی")
@@ -1987,7 +2051,7 @@ class MainWindow(QMainWindow):
             session = self.reservation_manager.Session()
             
             # تعداد کل اتاق‌ها
-            total_rooms = session.query(Room).filter(Room.is_active == True).count()
+            total_rooms = self.reservation_manager.room_catalog.count()
             
             # تعداد اتاق‌های خالی
             today = datetime.now().date()
@@ -2037,13 +2101,20 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.StandardButton.Yes:
             self.close()
     
+    def closeEvent(self, event):
+        """هنگام بسته شدن پنجره اصلی: نوشتن لاگ‌های در صف قبل از خروج"""
+        self.timer.stop()
+        self.realtime_manager.stop()
+        self.reservation_manager.db.audit_log.flush()
+        super().closeEvent(event)
+    
     def show_quick_reports(self):
         """نمایش گزارشات فوری"""
         try:
             session = self.reservation_manager.Session()
             
             # آمار سریع
-            total_rooms = session.query(Room).filter(Room.is_active == True).count()
+            total_rooms = self.reservation_manager.room_catalog.count()
             total_reservations = session.query(Reservation).count()
             total_guests = session.query(Guest).count()
             
@@ -2084,17 +2155,28 @@ class MainWindow(QMainWindow):
 
     def show_new_reservation_dialog(self, room_number=None, selected_date=None):
         """نمایش دیالوگ ثبت رزرو جدید"""
+        # بروزرسانی رک بعد از ثبت از طریق فید تغییرات (RackWidget.on_data_changed) انجام می‌شود
         dialog = ReservationDialog(self.reservation_manager, room_number, selected_date, self)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            # تاخیر در بروزرسانی رک برای جلوگیری از conflict
-            QTimer.singleShot(100, self.delayed_refresh_rack)
+        dialog.exec()
 
     def show_edit_reservation_dialog(self, reservation_id):
         """نمایش دیالوگ ویرایش رزرو"""
         dialog = EditReservationDialog(self.reservation_manager, reservation_id, self)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            # بروزرسانی رک
-            self.delayed_refresh_rack()
+        dialog.exec()
+    
+    def show_guest_in_directory(self, guest_id, guest_name):
+        """نمایش مهمان انتخاب شده در جستجوی سریع در تب مهمانان"""
+        self.main_tabs.setCurrentWidget(self.guests_tab)
+        self.guests_tab.search_input.setText(guest_name)
+    
+    def on_data_changed(self, events):
+        """دریافت دسته رویدادهای تغییر از فید تغییرات؛ رک و گزارشات خودشان مشترک هستند"""
+        tables = {event_data['table'] for event_data in events}
+        
+        if tables & {'reservations', 'rooms'}:
+            self.update_header_stats()
+        if tables & {'reservations', 'rooms', 'guests'}:
+            self.quick_search.refresh()
 
     def delayed_refresh_rack(self):
         """بروزرسانی رک با تاخیر"""
@@ -2122,13 +2204,13 @@ class MainWindow(QMainWindow):
 
     def find_reservation_for_cell(self, room_number, jalali_date):
         """پیدا کردن رزرو برای اتاق و تاریخ مشخص"""
+        # پیدا کردن اتاق بر اساس شماره
+        room = self.reservation_manager.room_catalog.by_number(room_number)
+        if not room:
+            return None
+        
         session = self.reservation_manager.Session()
         try:
-            # پیدا کردن اتاق بر اساس شماره
-            room = session.query(Room).filter(Room.room_number == room_number).first()
-            if not room:
-                return None
-            
             # تبدیل تاریخ شمسی به میلادی
             gregorian_date = jalali_date.togregorian()
             
@@ -2137,7 +2219,7 @@ class MainWindow(QMainWindow):
             
             reservation = session.query(Reservation).filter(
                 and_(
-                    Reservation.room_id == room.id,
+                    Reservation.room_id == room['id'],
                     Reservation.check_in <= gregorian_date,
                     Reservation.check_out > gregorian_date,
                     Reservation.status.in_(['confirmed', 'checked_in'])
@@ -0,0 +1,203 @@
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                            QLineEdit, QListWidget, QListWidgetItem)
+from PyQt6.QtCore import Qt, QTimer, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QFont
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from jalali import JalaliDate
+from workers import BackgroundTask
+
+# تاخیر شروع جستجو بعد از آخرین کلید (میلی‌ثانیه)
+QUICK_SEARCH_DEBOUNCE_MS = 250
+# حداکثر تعداد نتیجه نمایش داده شده
+QUICK_SEARCH_LIMIT = 30
+# کوتاه‌ترین متنی که جستجو می‌شود
+QUICK_SEARCH_MIN_LENGTH = 2
+
+STATUS_LABELS = {
+    'confirmed': "تایید شده",
+    'checked_in': "مقیم",
+    'checked_out': "خروجی",
+    'cancelled': "لغو شده",
+}
+
+
+class QuickSearchWidget(QWidget):
+    """جستجوی سریع مهمانان و رزروها هنگام تایپ
+
+    متن بعد از مکث کوتاه در تایپ در یک QThreadPool اختصاصی با یک نخ جستجو می‌شود
+    (ReservationManager.search). هر جستجو شماره نسل دارد: جستجوهای صف‌شده‌ای که متن
+    بعد از آن‌ها تغییر کرده اصلاً اجرا نمی‌شوند و نتیجه جستجوهای قدیمی‌تر دور ریخته
+    می‌شود، پس نخ رابط کاربری هیچ‌وقت منتظر دیتابیس نمی‌ماند.
+    """
+
+    reservation_selected = pyqtSignal(int)   # شناسه رزرو
+    guest_selected = pyqtSignal(int, str)    # (شناسه مهمان، نام کامل)
+
+    def __init__(self, reservation_manager, parent=None):
+        super().__init__(parent)
+        self.reservation_manager = reservation_manager
+        self.search_generation = 0
+
+        # یک نخ کافی است؛ کارهای قدیمی صف با is_current رد می‌شوند
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(1)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(QUICK_SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.start_search)
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 5, 10, 0)
+        layout.setSpacing(4)
+
+        search_layout = QHBoxLayout()
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔍 جستجوی سریع: نام مهمان، کد ملی، تلفن، ایمیل، کد پیگیری یا شماره اتاق...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setFont(QFont("B Titr", 11))
+        self.search_input.setStyleSheet("""
+            QLineEdit {
+                padding: 8px 12px;
+                border: 2px solid #bdc3c7;
+                border-radius: 8px;
+                background-color: white;
+            }
+            QLineEdit:focus {
+                border-color: #3498db;
+            }
+        """)
+        self.search_input.textChanged.connect(self.on_text_changed)
+        self.search_input.returnPressed.connect(self.open_first_result)
+
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("color: #7f8c8d; padding: 0 10px;")
+
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.status_label)
+        layout.addLayout(search_layout)
+
+        self.results_list = QListWidget()
+        self.results_list.setMaximumHeight(220)
+        self.results_list.setStyleSheet("""
+            QListWidget {
+                border: 1px solid #dee2e6;
+                border-radius: 6px;
+                background-color: white;
+                font-family: "B Titr";
+                font-size: 11px;
+            }
+            QListWidget::item {
+                padding: 6px;
+                border-bottom: 1px solid #f1f3f5;
+            }
+            QListWidget::item:selected {
+                background-color: #3498db;
+                color: white;
+            }
+        """)
+        self.results_list.itemClicked.connect(self.open_result)
+        self.results_list.hide()
+        layout.addWidget(self.results_list)
+
+    def on_text_changed(self, text):
+        # هر کلید جستجوی در جریان را بی‌اعتبار می‌کند
+        self.search_generation += 1
+        if len(text.strip()) < QUICK_SEARCH_MIN_LENGTH:
+            self.search_timer.stop()
+            self.show_results([])
+            self.status_label.clear()
+            return
+        self.search_timer.start()
+
+    def start_search(self):
+        """شروع جستجو در پس‌زمینه برای متن فعلی"""
+        text = self.search_input.text().strip()
+        if len(text) < QUICK_SEARCH_MIN_LENGTH:
+            return
+
+        self.search_generation += 1
+        self.status_label.setText("⏳ در حال جستجو...")
+        task = BackgroundTask(
+            self.search_generation,
+            self.reservation_manager.search,
+            text,
+            limit=QUICK_SEARCH_LIMIT,
+            is_current=lambda generation: generation == self.search_generation
+        )
+        task.signals.finished.connect(self.on_search_finished)
+        task.signals.failed.connect(self.on_search_failed)
+        self.thread_pool.start(task)
+
+    def refresh(self):
+        """تکرار جستجوی فعلی (بعد از تغییر داده‌ها) اگر نتیجه‌ای نمایش داده می‌شود"""
+        if self.results_list.isVisible():
+            self.start_search()
+
+    def on_search_finished(self, generation, results):
+        if generation != self.search_generation:
+            return
+        self.show_results(results)
+        if not results:
+            self.status_label.setText("نتیجه‌ای یافت نشد")
+        elif len(results) >= QUICK_SEARCH_LIMIT:
+            self.status_label.setText(f"{QUICK_SEARCH_LIMIT} نتیجه اول")
+        else:
+            self.status_label.setText(f"{len(results)} نتیجه")
+
+    def on_search_failed(self, generation, error):
+        if generation != self.search_generation:
+            return
+        print(f"❌ خطا در جستجوی سریع: {error}")
+        self.show_results([])
+        self.status_label.setText("⚠️ خطا در جستجو")
+
+    def show_results(self, results):
+        self.results_list.clear()
+        for result in results:
+            item = QListWidgetItem(self.format_result(result))
+            item.setData(Qt.ItemDataRole.UserRole, result)
+            self.results_list.addItem(item)
+        self.results_list.setVisible(bool(results))
+
+    def format_result(self, result):
+        if result['kind'] == 'reservation':
+            parts = [f"📅 رزرو #{result['id']}", result['guest_name']]
+            if result['room_number']:
+                parts.append(f"اتاق {result['room_number']}")
+            if result['check_in'] and result['check_out']:
+                parts.append(
+                    f"{JalaliDate.format_date(result['check_in'], '%Y/%m/%d')} تا "
+                    f"{JalaliDate.format_date(result['check_out'], '%Y/%m/%d')}"
+                )
+            parts.append(STATUS_LABELS.get(result['status'], result['status'] or ""))
+            if result['tracking_code']:
+                parts.append(f"کد پیگیری {result['tracking_code']}")
+        else:
+            parts = [f"👤 {result['guest_name']}"]
+            if result['phone']:
+                parts.append(f"📞 {result['phone']}")
+            if result['id_number']:
+                parts.append(f"کد ملی {result['id_number']}")
+        return " | ".join(parts)
+
+    def open_first_result(self):
+        if self.results_list.count():
+            self.open_result(self.results_list.item(0))
+
+    def open_result(self, item):
+        result = item.data(Qt.ItemDataRole.UserRole)
+        if not result:
+            return
+        if result['kind'] == 'reservation':
+            self.reservation_selected.emit(result['id'])
+        else:
+            self.guest_selected.emit(result['id'], result['guest_name'])
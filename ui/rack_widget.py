@@ -1,91 +1,521 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QComboBox, QPushButton, QScrollArea, QFrame)
-from PyQt6.QtCore import Qt, pyqtSignal
-from PyQt6.QtGui import QFont, QPainter, QColor, QMouseEvent
+                            QComboBox, QPushButton, QTableView, QHeaderView,
+                            QStyledItemDelegate, QAbstractItemView)
+from PyQt6.QtCore import Qt, pyqtSignal, QAbstractTableModel, QModelIndex, QEvent, QSize, QTimer, QThreadPool
+from PyQt6.QtGui import QFont, QColor, QBrush, QPen, QPainter, QPixmap, QPixmapCache
 import jdatetime
+from datetime import datetime, timedelta
+from collections import OrderedDict
 import sys
 import os
-from datetime import timedelta, datetime
 
 # اضافه کردن مسیر models به sys.path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'models'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 from reservation_manager import ReservationManager
-from models import Reservation, Guest, Room
 from jalali import JalaliDate
+from workers import BackgroundTask
+from models.calendar_dimension import JALALI_MONTHS, add_months, month_bounds
 
-class RoomCellWidget(QFrame):
-    clicked = pyqtSignal(str, object)  # room_number, jalali_date
+CELL_WIDTH = 120
+CELL_HEIGHT = 60
+
+# رنگ سلول‌ها بر اساس نوع پکیج
+PACKAGE_COLORS = {
+    "فول برد": "#E74C3C",      # قرمز
+    "اسکان + صبحانه": "#27AE60", # سبز
+    "فقط اسکان": "#2980B9",    # آبی
+    "پکیج ویژه": "#8E44AD"     # بنفش
+}
+DEFAULT_PACKAGE_COLOR = "#2980B9"
+
+# سطوح بزرگنمایی رک: در «روز» سلول‌ها با متن رسم می‌شوند، در «هفته» هر اقامت یک مستطیل
+# با نام مهمان است (RackTableView) و در «فصل» نوار اشغال هر طبقه برای سه ماه (FloorOccupancyModel)
+ZOOM_LEVELS = {
+    'day': {'label': 'روز', 'width': CELL_WIDTH, 'height': CELL_HEIGHT, 'header_width': CELL_WIDTH},
+    'week': {'label': 'هفته', 'width': 28, 'height': 24, 'header_width': 70},
+    'quarter': {'label': 'فصل', 'width': 12, 'height': 40, 'header_width': 70},
+}
+# سلول‌های باریک‌تر از این بدون متن رسم می‌شوند
+DETAIL_MIN_WIDTH = 80
+QUARTER_MONTHS = 3
+
+# نمای پیوسته: اندازه تکه‌های بارگذاری (روز)، تعداد تکه‌های نگه داشته شده در هر طرف ناحیه دید
+# و تعداد روزهایی که هنگام رسیدن به انتهای اسکرول اضافه می‌شود
+TIMELINE_CHUNK_DAYS = 14
+TIMELINE_KEEP_CHUNKS = 2
+TIMELINE_EXTEND_DAYS = 90
+
+# حداقل حجم QPixmapCache برای تصاویر آماده سلول‌ها (کیلوبایت)
+TILE_CACHE_LIMIT_KB = 32 * 1024
+
+# نقش داده‌ای برای دریافت (شماره اتاق، تاریخ شمسی) هر سلول
+CELL_KEY_ROLE = Qt.ItemDataRole.UserRole + 1
+
+
+def build_month_snapshot(reservation_manager, year, month):
+    """ساخت داده‌های کامل یک ماه رک (اجرا در نخ پس‌زمینه)
     
-    def __init__(self, reservation_data=None, room_number=None, jalali_date=None):
-        super().__init__()
-        self.reservation_data = reservation_data
-        self.room_number = room_number
-        self.jalali_date = jalali_date
+    خروجی بعد از ساخت تغییر نمی‌کند و مستقیماً به RackTableModel.set_month داده می‌شود:
+        {'year', 'month', 'rooms': tuple, 'dates': tuple, 'grid': {room_id: {day: cell_data}}}
+    """
+    month_start = jdatetime.date(year, month, 1)
+    next_month_start = jdatetime.date.fromgregorian(date=month_bounds(year, month)[1])
+    dates = tuple(month_start + jdatetime.timedelta(days=offset) for offset in range((next_month_start - month_start).days))
+    
+    return {
+        'year': year,
+        'month': month,
+        'rooms': tuple(reservation_manager.room_catalog.all()),
+        'dates': dates,
+        'grid': reservation_manager.get_month_cell_grid(year, month)
+    }
+
+
+def build_floor_occupancy(reservation_manager, year, month, months=QUARTER_MONTHS):
+    """درصد اشغال هر طبقه در هر روز برای چند ماه از (year, month) (اجرا در نخ پس‌زمینه)
+    
+    از همان جدول سلول‌های رک (get_cell_grid) ساخته می‌شود؛ هر سلول یک شب اشغال است.
+    خروجی: {'dates': tuple, 'floors': ((floor, room_count), ...), 'occupied': {floor: [count per day]}}
+    """
+    start_date, end_date = month_bounds(year, month, months)
+    days = (end_date - start_date).days
+    
+    rooms = reservation_manager.room_catalog.all()
+    floor_of = {room['id']: room['floor'] for room in rooms}
+    room_counts = {}
+    for room in rooms:
+        room_counts[room['floor']] = room_counts.get(room['floor'], 0) + 1
+    
+    occupied = {floor: [0] * days for floor in room_counts}
+    for room_id, cells in reservation_manager.get_cell_grid(start_date, end_date).items():
+        floor = floor_of.get(room_id)
+        if floor is None:
+            continue
+        counts = occupied[floor]
+        for day in cells:
+            counts[day - 1] += 1
+    
+    return {
+        'year': year,
+        'month': month,
+        'dates': tuple(jdatetime.date.fromgregorian(date=start_date + timedelta(days=offset)) for offset in range(days)),
+        'floors': tuple(sorted(room_counts.items())),
+        'occupied': occupied
+    }
+
+
+def reservation_touches_range(payload, start_date, end_date):
+    """آیا بازه فعلی یا قبلی رزرو رویداد با [start_date, end_date) (یا خروج در روز اول) تداخل دارد"""
+    spans = [
+        (payload.get('check_in'), payload.get('check_out')),
+        (payload.get('previous_check_in', payload.get('check_in')), payload.get('previous_check_out', payload.get('check_out')))
+    ]
+    for check_in, check_out in spans:
+        if not check_in or not check_out:
+            return True
+        check_in = datetime.fromisoformat(check_in).date()
+        check_out = datetime.fromisoformat(check_out).date()
+        if check_in < end_date and check_out >= start_date:
+            return True
+    return False
+
+
+class MonthSnapshotCache:
+    """کش LRU داده‌های ماه‌های رک با کلید (سال شمسی، ماه)
+    
+    فقط رویدادهای تغییری که با یک ماه تداخل دارند همان ماه را حذف می‌کنند. version با هر
+    حذف بالا می‌رود تا نتیجه بارگذاری‌هایی که قبل از تغییر شروع شده‌اند ذخیره نشود.
+    """
+    
+    def __init__(self, max_months=6):
+        self.max_months = max_months
+        self.snapshots = OrderedDict()
+        self.version = 0
+    
+    def get(self, key):
+        snapshot = self.snapshots.get(key)
+        if snapshot is not None:
+            self.snapshots.move_to_end(key)
+        return snapshot
+    
+    def put(self, key, snapshot, version=None):
+        """ذخیره snapshot؛ اگر version داده شود و از آن زمان چیزی حذف شده باشد ذخیره نمی‌شود"""
+        if version is not None and version != self.version:
+            return False
+        self.snapshots[key] = snapshot
+        self.snapshots.move_to_end(key)
+        while len(self.snapshots) > self.max_months:
+            self.snapshots.popitem(last=False)
+        return True
+    
+    def __contains__(self, key):
+        return key in self.snapshots
+    
+    def invalidate_events(self, events):
+        """حذف ماه‌هایی که رویدادها روی آن‌ها اثر دارند؛ خروجی کلیدهای حذف‌شده است"""
+        self.version += 1
+        if any(event_data['table'] == 'rooms' or (event_data['table'] == 'guests' and event_data['operation'] == 'update')
+               for event_data in events):
+            removed = list(self.snapshots)
+            self.snapshots.clear()
+            return removed
         
-        self.setMinimumSize(120, 60)
-        self.setMaximumSize(120, 60)
-        self.setFrameStyle(QFrame.Shape.Box)
-        self.setLineWidth(1)
+        removed = []
+        for key in list(self.snapshots):
+            start_date, end_date = month_bounds(*key)
+            if any(event_data['table'] == 'reservations' and reservation_touches_range(event_data['payload'], start_date, end_date)
+                   for event_data in events):
+                del self.snapshots[key]
+                removed.append(key)
+        return removed
+    
+    def clear(self):
+        self.version += 1
+        self.snapshots.clear()
+
+
+class RackTableModel(QAbstractTableModel):
+    """مدل داده رک: هر ردیف یک اتاق و هر ستون یک روز از ماه شمسی"""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rooms = []  # اتاق‌های RoomCatalog ({'id', 'number', 'floor', 'capacity', ...})
+        self.dates = []  # تاریخ‌های شمسی ستون‌ها
+        self.grid = {}   # {room_id: {day: cell_data}}
+        self.room_rows = {}  # {room_id: شماره ردیف}
+        self.compact = False  # در بزرگنمایی‌های کوچک هدر اتاق فقط شماره اتاق است
+    
+    def set_month(self, rooms, dates, grid):
+        """جایگزینی کامل داده‌های ماه (ناوبری بین ماه‌ها فقط یک reset مدل است)"""
+        self.beginResetModel()
+        self.rooms = rooms
+        self.dates = dates
+        self.grid = grid
+        self.room_rows = {room['id']: row for row, room in enumerate(rooms)}
+        self.endResetModel()
+    
+    def update_rooms(self, room_ids, grid):
+        """جایگزینی ردیف چند اتاق؛ فقط سلول‌هایی که واقعاً تغییر کرده‌اند دوباره رسم می‌شوند
         
-    def mousePressEvent(self, event: QMouseEvent):
+        grid فقط اتاق‌هایی را دارد که در ماه رزرو دارند؛ نبودن اتاق یعنی ردیف خالی.
+        تغییر cell_type سلول‌های همسایه (Back-to-Back) هم با همین مقایسه دیده می‌شود.
+        """
+        changed_cells = 0
+        for room_id in room_ids:
+            row = self.room_rows.get(room_id)
+            if row is None:
+                continue
+            old_cells = self.grid.get(room_id, {})
+            new_cells = grid.get(room_id, {})
+            changed_days = [day for day in set(old_cells) | set(new_cells) if old_cells.get(day) != new_cells.get(day)]
+            if new_cells:
+                self.grid[room_id] = new_cells
+            else:
+                self.grid.pop(room_id, None)
+            if changed_days:
+                changed_cells += len(changed_days)
+                self.dataChanged.emit(
+                    self.index(row, min(changed_days) - 1),
+                    self.index(row, max(changed_days) - 1),
+                    [Qt.ItemDataRole.UserRole]
+                )
+        return changed_cells
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rooms)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.dates)
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        room = self.rooms[index.row()]
+        if role == Qt.ItemDataRole.UserRole:
+            return self.grid.get(room['id'], {}).get(index.column() + 1)
+        if role == CELL_KEY_ROLE:
+            return room['number'], self.dates[index.column()]
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole:
+            if orientation == Qt.Orientation.Horizontal:
+                return str(self.dates[section].day)
+            room = self.rooms[section]
+            if self.compact:
+                return room['number']
+            return f"اتاق {room['number']}\nظرفیت: {room['capacity']}"
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+
+class RackTimelineModel(QAbstractTableModel):
+    """مدل رک پیوسته: ستون‌ها روزهای متوالی از origin هستند و داده‌ها تکه‌به‌تکه بارگذاری می‌شوند
+    
+    تاریخ هر ستون محاسبه می‌شود و ذخیره نمی‌شود؛ فقط داده سلول‌های تکه‌های (chunk_days روزه)
+    نزدیک به ناحیه دید در حافظه نگه داشته می‌شوند، پس حافظه به طول بازه بستگی ندارد.
+    """
+    
+    def __init__(self, chunk_days=TIMELINE_CHUNK_DAYS, parent=None):
+        super().__init__(parent)
+        self.chunk_days = chunk_days
+        self.rooms = []
+        self.room_rows = {}
+        self.origin = None   # تاریخ میلادی ستون اول
+        self.days = 0
+        self.chunks = {}     # {شماره تکه: {room_id: {day: cell_data}}}
+        self.compact = False
+    
+    def reset(self, rooms, origin, days):
+        self.beginResetModel()
+        self.rooms = rooms
+        self.room_rows = {room['id']: row for row, room in enumerate(rooms)}
+        self.origin = origin
+        self.days = days
+        self.chunks = {}
+        self.endResetModel()
+    
+    def append_days(self, days):
+        """اضافه کردن ستون به انتهای بازه هنگام رسیدن اسکرول به انتها"""
+        self.beginInsertColumns(QModelIndex(), self.days, self.days + days - 1)
+        self.days += days
+        self.endInsertColumns()
+    
+    def date_at(self, column):
+        return self.origin + timedelta(days=column)
+    
+    def chunk_range(self, chunk):
+        """بازه میلادی [شروع، پایان) یک تکه"""
+        start_date = self.date_at(chunk * self.chunk_days)
+        return start_date, start_date + timedelta(days=self.chunk_days)
+    
+    def set_chunk(self, chunk, grid):
+        self.chunks[chunk] = grid
+        first_column = chunk * self.chunk_days
+        last_column = min(first_column + self.chunk_days, self.days) - 1
+        if self.rooms and first_column <= last_column:
+            self.dataChanged.emit(
+                self.index(0, first_column),
+                self.index(len(self.rooms) - 1, last_column),
+                [Qt.ItemDataRole.UserRole]
+            )
+    
+    def drop_chunks(self, keep):
+        """حذف تکه‌های دور از ناحیه دید"""
+        for chunk in [chunk for chunk in self.chunks if chunk not in keep]:
+            del self.chunks[chunk]
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rooms)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.days
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        room = self.rooms[index.row()]
+        if role == Qt.ItemDataRole.UserRole:
+            chunk, offset = divmod(index.column(), self.chunk_days)
+            return self.chunks.get(chunk, {}).get(room['id'], {}).get(offset + 1)
+        if role == CELL_KEY_ROLE:
+            return room['number'], jdatetime.date.fromgregorian(date=self.date_at(index.column()))
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if self.origin is None:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            if orientation == Qt.Orientation.Horizontal:
+                jalali_date = jdatetime.date.fromgregorian(date=self.date_at(section))
+                # نام ماه در روز اول هر ماه و ستون اول
+                if (jalali_date.day == 1 or section == 0) and not self.compact:
+                    return f"{jalali_date.day} {JALALI_MONTHS[jalali_date.month - 1]} {jalali_date.year}"
+                return str(jalali_date.day)
+            room = self.rooms[section]
+            if self.compact:
+                return room['number']
+            return f"اتاق {room['number']}\nظرفیت: {room['capacity']}"
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+
+class FloorOccupancyModel(QAbstractTableModel):
+    """نوار حرارتی اشغال: هر ردیف یک طبقه و هر ستون یک روز؛ رنگ سلول درصد اشغال آن روز است
+    
+    رنگ‌ها (ده سطح) یک بار ساخته می‌شوند و سلول‌ها فقط با BackgroundRole و بدون متن رسم می‌شوند.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.dates = ()
+        self.floors = ()
+        self.occupied = {}
+        empty = QColor("#ECF0F1")
+        full = QColor("#C0392B")
+        self.brushes = [
+            QBrush(QColor(
+                round(empty.red() + (full.red() - empty.red()) * level / 10),
+                round(empty.green() + (full.green() - empty.green()) * level / 10),
+                round(empty.blue() + (full.blue() - empty.blue()) * level / 10)
+            ))
+            for level in range(11)
+        ]
+    
+    def set_occupancy(self, snapshot):
+        self.beginResetModel()
+        self.dates = snapshot['dates']
+        self.floors = snapshot['floors']
+        self.occupied = snapshot['occupied']
+        self.endResetModel()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.floors)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.dates)
+    
+    def ratio(self, row, column):
+        floor, room_count = self.floors[row]
+        return self.occupied[floor][column] / room_count if room_count else 0
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.ItemDataRole.BackgroundRole:
+            return self.brushes[round(self.ratio(index.row(), index.column()) * 10)]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            floor, room_count = self.floors[index.row()]
+            occupied = self.occupied[floor][index.column()]
+            return (f"طبقه {floor} - {self.dates[index.column()].strftime('%Y/%m/%d')}\n"
+                    f"اشغال: {occupied} از {room_count} اتاق ({self.ratio(index.row(), index.column()):.0%})")
+        return None
+    
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if section >= (len(self.dates) if orientation == Qt.Orientation.Horizontal else len(self.floors)):
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            if orientation == Qt.Orientation.Horizontal:
+                jalali_date = self.dates[section]
+                return JALALI_MONTHS[jalali_date.month - 1] if jalali_date.day == 1 else ""
+            return f"طبقه {self.floors[section][0]}"
+        if role == Qt.ItemDataRole.ToolTipRole and orientation == Qt.Orientation.Horizontal:
+            return self.dates[section].strftime('%Y/%m/%d')
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return Qt.AlignmentFlag.AlignCenter
+        return None
+
+
+class RackCellDelegate(QStyledItemDelegate):
+    """رسم سلول‌های رک (فقط سلول‌های قابل مشاهده) با پشتیبانی از Back-to-Back"""
+    clicked = pyqtSignal(str, object)  # room_number, jalali_date
+    
+    def sizeHint(self, option, index):
+        return QSize(CELL_WIDTH, CELL_HEIGHT)
+    
+    def editorEvent(self, event, model, option, index):
         """هنگام کلیک روی سلول"""
-        if event.button() == Qt.MouseButton.LeftButton:
-            if self.room_number and self.jalali_date:
-                # تشخیص اینکه کلیک روی کدام نیمه سلول بوده است
-                click_x = event.pos().x()
-                cell_width = self.width()
-                
-                # اگر سلول رزرو دارد و از نوع start یا end است
-                if self.reservation_data and self.reservation_data.get('cell_type') in ['start', 'end']:
-                    # اگر کلیک روی نیمه خالی باشد (برای start نیمه راست، برای end نیمه چپ)
-                    if (self.reservation_data.get('cell_type') == 'start' and click_x > cell_width // 2) or \
-                       (self.reservation_data.get('cell_type') == 'end' and click_x <= cell_width // 2):
-                        # کلیک روی نیمه خالی - ثبت رزرو جدید
-                        print(f"کلیک روی نیمه خالی - ثبت رزرو جدید برای اتاق {self.room_number}")
-                        self.clicked.emit(self.room_number, self.jalali_date)
-                    else:
-                        # کلیک روی نیمه پر - ویرایش رزرو موجود
-                        print(f"کلیک روی نیمه پر - ویرایش رزرو موجود در اتاق {self.room_number}")
-                        self.clicked.emit(self.room_number, self.jalali_date)
+        if event.type() == QEvent.Type.MouseButtonPress and event.button() == Qt.MouseButton.LeftButton:
+            room_number, jalali_date = index.data(CELL_KEY_ROLE)
+            reservation_data = index.data(Qt.ItemDataRole.UserRole)
+            
+            # تشخیص اینکه کلیک روی کدام نیمه سلول بوده است
+            click_x = event.position().x() - option.rect.x()
+            cell_width = option.rect.width()
+            
+            # اگر سلول رزرو دارد و از نوع start یا end است
+            if reservation_data and reservation_data.get('cell_type') in ['start', 'end']:
+                # اگر کلیک روی نیمه خالی باشد (برای start نیمه راست، برای end نیمه چپ)
+                if (reservation_data.get('cell_type') == 'start' and click_x > cell_width // 2) or \
+                   (reservation_data.get('cell_type') == 'end' and click_x <= cell_width // 2):
+                    # کلیک روی نیمه خالی - ثبت رزرو جدید
+                    print(f"کلیک روی نیمه خالی - ثبت رزرو جدید برای اتاق {room_number}")
                 else:
-                    # سلول کامل یا خالی - رفتار عادی
-                    self.clicked.emit(self.room_number, self.jalali_date)
-        super().mousePressEvent(event)
-        
-    def paintEvent(self, event):
-        """رویداد رسم سلول"""
-        if not self.isVisible() or self.width() <= 10 or self.height() <= 10:
-            return
+                    # کلیک روی نیمه پر - ویرایش رزرو موجود
+                    print(f"کلیک روی نیمه پر - ویرایش رزرو موجود در اتاق {room_number}")
             
-        painter = QPainter(self)
-        if not painter.isActive():
+            self.clicked.emit(room_number, jalali_date)
+            return True
+        return super().editorEvent(event, model, option, index)
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # قلم‌ها، فونت‌ها و رنگ‌ها یک بار ساخته می‌شوند و در هر رسم دوباره استفاده می‌شوند
+        self.package_colors = {package: QColor(color) for package, color in PACKAGE_COLORS.items()}
+        self.default_color = QColor(DEFAULT_PACKAGE_COLOR)
+        self.empty_brush = QColor("#ECF0F1")
+        self.border_pen = QPen(QColor("#2c3e50"))
+        self.divider_pen = QPen(QColor("#34495e"))
+        self.text_pen = QPen(QColor("white"))
+        self.empty_border_pen = QPen(QColor("#BDC3C7"))
+        self.empty_text_pen = QPen(QColor("#7F8C8D"))
+        self.info_font = QFont("Tahoma", 8, QFont.Weight.Bold)
+        self.arrow_font = QFont("Tahoma", 10, QFont.Weight.Bold)
+        self.empty_font = QFont("Tahoma", 9)
+        self.stay_bars = False
+        if QPixmapCache.cacheLimit() < TILE_CACHE_LIMIT_KB:
+            QPixmapCache.setCacheLimit(TILE_CACHE_LIMIT_KB)
+    
+    def paint(self, painter, option, index):
+        """رویداد رسم سلول: تصویر آماده سلول از QPixmapCache کپی می‌شود و فقط بار اول رسم می‌شود"""
+        rect = option.rect
+        if rect.width() <= 10 or rect.height() <= 10:
             return
-            
+        
         try:
-            width = self.width()
-            height = self.height()
+            # در حالت stay_bars اقامت‌ها را خود نما روی زمینه خالی رسم می‌کند
+            reservation_data = None if self.stay_bars else index.data(Qt.ItemDataRole.UserRole)
+            ratio = painter.device().devicePixelRatioF()
+            direction = painter.layoutDirection()
+            key = self.tile_key(reservation_data, rect.width(), rect.height(), ratio, direction)
             
-            if self.reservation_data:
+            tile = QPixmapCache.find(key)
+            if tile is None:
+                tile = self.render_tile(reservation_data, rect.width(), rect.height(), ratio, direction)
+                QPixmapCache.insert(key, tile)
+            painter.drawPixmap(rect.topLeft(), tile)
+            
+        except Exception as e:
+            print(f"خطا در رسم سلول: {e}")
+    
+    def tile_key(self, reservation_data, width, height, ratio, direction):
+        """کلید کش: هر چیزی که روی ظاهر سلول اثر دارد (نوع، رنگ، متن، اندازه، تراکم پیکسل و جهت متن)"""
+        size = f"{width}x{height}@{ratio}:{direction.value}"
+        if not reservation_data:
+            return f"rack:empty:{size}"
+        cell_type = reservation_data.get('cell_type', 'full')
+        label = self.cell_labels(reservation_data) if cell_type in ('full', 'middle') else ('', '')
+        return f"rack:{cell_type}:{self.get_reservation_color(reservation_data)}:{label[0]}:{label[1]}:{size}"
+    
+    def render_tile(self, reservation_data, width, height, ratio, direction):
+        """رسم یک سلول روی QPixmap (فقط وقتی در کش نباشد)"""
+        tile = QPixmap(round(width * ratio), round(height * ratio))
+        tile.setDevicePixelRatio(ratio)
+        tile.fill(Qt.GlobalColor.transparent)
+        
+        tile_painter = QPainter(tile)
+        tile_painter.setLayoutDirection(direction)
+        try:
+            if reservation_data:
                 # رسم سلول رزرو با حالت‌های مختلف
-                self.paint_reservation_cell(painter, width, height)
+                self.paint_reservation_cell(tile_painter, reservation_data, width, height)
             else:
                 # رسم سلول خالی
-                self.paint_empty_cell(painter, width, height)
-                
-        except Exception as e:
-            print(f"خطا در رسم سلول: {e}")
+                self.paint_empty_cell(tile_painter, width, height)
         finally:
-            painter.end()
+            tile_painter.end()
+        return tile
     
-    def paint_reservation_cell(self, painter, width, height):
+    def paint_reservation_cell(self, painter, reservation_data, width, height):
         """رسم سلول رزرو با حالت‌های مختلف برای Back-to-Back"""
-        if not self.reservation_data:
-            return
-            
-        cell_type = self.reservation_data.get('cell_type', 'full')
-        color = self.get_reservation_color()
+        cell_type = reservation_data.get('cell_type', 'full')
+        color = self.package_colors.get(reservation_data.get('package', 'فقط اسکان'), self.default_color)
         
         # اصلاح: برای شروع رزرو نیمه چپ، برای پایان رزرو نیمه راست
         if cell_type == 'start':
@@ -105,46 +535,40 @@ class RoomCellWidget(QFrame):
             text_area = (0, 0, width, height)
         
         # رسم پس‌زمینه رنگی
-        painter.fillRect(rect_x, 0, rect_width, height, QColor(color))
+        painter.fillRect(rect_x, 0, rect_width, height, color)
         
         # رسم border
-        painter.setPen(QColor("#2c3e50"))
+        painter.setPen(self.border_pen)
         painter.drawRect(0, 0, width - 1, height - 1)
         
         # خط جداکننده برای حالت‌های start و end
         if cell_type in ['start', 'end']:
-            painter.setPen(QColor("#34495e"))
+            painter.setPen(self.divider_pen)
             painter.drawLine(width // 2, 0, width // 2, height)
         
         # نمایش اطلاعات فقط در حالت full یا middle
         if cell_type in ['full', 'middle']:
-            self.draw_reservation_info(painter, text_area[0], text_area[1], text_area[2], text_area[3])
+            self.draw_reservation_info(painter, reservation_data, *text_area)
         elif cell_type == 'start':
             # در حالت start فلش به راست
-            painter.setPen(QColor("white"))
-            painter.setFont(QFont("Tahoma", 10, QFont.Weight.Bold))
+            painter.setPen(self.text_pen)
+            painter.setFont(self.arrow_font)
             painter.drawText(5, height // 2 + 5, "→")
         elif cell_type == 'end':
             # در حالت end فلش به چپ
-            painter.setPen(QColor("white"))
-            painter.setFont(QFont("Tahoma", 10, QFont.Weight.Bold))
+            painter.setPen(self.text_pen)
+            painter.setFont(self.arrow_font)
             painter.drawText(width - 15, height // 2 + 5, "←")
     
-    def draw_reservation_info(self, painter, x, y, width, height):
-        """رسم اطلاعات رزرو در محدوده مشخص"""
-        painter.setPen(QColor("white"))
-        painter.setFont(QFont("Tahoma", 8, QFont.Weight.Bold))
-        
-        guest_name = self.reservation_data.get('guest_name', 'نامشخص')
-        nights = self.reservation_data.get('nights', 0)
-        package = self.reservation_data.get('package', 'فقط اسکان')
+    def cell_labels(self, reservation_data):
+        """متن دو خط سلول رزرو (نام مهمان و شب‌ها، پکیج) کوتاه شده"""
+        guest_name = reservation_data.get('guest_name', 'نامشخص')
+        nights = reservation_data.get('nights', 0)
+        package = reservation_data.get('package', 'فقط اسکان')
         
         # کوتاه کردن متن اگر طولانی است
         if len(guest_name) > 12:
             guest_name = guest_name[:12] + "..."
-            
-        # نمایش اطلاعات در سه خط
-        line_height = height // 3
         
         # خط اول: نام مهمان و تعداد روزها
         name_text = f"{guest_name} | {nights} روز"
@@ -156,47 +580,142 @@ class RoomCellWidget(QFrame):
         if len(package_text) > 14:
             package_text = package_text[:14] + "..."
         
+        return name_text, package_text
+    
+    def draw_reservation_info(self, painter, reservation_data, x, y, width, height):
+        """رسم اطلاعات رزرو در محدوده مشخص"""
+        painter.setPen(self.text_pen)
+        painter.setFont(self.info_font)
+        
+        name_text, package_text = self.cell_labels(reservation_data)
+        
+        # نمایش اطلاعات در سه خط
+        line_height = height // 3
         painter.drawText(x + 5, y + line_height - 5, name_text)
         painter.drawText(x + 5, y + line_height * 2 - 5, package_text)
     
     def paint_empty_cell(self, painter, width, height):
         """رسم سلول خالی"""
         # زمینه خاکستری روشن
-        painter.fillRect(0, 0, width, height, QColor("#ECF0F1"))
+        painter.fillRect(0, 0, width, height, self.empty_brush)
         
         # border
-        painter.setPen(QColor("#BDC3C7"))
+        painter.setPen(self.empty_border_pen)
         painter.drawRect(0, 0, width - 1, height - 1)
+        if width < DETAIL_MIN_WIDTH:
+            return
         
         # متن "خالی"
-        painter.setPen(QColor("#7F8C8D"))
-        painter.setFont(QFont("Tahoma", 9))
+        painter.setPen(self.empty_text_pen)
+        painter.setFont(self.empty_font)
         painter.drawText(0, 0, width, height, Qt.AlignmentFlag.AlignCenter, "خالی")
     
-    def get_reservation_color(self):
+    def get_reservation_color(self, reservation_data):
         """رنگ بر اساس نوع پکیج"""
-        package = self.reservation_data.get('package', 'فقط اسکان')
+        package = reservation_data.get('package', 'فقط اسکان')
+        return PACKAGE_COLORS.get(package, DEFAULT_PACKAGE_COLOR)
+
+class RackTableView(QTableView):
+    """نمای جدولی رک؛ با stay_bars هر اقامت به جای سلول‌های روزانه یک مستطیل با نام مهمان است
+    
+    روزهای پشت سر هم یک ردیف که reservation_id یکسان دارند یک اقامت هستند. فقط ردیف‌ها و
+    ستون‌های قابل مشاهده بررسی می‌شوند و اقامتی که از ناحیه دید بیرون می‌رود در لبه بریده می‌شود.
+    """
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.stay_bars = False
+        self.package_colors = {package: QColor(color) for package, color in PACKAGE_COLORS.items()}
+        self.default_color = QColor(DEFAULT_PACKAGE_COLOR)
+        self.bar_pen = QPen(QColor("#2c3e50"))
+        self.text_pen = QPen(QColor("white"))
+        self.bar_font = QFont("Tahoma", 7, QFont.Weight.Bold)
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        model = self.model()
+        if not self.stay_bars or model is None or not model.rowCount() or not model.columnCount():
+            return
+        
+        viewport = self.viewport().rect()
+        first_row = max(self.rowAt(viewport.top()), 0)
+        last_row = self.rowAt(viewport.bottom())
+        last_row = model.rowCount() - 1 if last_row < 0 else last_row
+        edge_columns = [self.columnAt(viewport.left()), self.columnAt(viewport.right())]
+        first_column = min(column for column in edge_columns if column >= 0) if max(edge_columns) >= 0 else 0
+        last_column = model.columnCount() - 1 if min(edge_columns) < 0 else max(edge_columns)
+        
+        painter = QPainter(self.viewport())
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setFont(self.bar_font)
+        try:
+            for row in range(first_row, last_row + 1):
+                stay_start, stay_data = None, None
+                for column in range(first_column, last_column + 2):
+                    cell = model.index(row, column).data(Qt.ItemDataRole.UserRole) if column <= last_column else None
+                    reservation_id = cell['reservation_id'] if cell else None
+                    if stay_data is not None and reservation_id == stay_data['reservation_id']:
+                        continue
+                    if stay_data is not None:
+                        self.paint_stay(painter, row, stay_start, column - 1, stay_data)
+                    stay_start, stay_data = column, cell
+        finally:
+            painter.end()
+    
+    def paint_stay(self, painter, row, first_column, last_column, reservation_data):
+        """رسم یک اقامت روی ستون‌های first_column تا last_column"""
+        model = self.model()
+        rect = self.visualRect(model.index(row, first_column)).united(
+            self.visualRect(model.index(row, last_column))
+        ).adjusted(1, 3, -1, -3)
+        color = self.package_colors.get(reservation_data.get('package'), self.default_color)
         
-        colors = {
-            "فول برد": "#E74C3C",      # قرمز
-            "اسکان + صبحانه": "#27AE60", # سبز
-            "فقط اسکان": "#2980B9",    # آبی
-            "پکیج ویژه": "#8E44AD"     # بنفش
-        }
+        painter.setPen(self.bar_pen)
+        painter.setBrush(color)
+        painter.drawRoundedRect(rect, 4, 4)
         
-        return colors.get(package, "#2980B9")
+        text_rect = rect.adjusted(3, 0, -3, 0)
+        name = painter.fontMetrics().elidedText(
+            reservation_data.get('guest_name', ''), Qt.TextElideMode.ElideRight, text_rect.width()
+        )
+        if name:
+            painter.setPen(self.text_pen)
+            painter.drawText(text_rect, Qt.AlignmentFlag.AlignCenter, name)
+
 
 class RackWidget(QWidget):
     cell_clicked = pyqtSignal(str, object)  # room_number, jalali_date
     
-    def __init__(self):
+    def __init__(self, reservation_manager=None):
         super().__init__()
-        self.reservation_manager = ReservationManager()
+        self.reservation_manager = reservation_manager or ReservationManager()
         self.current_jalali_date = jdatetime.date.today()
-        self.cell_widgets = []
+        self.needs_reload = False  # تغییری که هنگام مخفی بودن رک رسیده است
+        self.month_range = None    # بازه میلادی [شروع، پایان) ماه نمایش داده شده
+        self.load_generation = 0   # شماره آخرین بارگذاری درخواستی؛ نتیجه‌های قدیمی‌تر دور ریخته می‌شوند
+        self.loading = False
+        self.displayed_month = None  # (سال، ماه) داده‌های فعلی مدل
+        self.month_cache = MonthSnapshotCache()
+        self.prefetching = set()     # ماه‌هایی که در پس‌زمینه در حال بارگذاری پیش‌دستانه هستند
+        self.timeline_mode = False
+        self.zoom = 'day'
+        self.timeline_requests = {}  # {شماره تکه: شماره درخواست}؛ پاسخ درخواست‌های جایگزین‌شده دور ریخته می‌شود
+        self.timeline_request_id = 0
         self.setup_ui()
         
-        from PyQt6.QtCore import QTimer
+        # تغییرات پشت سر هم ماه/سال (مثلاً عبور از اسفند به فروردین) فقط یک بارگذاری می‌سازند
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(100)
+        self.reload_timer.timeout.connect(self.load_rack_data)
+        
+        # محاسبه تکه‌های لازم نمای پیوسته بعد از توقف کوتاه اسکرول
+        self.timeline_timer = QTimer(self)
+        self.timeline_timer.setSingleShot(True)
+        self.timeline_timer.setInterval(50)
+        self.timeline_timer.timeout.connect(self.load_visible_chunks)
+        self.rack_view.horizontalScrollBar().valueChanged.connect(self.on_timeline_scrolled)
+        
         QTimer.singleShot(200, self.load_rack_data)
     
     def setup_ui(self):
@@ -207,9 +726,8 @@ class RackWidget(QWidget):
         header = self.create_header()
         layout.addLayout(header)
         
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        layout.addWidget(self.scroll_area)
+        self.rack_view = self.create_rack_view()
+        layout.addWidget(self.rack_view)
         
         self.setLayout(layout)
     
@@ -221,9 +739,7 @@ class RackWidget(QWidget):
         date_layout.addWidget(QLabel("ماه:"))
         
         self.month_combo = QComboBox()
-        months = ["فروردین", "اردیبهشت", "خرداد", "تیر", "مرداد", "شهریور", 
-                 "مهر", "آبان", "آذر", "دی", "بهمن", "اسفند"]
-        for i, month in enumerate(months, 1):
+        for i, month in enumerate(JALALI_MONTHS, 1):
             self.month_combo.addItem(month, i)
         
         self.month_combo.setCurrentIndex(self.current_jalali_date.month - 1)
@@ -241,298 +757,467 @@ class RackWidget(QWidget):
         date_layout.addWidget(QLabel("سال:"))
         
         header_layout.addLayout(date_layout)
+        
+        # بزرگنمایی
+        header_layout.addWidget(QLabel("بزرگنمایی:"))
+        self.zoom_combo = QComboBox()
+        for level, options in ZOOM_LEVELS.items():
+            self.zoom_combo.addItem(options['label'], level)
+        self.zoom_combo.currentIndexChanged.connect(lambda: self.set_zoom(self.zoom_combo.currentData()))
+        header_layout.addWidget(self.zoom_combo)
         header_layout.addStretch()
         
+        self.loading_label = QLabel("")
+        self.loading_label.setStyleSheet("color: #7F8C8D;")
+        header_layout.addWidget(self.loading_label)
+        
         # دکمه‌های ناوبری
         nav_layout = QHBoxLayout()
         self.prev_btn = QPushButton("ماه قبل")
         self.next_btn = QPushButton("ماه بعد")
         self.today_btn = QPushButton("امروز")
+        self.timeline_btn = QPushButton("نمای پیوسته")
+        self.timeline_btn.setCheckable(True)
         
         self.prev_btn.clicked.connect(self.previous_month)
         self.next_btn.clicked.connect(self.next_month)
         self.today_btn.clicked.connect(self.go_to_today)
+        self.timeline_btn.toggled.connect(self.set_timeline_mode)
         
         nav_layout.addWidget(self.prev_btn)
         nav_layout.addWidget(self.today_btn)
         nav_layout.addWidget(self.next_btn)
+        nav_layout.addWidget(self.timeline_btn)
         
         header_layout.addLayout(nav_layout)
         
         return header_layout
     
     def on_date_changed(self):
-        from PyQt6.QtCore import QTimer
-        QTimer.singleShot(100, self.load_rack_data)
+        if self.timeline_mode and self.zoom != 'quarter':
+            self.scroll_to_month()
+        else:
+            self.reload_timer.start()
     
-    def load_rack_data(self):
-        """بارگذاری داده‌های رک"""
-        try:
-            if not self.isVisible():
-                return
-                
-            print("🔍 در حال بارگذاری رک...")
-            
-            self.cleanup_previous_widgets()
-            
-            main_widget = QWidget()
-            main_layout = QVBoxLayout(main_widget)
-            main_layout.setContentsMargins(0, 0, 0, 0)
-            main_layout.setSpacing(2)
-            
-            # ایجاد هدر روزهای ماه (فقط یک هدر)
-            days_header = self.create_days_header()
-            main_layout.addLayout(days_header)
-            
-            # ایجاد ردیف‌های اتاق‌ها
-            self.create_room_rows(main_layout)
-            
-            self.scroll_area.setWidget(main_widget)
-            
-            print("✅ رک بارگذاری شد")
-            
-        except Exception as e:
-            print(f"❌ خطا در بارگذاری رک: {e}")
-    
-    def cleanup_previous_widgets(self):
-        """پاک کردن ویجت‌های قبلی"""
-        for widget in self.cell_widgets:
-            try:
-                widget.setParent(None)
-                widget.deleteLater()
-            except:
-                pass
-        self.cell_widgets.clear()
-    
-    def create_days_header(self):
-        """ایجاد هدر روزهای ماه - فقط یک هدر"""
-        layout = QHBoxLayout()
-        
-        # سلول خالی برای ستون اتاق‌ها
-        empty_label = QLabel("اتاق‌ها")
-        empty_label.setMinimumSize(120, 30)
-        empty_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        empty_label.setStyleSheet("""
-            QLabel {
-                background: #34495E;
+    def create_rack_view(self):
+        """ایجاد نمای جدولی رک (فقط سلول‌های قابل مشاهده رسم می‌شوند)"""
+        self.rack_model = RackTableModel(self)
+        self.timeline_model = RackTimelineModel(parent=self)
+        self.occupancy_model = FloorOccupancyModel(self)
+        self.occupancy_delegate = QStyledItemDelegate(self)
+        self.cell_delegate = RackCellDelegate(self)
+        self.cell_delegate.clicked.connect(self.on_cell_clicked)
+        
+        view = RackTableView()
+        view.setModel(self.rack_model)
+        view.setItemDelegate(self.cell_delegate)
+        view.setShowGrid(False)
+        view.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        view.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        view.setHorizontalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        
+        # هدر روزهای ماه
+        days_header = view.horizontalHeader()
+        days_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        days_header.setDefaultSectionSize(CELL_WIDTH)
+        days_header.setFixedHeight(30)
+        
+        # هدر اتاق‌ها
+        rooms_header = view.verticalHeader()
+        rooms_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        rooms_header.setDefaultSectionSize(CELL_HEIGHT)
+        rooms_header.setFixedWidth(CELL_WIDTH)
+        
+        view.setStyleSheet("""
+            QHeaderView::section:horizontal {
+                background: #2C3E50;
                 color: white;
                 font-weight: bold;
+                border: 1px solid #34495E;
+            }
+            QHeaderView::section:vertical {
+                background: #ECF0F1;
+                border: 1px solid #BDC3C7;
+                font-weight: bold;
+                padding: 5px;
+            }
+            QTableCornerButton::section {
+                background: #34495E;
                 border: 1px solid #2C3E50;
-                border-radius: 3px;
             }
         """)
-        layout.addWidget(empty_label)
         
+        return view
+    
+    def load_rack_data(self):
+        """شروع بارگذاری داده‌های رک در پس‌زمینه
+        
+        تا رسیدن داده‌ها نمای ماه قبلی (یا ردیف‌های خالی در اولین بارگذاری) نشان داده
+        می‌شود. بارگذاری‌های قبلی که هنوز شروع نشده‌اند اجرا نمی‌شوند و نتیجه
+        بارگذاری‌هایی که در حال اجرا بوده‌اند دور ریخته می‌شود.
+        """
+        self.reload_timer.stop()
+        if not self.isVisible():
+            self.needs_reload = True
+            return
+        if self.zoom == 'quarter':
+            self.load_occupancy()
+            return
+        if self.timeline_mode:
+            self.reload_timeline(keep_position=True)
+            return
+        
+        self.load_generation += 1
         year = self.year_combo.currentData()
         month = self.month_combo.currentData()
+        
+        snapshot = self.month_cache.get((year, month))
+        if snapshot is not None:
+            self.show_snapshot(snapshot)
+            return
+        
+        print("🔍 در حال بارگذاری رک...")
+        
+        if not self.rack_model.rooms:
+            self.show_skeleton(year, month)
+        self.loading = True
+        self.loading_label.setText("⏳ در حال بارگذاری...")
+        self.rack_view.setEnabled(False)
+        
+        cache_version = self.month_cache.version
+        task = BackgroundTask(
+            self.load_generation,
+            build_month_snapshot,
+            self.reservation_manager, year, month,
+            is_current=lambda generation: generation == self.load_generation
+        )
+        task.signals.finished.connect(
+            lambda generation, snapshot: self.on_month_loaded(generation, snapshot, cache_version)
+        )
+        task.signals.failed.connect(self.on_month_failed)
+        QThreadPool.globalInstance().start(task)
+    
+    def show_skeleton(self, year, month):
+        """ردیف‌های خالی اتاق‌ها تا رسیدن اولین داده‌ها"""
         days = self.get_days_in_month(year, month)
+        dates = [jdatetime.date(year, month, day) for day in range(1, days + 1)]
+        self.rack_model.set_month(self.reservation_manager.room_catalog.all(), dates, {})
+    
+    def on_month_loaded(self, generation, snapshot, cache_version):
+        self.month_cache.put((snapshot['year'], snapshot['month']), snapshot, cache_version)
+        if generation != self.load_generation:
+            return
+        self.show_snapshot(snapshot)
+        print("✅ رک بارگذاری شد")
+    
+    def show_snapshot(self, snapshot):
+        """نمایش داده‌های یک ماه و بارگذاری پیش‌دستانه ماه‌های قبل و بعد"""
+        self.loading = False
+        self.loading_label.setText("")
+        self.rack_view.setEnabled(True)
+        
+        self.displayed_month = (snapshot['year'], snapshot['month'])
+        self.month_range = month_bounds(*self.displayed_month)
+        self.rack_model.set_month(list(snapshot['rooms']), list(snapshot['dates']), dict(snapshot['grid']))
+        self.prefetch_neighbours(*self.displayed_month)
+    
+    def prefetch_neighbours(self, year, month):
+        """ساخت داده‌های ماه قبل و بعد در پس‌زمینه تا ناوبری بدون انتظار باشد"""
+        for key in (add_months(year, month, -1), add_months(year, month, 1)):
+            if key in self.month_cache or key in self.prefetching:
+                continue
+            self.prefetching.add(key)
+            cache_version = self.month_cache.version
+            task = BackgroundTask(0, build_month_snapshot, self.reservation_manager, *key)
+            task.signals.finished.connect(
+                lambda generation, snapshot, key=key, cache_version=cache_version: self.on_prefetch_loaded(key, snapshot, cache_version)
+            )
+            task.signals.failed.connect(lambda generation, error, key=key: self.prefetching.discard(key))
+            QThreadPool.globalInstance().start(task)
+    
+    def on_prefetch_loaded(self, key, snapshot, cache_version):
+        self.prefetching.discard(key)
+        self.month_cache.put(key, snapshot, cache_version)
+    
+    def on_month_failed(self, generation, error):
+        if generation != self.load_generation:
+            return
+        self.loading = False
+        self.loading_label.setText("⚠️ خطا در بارگذاری رک")
+        self.rack_view.setEnabled(True)
+        print(f"❌ خطا در بارگذاری رک: {error}")
+    
+    def on_data_changed(self, events):
+        """دریافت رویدادهای فید تغییرات (RealtimeManager.changes)
+        
+        تغییر رزروها فقط ردیف اتاق‌های درگیر (اتاق فعلی و قبلی) را دوباره می‌سازد؛
+        تغییر اتاق‌ها یا نام مهمان‌ها کل ماه را بارگذاری می‌کند.
+        """
+        self.month_cache.invalidate_events(events)
+        
+        full_reload = any(
+            event_data['table'] == 'rooms' or (event_data['table'] == 'guests' and event_data['operation'] == 'update')
+            for event_data in events
+        )
+        if self.zoom == 'quarter':
+            if full_reload or any(event_data['table'] == 'reservations' for event_data in events):
+                self.load_rack_data()
+            return
+        if self.timeline_mode:
+            self.on_timeline_data_changed(events, full_reload)
+            return
+        room_ids = set()
+        for event_data in events:
+            if event_data['table'] == 'reservations' and self.event_in_month(event_data['payload']):
+                payload = event_data['payload']
+                room_ids.update(room_id for room_id in (payload.get('room_id'), payload.get('previous_room_id')) if room_id)
+        
+        if not full_reload and not room_ids:
+            return
+        if not self.isVisible():
+            self.needs_reload = True
+        elif full_reload or self.loading or self.displayed_month is None:
+            # داده‌های بارگذاری در جریان ممکن است قبل از این تغییر خوانده شده باشند
+            self.load_rack_data()
+        else:
+            self.refresh_rooms(room_ids)
+    
+    def event_in_month(self, payload):
+        """آیا بازه فعلی یا قبلی رزرو با ماه نمایش داده شده (یا روز خروج در اول ماه) تداخل دارد"""
+        if self.month_range is None:
+            return True
+        return reservation_touches_range(payload, *self.month_range)
+    
+    def refresh_rooms(self, room_ids):
+        """بازسازی ردیف چند اتاق با یک کوئری؛ نسخه بروز ماه دوباره در کش قرار می‌گیرد"""
+        try:
+            year, month = self.displayed_month
+            grid = self.reservation_manager.get_month_cell_grid(year, month, room_ids)
+            changed_cells = self.rack_model.update_rooms(room_ids, grid)
+            self.month_cache.put(self.displayed_month, {
+                'year': year,
+                'month': month,
+                'rooms': tuple(self.rack_model.rooms),
+                'dates': tuple(self.rack_model.dates),
+                'grid': dict(self.rack_model.grid)
+            })
+            print(f"✅ رک بروزرسانی شد ({len(room_ids)} اتاق، {changed_cells} سلول)")
+        except Exception as e:
+            print(f"❌ خطا در بروزرسانی رک: {e}")
+    
+    def set_timeline_mode(self, enabled):
+        """جابجایی بین نمای یک‌ماهه و نمای پیوسته چندماهه"""
+        self.timeline_mode = enabled
+        if self.zoom == 'quarter':
+            return
+        if enabled:
+            self.load_generation += 1  # بارگذاری ماه در جریان دیگر نمایش داده نشود
+            self.loading = False
+            self.loading_label.setText("")
+            self.rack_view.setEnabled(True)
+            self.rack_view.setModel(self.timeline_model)
+            self.reload_timeline()
+        else:
+            self.timeline_requests.clear()
+            self.rack_view.setModel(self.rack_model)
+            self.timeline_model.reset([], None, 0)
+            self.load_rack_data()
+    
+    def set_zoom(self, level):
+        """تغییر سطح بزرگنمایی؛ «فصل» نمای نوار اشغال طبقات را جایگزین رک می‌کند"""
+        previous = self.zoom
+        self.zoom = level
+        options = ZOOM_LEVELS[level]
+        
+        days_header = self.rack_view.horizontalHeader()
+        days_header.setDefaultSectionSize(options['width'])
+        days_header.setMinimumSectionSize(min(options['width'], days_header.minimumSectionSize()))
+        rooms_header = self.rack_view.verticalHeader()
+        rooms_header.setMinimumSectionSize(min(options['height'], rooms_header.minimumSectionSize()))
+        rooms_header.setDefaultSectionSize(options['height'])
+        rooms_header.setFixedWidth(options['header_width'])
+        
+        self.rack_view.stay_bars = self.cell_delegate.stay_bars = level == 'week'
+        
+        compact = level != 'day'
+        for model in (self.rack_model, self.timeline_model):
+            model.compact = compact
+            model.headerDataChanged.emit(Qt.Orientation.Vertical, 0, max(model.rowCount() - 1, 0))
+            model.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, max(model.columnCount() - 1, 0))
+        self.timeline_btn.setEnabled(level != 'quarter')
+        
+        if level == 'quarter':
+            self.load_generation += 1
+            self.loading = False
+            self.rack_view.setEnabled(True)
+            self.rack_view.setItemDelegate(self.occupancy_delegate)
+            self.rack_view.setModel(self.occupancy_model)
+            self.load_rack_data()
+        elif previous == 'quarter':
+            self.load_generation += 1
+            self.rack_view.setItemDelegate(self.cell_delegate)
+            self.rack_view.setModel(self.timeline_model if self.timeline_mode else self.rack_model)
+            self.load_rack_data()
+        elif self.timeline_mode:
+            self.scroll_to_month()
+    
+    def load_occupancy(self):
+        """ساخت نوار اشغال طبقات برای سه ماه از ماه انتخاب شده در پس‌زمینه"""
+        self.load_generation += 1
+        self.loading_label.setText("⏳ در حال بارگذاری...")
+        task = BackgroundTask(
+            self.load_generation,
+            build_floor_occupancy,
+            self.reservation_manager, self.year_combo.currentData(), self.month_combo.currentData(),
+            is_current=lambda generation: generation == self.load_generation
+        )
+        task.signals.finished.connect(self.on_occupancy_loaded)
+        task.signals.failed.connect(self.on_month_failed)
+        QThreadPool.globalInstance().start(task)
+    
+    def on_occupancy_loaded(self, generation, snapshot):
+        if generation != self.load_generation or self.zoom != 'quarter':
+            return
+        self.loading_label.setText("")
+        self.occupancy_model.set_occupancy(snapshot)
+    
+    def reload_timeline(self, keep_position=False):
+        """ساخت دوباره نمای پیوسته (اتاق‌ها از RoomCatalog)
+        
+        با keep_position بازه و محل اسکرول فعلی حفظ می‌شود؛ در غیر این صورت نما از یک
+        ماه قبل از ماه انتخاب شده شروع و به روز اول ماه انتخاب شده اسکرول می‌شود.
+        """
+        model = self.timeline_model
+        self.timeline_requests.clear()
+        if keep_position and model.origin is not None:
+            position = self.rack_view.horizontalScrollBar().value()
+            model.reset(self.reservation_manager.room_catalog.all(), model.origin, model.days)
+            self.rack_view.horizontalScrollBar().setValue(position)
+            self.load_visible_chunks()
+            return
         
-        # ایجاد هدر برای هر روز از ماه
-        for day in range(1, days + 1):
-            label = QLabel(str(day))
-            label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            label.setMinimumSize(120, 30)
-            label.setStyleSheet("""
-                QLabel {
-                    background: #2C3E50;
-                    color: white;
-                    font-weight: bold;
-                    border: 1px solid #34495E;
-                    border-radius: 3px;
-                }
-            """)
-            layout.addWidget(label)
-        
-        layout.addStretch()
-        return layout
-    
-    def create_room_rows(self, main_layout):
-        """ایجاد ردیف‌های اتاق‌ها با پشتیبانی از Back-to-Back"""
         year = self.year_combo.currentData()
         month = self.month_combo.currentData()
-        days = self.get_days_in_month(year, month)
+        model.reset(self.reservation_manager.room_catalog.all(), month_bounds(*add_months(year, month, -1))[0], TIMELINE_EXTEND_DAYS * 4)
+        self.scroll_to_month()
+        self.load_visible_chunks()
+    
+    def scroll_to_month(self):
+        """اسکرول نمای پیوسته به روز اول ماه انتخاب شده"""
+        year = self.year_combo.currentData()
+        month = self.month_combo.currentData()
+        column = (month_bounds(year, month)[0] - self.timeline_model.origin).days
+        if column < 0:
+            self.reload_timeline()
+            return
+        while column >= self.timeline_model.days:
+            self.timeline_model.append_days(TIMELINE_EXTEND_DAYS)
+        self.rack_view.horizontalScrollBar().setValue(column * ZOOM_LEVELS[self.zoom]['width'])
+        self.timeline_timer.start()
+    
+    def on_timeline_scrolled(self, value):
+        if not self.timeline_mode or self.zoom == 'quarter':
+            return
+        scroll_bar = self.rack_view.horizontalScrollBar()
+        if value >= scroll_bar.maximum() - self.rack_view.viewport().width():
+            self.timeline_model.append_days(TIMELINE_EXTEND_DAYS)
+        self.timeline_timer.start()
+    
+    def visible_chunks(self):
+        """شماره تکه‌های ناحیه دید (اندازه ستون‌ها ثابت است)"""
+        cell_width = ZOOM_LEVELS[self.zoom]['width']
+        first_column = self.rack_view.horizontalScrollBar().value() // cell_width
+        last_column = first_column + self.rack_view.viewport().width() // cell_width + 1
+        chunk_days = self.timeline_model.chunk_days
+        return range(first_column // chunk_days, last_column // chunk_days + 1)
+    
+    def load_visible_chunks(self):
+        """بارگذاری تکه‌های ناحیه دید و یک تکه در هر طرف، و حذف تکه‌های دور از حافظه"""
+        if not self.timeline_mode or self.zoom == 'quarter' or not self.timeline_model.rooms:
+            return
+        visible = self.visible_chunks()
+        wanted = range(max(visible.start - 1, 0), visible.stop + 1)
+        keep = range(max(visible.start - TIMELINE_KEEP_CHUNKS, 0), visible.stop + TIMELINE_KEEP_CHUNKS)
         
-        # ایجاد ردیف برای هر اتاق
-        for room_idx in range(126):
-            row_layout = QHBoxLayout()
-            row_layout.setSpacing(2)
-            
-            # اطلاعات اتاق
-            room_number = self.get_room_number(room_idx)
-            capacity = self.get_room_capacity(room_idx)
-            room_label = QLabel(f"اتاق {room_number}\nظرفیت: {capacity}")
-            room_label.setMinimumSize(120, 60)
-            room_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            room_label.setStyleSheet("""
-                QLabel {
-                    background: #ECF0F1;
-                    border: 1px solid #BDC3C7;
-                    border-radius: 3px;
-                    font-weight: bold;
-                    padding: 5px;
-                }
-            """)
-            row_layout.addWidget(room_label)
-            
-            # سلول‌های روزها
-            for day in range(1, days + 1):
-                date = jdatetime.date(year, month, day)
-                cell_data = self.get_cell_data(room_idx + 1, date)
-                
-                cell = RoomCellWidget(
-                    reservation_data=cell_data,
-                    room_number=room_number,
-                    jalali_date=date
-                )
-                cell.clicked.connect(self.on_cell_clicked)
-                self.cell_widgets.append(cell)
-                row_layout.addWidget(cell)
-            
-            row_layout.addStretch()
-            main_layout.addLayout(row_layout)
+        self.timeline_model.drop_chunks(set(keep))
+        for chunk in list(self.timeline_requests):
+            if chunk not in keep:
+                del self.timeline_requests[chunk]
+        for chunk in wanted:
+            if chunk not in self.timeline_model.chunks and chunk not in self.timeline_requests:
+                self.request_chunk(chunk)
+    
+    def request_chunk(self, chunk):
+        """بارگذاری داده‌های یک تکه در پس‌زمینه با get_cell_grid"""
+        self.timeline_request_id += 1
+        request_id = self.timeline_request_id
+        self.timeline_requests[chunk] = request_id
+        start_date, end_date = self.timeline_model.chunk_range(chunk)
+        task = BackgroundTask(
+            request_id,
+            self.reservation_manager.get_cell_grid,
+            start_date, end_date,
+            is_current=lambda request_id, chunk=chunk: self.timeline_requests.get(chunk) == request_id
+        )
+        task.signals.finished.connect(lambda request_id, grid, chunk=chunk: self.on_chunk_loaded(chunk, request_id, grid))
+        task.signals.failed.connect(lambda request_id, error: print(f"❌ خطا در بارگذاری نمای پیوسته: {error}"))
+        QThreadPool.globalInstance().start(task)
+    
+    def on_chunk_loaded(self, chunk, request_id, grid):
+        if not self.timeline_mode or self.timeline_requests.get(chunk) != request_id:
+            return
+        del self.timeline_requests[chunk]
+        self.timeline_model.set_chunk(chunk, grid)
+    
+    def on_timeline_data_changed(self, events, full_reload):
+        """بارگذاری دوباره فقط تکه‌هایی از نمای پیوسته که رزرو تغییرکرده با آن‌ها تداخل دارد"""
+        if not self.isVisible():
+            self.needs_reload = True
+            return
+        if full_reload:
+            self.reload_timeline(keep_position=True)
+            return
+        
+        payloads = [event_data['payload'] for event_data in events if event_data['table'] == 'reservations']
+        for chunk in set(self.timeline_model.chunks) | set(self.timeline_requests):
+            if any(reservation_touches_range(payload, *self.timeline_model.chunk_range(chunk)) for payload in payloads):
+                self.request_chunk(chunk)
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.needs_reload:
+            self.needs_reload = False
+            self.load_rack_data()
     
     def on_cell_clicked(self, room_number, jalali_date):
         """هنگام کلیک روی سلول"""
         self.cell_clicked.emit(room_number, jalali_date)
     
-    def get_room_number(self, idx):
-        floor = (idx // 21) + 1
-        room_num = (idx % 21) + 1
-        return f"{floor}{room_num:02d}"
-    
-    def get_room_capacity(self, idx):
-        session = self.reservation_manager.Session()
-        try:
-            room = session.query(Room).filter(Room.id == idx + 1).first()
-            return room.capacity if room else 2
-        except:
-            return 2
-        finally:
-            session.close()
-    
     def get_days_in_month(self, year, month):
         try:
-            if month == 12:
-                next_month = jdatetime.date(year + 1, 1, 1)
-            else:
-                next_month = jdatetime.date(year, month + 1, 1)
-            return (next_month - jdatetime.timedelta(days=1)).day
+            start_date, end_date = month_bounds(year, month)
+            return (end_date - start_date).days
         except:
             return 30
     
-    def get_cell_data(self, room_id, jalali_date):
-        """دریافت اطلاعات رزرو برای یک اتاق در تاریخ مشخص با پشتیبانی از Back-to-Back"""
-        session = None
-        try:
-            gregorian_date = jalali_date.togregorian()
-            
-            # استفاده از reservation_manager برای ایجاد session
-            session = self.reservation_manager.Session()
-            
-            from sqlalchemy import and_
-            
-            # پیدا کردن تمام رزروهای فعال برای این اتاق
-            reservations = session.query(Reservation, Guest).join(
-                Guest, and_(Reservation.guest_id == Guest.id)
-            ).filter(
-                Reservation.room_id == room_id,
-                Reservation.status.in_(['confirmed', 'checked_in'])
-            ).order_by(Reservation.check_in).all()  # مرتب‌سازی بر اساس تاریخ ورود
-            
-            # پیدا کردن رزروی که این تاریخ در بازه آن قرار دارد
-            for res, guest in reservations:
-                check_in_date = res.check_in.date()
-                check_out_date = res.check_out.date()
-                
-                if check_in_date <= gregorian_date < check_out_date:
-                    nights = (check_out_date - check_in_date).days
-                    
-                    # تعیین نوع سلول با منطق صحیح Back-to-Back
-                    day_position = (gregorian_date - check_in_date).days
-                    total_nights = nights
-                    
-                    # بررسی Back-to-Back احتمالی
-                    has_previous_reservation = False
-                    has_next_reservation = False
-                    
-                    # بررسی آیا رزرو قبلی در این تاریخ تمام می‌شود
-                    for prev_res, prev_guest in reservations:
-                        if prev_res.id != res.id and prev_res.check_out.date() == gregorian_date:
-                            has_previous_reservation = True
-                            break
-                    
-                    # بررسی آیا رزرو بعدی در این تاریخ شروع می‌شود
-                    for next_res, next_guest in reservations:
-                        if next_res.id != res.id and next_res.check_in.date() == gregorian_date:
-                            has_next_reservation = True
-                            break
-                    
-                    # منطق تعیین نوع سلول
-                    if day_position == 0:  # اولین روز رزرو
-                        if has_previous_reservation:
-                            # اگر رزرو قبلی در این تاریخ تمام می‌شود - حالت start (نیمه راست)
-                            cell_type = 'start'
-                        else:
-                            # روز اول و بدون رزرو قبلی - حالت full
-                            cell_type = 'full'
-                    elif gregorian_date == check_out_date - timedelta(days=1):  # آخرین روز رزرو
-                        if has_next_reservation:
-                            # اگر رزرو بعدی در این تاریخ شروع می‌شود - حالت end (نیمه چپ)
-                            cell_type = 'end'
-                        else:
-                            # روز آخر و بدون رزرو بعدی - حالت full
-                            cell_type = 'full'
-                    else:
-                        # روزهای میانی - حالت middle
-                        cell_type = 'middle'
-                    
-                    print(f"🔍 اتاق {room_id} - تاریخ {jalali_date}:")
-                    print(f"   رزرو: {check_in_date} تا {check_out_date}")
-                    print(f"   موقعیت روز: {day_position}")
-                    print(f"   نوع سلول: {cell_type}")
-                    print(f"   رزرو قبلی: {has_previous_reservation}")
-                    print(f"   رزرو بعدی: {has_next_reservation}")
-                    
-                    return {
-                        'guest_name': f"{guest.first_name} {guest.last_name}",
-                        'nights': nights,
-                        'package': res.package_type,
-                        'check_in': res.check_in,
-                        'check_out': res.check_out,
-                        'cell_type': cell_type,
-                        'day_position': day_position,
-                        'total_nights': nights,
-                        'reservation_id': res.id
-                    }
-            
-            return None
-            
-        except Exception as e:
-            print(f"خطا در دریافت داده سلول: {e}")
-            return None
-        finally:
-            if session:
-                session.close()
-    
     def previous_month(self):
-        idx = self.month_combo.currentIndex()
-        if idx > 0:
-            self.month_combo.setCurrentIndex(idx - 1)
-        else:
-            self.month_combo.setCurrentIndex(11)
-            year = int(self.year_combo.currentText()) - 1
-            self.year_combo.setCurrentText(str(year))
+        self.step_month(-1)
     
     def next_month(self):
-        idx = self.month_combo.currentIndex()
-        if idx < 11:
-            self.month_combo.setCurrentIndex(idx + 1)
-        else:
-            self.month_combo.setCurrentIndex(0)
-            year = int(self.year_combo.currentText()) + 1
-            self.year_combo.setCurrentText(str(year))
+        self.step_month(1)
+    
+    def step_month(self, count):
+        """رفتن count ماه جلو یا عقب؛ عبور از اسفند به فروردین با add_months"""
+        year, month = add_months(self.year_combo.currentData(), self.month_combo.currentData(), count)
+        self.month_combo.setCurrentIndex(month - 1)
+        self.year_combo.setCurrentText(str(year))
     
     def go_to_today(self):
         today = jdatetime.date.today()
         self.month_combo.setCurrentIndex(today.month - 1)
-        self.year_combo.setCurrentText(str(today.year))
\ No newline at end of file
+        self.year_combo.setCurrentText(str(today.year))
+        if self.timeline_mode:
+            # اگر ماه انتخاب شده تغییر نکرده باشد سیگنالی هم ارسال نمی‌شود
+            self.scroll_to_month()
\ No newline at end of file
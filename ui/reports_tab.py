@@ -12,16 +12,36 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'models'))
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
 from reservation_manager import ReservationManager
-from models import Reservation, Room, Guest
+from models import Reservation
 from jalali import JalaliDate
+from models.calendar_dimension import JALALI_MONTHS, add_months
+
+# تعداد ماه‌های جدول آمار ماهانه (2 ماه گذشته تا 3 ماه آینده)
+MONTHLY_REPORT_MONTHS = 6
 
 class ReportsTab(QWidget):
     def __init__(self, reservation_manager):
         super().__init__()
         self.reservation_manager = reservation_manager
+        self.needs_reload = False  # تغییری که هنگام مخفی بودن تب رسیده است
         self.setup_ui()
         self.load_reports_data()
     
+    def on_data_changed(self, events):
+        """دریافت رویدادهای فید تغییرات (RealtimeManager.changes)"""
+        if not any(event_data['table'] in ('reservations', 'rooms') for event_data in events):
+            return
+        if self.isVisible():
+            self.load_reports_data()
+        else:
+            self.needs_reload = True
+    
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.needs_reload:
+            self.needs_reload = False
+            self.load_reports_data()
+    
     def setup_ui(self):
         # ایجاد scroll area اصلی
         scroll_area = QScrollArea()
@@ -145,7 +165,7 @@ class ReportsTab(QWidget):
         session = self.reservation_manager.Session()
         try:
             # آمار پایه
-            total_rooms = session.query(Room).filter(Room.is_active == True).count()
+            total_rooms = self.reservation_manager.room_catalog.count()
             today = datetime.now().date()
             
             # اتاق‌های اشغال شده
@@ -163,16 +183,10 @@ class ReportsTab(QWidget):
             # کل رزروها
             total_reservations = session.query(Reservation).count()
             
-            # درآمد ماه جاری
-            current_month_start = jdatetime.date.today().replace(day=1).togregorian()
-            current_month_end = (jdatetime.date.today() + jdatetime.timedelta(days=31)).replace(day=1).togregorian()
-            
-            monthly_revenue = session.query(Reservation).filter(
-                Reservation.check_in >= current_month_start,
-                Reservation.check_in < current_month_end
-            ).with_entities(Reservation.total_amount).all()
-            
-            total_monthly_revenue = sum([rev[0] for rev in monthly_revenue if rev[0]])
+            # درآمد ماه جاری (جمع در SQL روی ماه شمسی)
+            today_jalali = jdatetime.date.today()
+            current_month = self.reservation_manager.get_monthly_report(today_jalali.year, today_jalali.month)
+            total_monthly_revenue = current_month[0]['revenue'] if current_month else 0
             
             # محاسبات
             occupancy_rate = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
@@ -194,62 +208,23 @@ class ReportsTab(QWidget):
             session.close()
     
     def load_monthly_stats(self):
-        session = self.reservation_manager.Session()
+        """آمار 2 ماه گذشته تا 3 ماه آینده با یک کوئری (ReservationManager.get_monthly_report)"""
         try:
-            # آمار 6 ماه گذشته و آینده
-            monthly_stats = []
             current_jalali = jdatetime.date.today()
-            
-            for i in range(-2, 4):  # 2 ماه گذشته تا 3 ماه آینده
-                month_date = current_jalali + jdatetime.timedelta(days=30*i)
-                year = month_date.year
-                month = month_date.month
-                
-                # محاسبه تاریخ‌های میلادی برای ماه شمسی
-                start_date = jdatetime.date(year, month, 1).togregorian()
-                if month == 12:
-                    end_date = jdatetime.date(year + 1, 1, 1).togregorian()
-                else:
-                    end_date = jdatetime.date(year, month + 1, 1).togregorian()
-                
-                # تعداد رزروهای ماه
-                monthly_reservations = session.query(Reservation).filter(
-                    Reservation.check_in >= start_date,
-                    Reservation.check_in < end_date
-                ).count()
-                
-                # درآمد ماه
-                monthly_revenue = session.query(Reservation).filter(
-                    Reservation.check_in >= start_date,
-                    Reservation.check_in < end_date
-                ).with_entities(Reservation.total_amount).all()
-                
-                total_revenue = sum([rev[0] for rev in monthly_revenue if rev[0]])
-                
-                # نام ماه شمسی
-                persian_months = ["فروردین", "اردیبهشت", "خرداد", "تیر", "مرداد", "شهریور", 
-                                 "مهر", "آبان", "آذر", "دی", "بهمن", "اسفند"]
-                month_name = persian_months[month - 1]
-                
-                monthly_stats.append({
-                    'month': f"{month_name} {year}",
-                    'reservations': monthly_reservations,
-                    'revenue': total_revenue,
-                    'occupancy': (monthly_reservations / 30) * 3  # تخمین
-                })
+            first_year, first_month = add_months(current_jalali.year, current_jalali.month, -2)
+            monthly_stats = self.reservation_manager.get_monthly_report(first_year, first_month, MONTHLY_REPORT_MONTHS)
             
             # پر کردن جدول
             self.monthly_table.setRowCount(len(monthly_stats))
             for row, stat in enumerate(monthly_stats):
-                self.monthly_table.setItem(row, 0, QTableWidgetItem(stat['month']))
+                month_name = f"{JALALI_MONTHS[stat['month'] - 1]} {stat['year']}"
+                self.monthly_table.setItem(row, 0, QTableWidgetItem(month_name))
                 self.monthly_table.setItem(row, 1, QTableWidgetItem(str(stat['reservations'])))
                 self.monthly_table.setItem(row, 2, QTableWidgetItem(f"{stat['revenue']:,.0f} تومان"))
                 self.monthly_table.setItem(row, 3, QTableWidgetItem(f"{stat['occupancy']:.1f}%"))
                 
         except Exception as e:
             print(f"خطا در بارگذاری آمار ماهانه: {e}")
-        finally:
-            session.close()
     
     def load_package_stats(self):
         """بارگذاری آمار انواع پکیج"""
@@ -0,0 +1,37 @@
+from PyQt6.QtCore import QObject, QRunnable, pyqtSignal
+import traceback
+
+
+class TaskSignals(QObject):
+    """سیگنال‌های یک کار پس‌زمینه (QRunnable خودش QObject نیست)"""
+    finished = pyqtSignal(int, object)   # (شماره نسل، نتیجه)
+    failed = pyqtSignal(int, str)        # (شماره نسل، پیام خطا)
+
+
+class BackgroundTask(QRunnable):
+    """اجرای یک تابع در QThreadPool و برگرداندن نتیجه با سیگنال به نخ رابط کاربری
+
+    هر کار یک شماره نسل دارد؛ فراخواننده با مقایسه آن با آخرین نسل درخواستی
+    نتیجه‌های قدیمی را دور می‌ریزد. اگر is_current داده شود و پیش از شروع کار
+    False برگرداند، کار اصلاً اجرا نمی‌شود.
+    """
+
+    def __init__(self, generation, function, *args, is_current=None, **kwargs):
+        super().__init__()
+        self.generation = generation
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.is_current = is_current
+        self.signals = TaskSignals()
+
+    def run(self):
+        if self.is_current is not None and not self.is_current(self.generation):
+            return
+        try:
+            result = self.function(*self.args, **self.kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(self.generation, str(e))
+            return
+        self.signals.finished.emit(self.generation, result)